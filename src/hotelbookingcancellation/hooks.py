@@ -0,0 +1,520 @@
+"""Project hooks."""
+# pylint: disable=protected-access
+import cProfile
+import hashlib
+import inspect
+import json
+import logging
+import os
+import re
+import resource
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import mlflow  # type: ignore
+import numpy as np
+import pandas as pd
+from kedro.framework.hooks import hook_impl
+from kedro.io import AbstractDataSet, DataCatalog, DataSetError, MemoryDataSet
+from kedro.io.core import get_filepath_str
+from kedro.pipeline import Pipeline
+from kedro.pipeline.node import Node
+
+from . import __version__
+
+_MB = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+_REMOTE_FILE_KEYS = ("size", "mtime", "ETag", "Content-MD5", "Digest")
+
+
+def _hash(content: Any) -> str:
+    """Hashes a json serializable object.
+
+    Args:
+        content (Any): The object to hash.
+
+    Returns:
+        str: The object hash.
+    """
+    dumped = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(dumped.encode()).hexdigest()
+
+
+def _code_version(node: Node) -> str:
+    """Gets the version of the code run by a node.
+
+    The whole module of the node function is hashed, so changes to the helpers
+    it calls are also detected.
+
+    Args:
+        node (Node): The node.
+
+    Returns:
+        str: The code version.
+    """
+    try:
+        source = inspect.getsource(inspect.getmodule(node.func))  # type: ignore
+    except (OSError, TypeError):
+        source = repr(node.func)
+    return _hash([__version__, source])
+
+
+def _file_fingerprint(fs: Any, path: str) -> Optional[str]:
+    """Fingerprints a file or a directory of files.
+
+    Local files are hashed by content, remote ones by their metadata.
+
+    Args:
+        fs (Any): The fsspec filesystem of the path.
+        path (str): The file or directory path.
+
+    Returns:
+        Optional[str]: The fingerprint, or None if the path does not exist.
+    """
+    try:
+        paths = sorted(fs.find(path)) if fs.isdir(path) else [path]
+        if "file" not in fs.protocol:
+            infos = [fs.info(file) for file in paths]
+            return _hash(
+                [{k: info.get(k) for k in _REMOTE_FILE_KEYS} for info in infos]
+            )
+        digest = hashlib.sha256()
+        for file in paths:
+            digest.update(file.encode())
+            with fs.open(file, "rb") as handle:
+                for chunk in iter(lambda: handle.read(1 << 20), b""):
+                    digest.update(chunk)
+        return digest.hexdigest()
+    except (FileNotFoundError, DataSetError):
+        return None
+
+
+def _tracks_run(dataset: Optional[AbstractDataSet]) -> bool:
+    """Checks whether a dataset is saved in a mlflow run, e.g. models and metrics.
+
+    Args:
+        dataset (Optional[AbstractDataSet]): The dataset.
+
+    Returns:
+        bool: Whether the dataset has a `run_id`.
+    """
+    return isinstance(getattr(type(dataset), "run_id", None), property)
+
+
+class MemoizationHooks:
+    """Records the fingerprints of the nodes, to skip the ones that did not change.
+
+    A node can be skipped when the fingerprint of its inputs and code matches
+    the one recorded in its last run and all of its outputs are still
+    persisted. Nodes without outputs, like the scoring server, are run for
+    their side effects and never skipped. The nodes are only skipped by the
+    `MemoizedRunner`, which runs the pipeline returned by `filter`. Run with
+    `--params force:true` to run every node anyway.
+    """
+
+    def __init__(self, path: str = "data/memoization.json"):
+        """Initializes the hooks.
+
+        Args:
+            path (str): Where the node fingerprints are stored.
+        """
+        self._path = Path(path)
+        self._catalog = DataCatalog()
+        self._store: Dict[str, Dict[str, Any]] = {"nodes": {}, "run_ids": {}}
+        self._fingerprints: Dict[str, str] = {}
+        self._force = False
+
+    def _dataset(self, name: str) -> Optional[AbstractDataSet]:
+        """Gets a dataset from the catalog."""
+        return self._catalog._data_sets.get(name)
+
+    def _input_fingerprint(self, name: str) -> Any:
+        """Fingerprints a node input.
+
+        Args:
+            name (str): The dataset name.
+
+        Returns:
+            Any: The input fingerprint.
+        """
+        dataset = self._dataset(name)
+        if name.startswith("params:") or name == "parameters":
+            return dataset.load()  # type: ignore
+        if _tracks_run(dataset):
+            return self._store["run_ids"].get(name)
+        if hasattr(dataset, "_filepath") and hasattr(dataset, "_fs"):
+            path = get_filepath_str(dataset._get_load_path(), dataset._protocol)
+            return _file_fingerprint(dataset._fs, path)
+        if hasattr(dataset, "_path") and hasattr(dataset, "_filesystem"):
+            return _file_fingerprint(dataset._filesystem, dataset._path)
+        return str(dataset)
+
+    def _fingerprint(self, node: Node) -> str:
+        """Fingerprints the inputs, parameters and code of a node.
+
+        Args:
+            node (Node): The node.
+
+        Returns:
+            str: The node fingerprint.
+        """
+        inputs = {name: self._input_fingerprint(name) for name in node.inputs}
+        return _hash({"code": _code_version(node), "inputs": inputs})
+
+    def _is_persisted(self, name: str) -> bool:
+        """Checks whether an output can be loaded again without its node.
+
+        Args:
+            name (str): The dataset name.
+
+        Returns:
+            bool: Whether the output is persisted.
+        """
+        dataset = self._dataset(name)
+        if dataset is None or isinstance(dataset, MemoryDataSet):
+            return False
+        if _tracks_run(dataset):
+            return name in self._store["run_ids"]
+        return self._catalog.exists(name)
+
+    def _is_fresh(self, node: Node, stale: Set[str]) -> bool:
+        """Checks whether a node can be skipped.
+
+        Args:
+            node (Node): The node.
+            stale (Set[str]): Datasets that are going to be regenerated.
+
+        Returns:
+            bool: Whether the node outputs are up to date.
+        """
+        if not node.outputs:
+            return False
+        if any(name.split("@")[0] in stale for name in node.inputs):
+            return False
+        if not all(self._is_persisted(name) for name in node.outputs):
+            return False
+        return self._store["nodes"].get(node.name) == self._fingerprint(node)
+
+    def _restore_run_ids(self, names: Iterable[str]):
+        """Points mlflow datasets to the runs they were last saved in."""
+        for name in names:
+            dataset = self._dataset(name)
+            if _tracks_run(dataset):
+                dataset.run_id = self._store["run_ids"][name]  # type: ignore
+
+    def _write(self):
+        """Writes the fingerprints store."""
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._path.write_text(json.dumps(self._store, indent=2), encoding="utf-8")
+
+    def filter(self, pipeline: Pipeline) -> Pipeline:
+        """Removes the up to date nodes from a pipeline.
+
+        Args:
+            pipeline (Pipeline): The pipeline of the run.
+
+        Returns:
+            Pipeline: The nodes that still need to run.
+        """
+        if self._force:
+            return pipeline
+        stale: Set[str] = set()
+        nodes = []
+        for node in pipeline.nodes:
+            if self._is_fresh(node, stale):
+                logger.info("Skipping node '%s', its outputs are up to date", node.name)
+                self._restore_run_ids(node.outputs)
+            else:
+                stale.update(name.split("@")[0] for name in node.outputs)
+                nodes.append(node)
+        return Pipeline(nodes)
+
+    @hook_impl
+    def before_pipeline_run(self, run_params: Dict[str, Any], catalog: DataCatalog):
+        """Loads the fingerprints of the last runs."""
+        self._catalog = catalog
+        if self._path.exists():
+            self._store = json.loads(self._path.read_text(encoding="utf-8"))
+        force = (run_params.get("extra_params") or {}).get("force", False)
+        self._force = str(force).lower() == "true"
+
+    @hook_impl
+    def before_node_run(self, node: Node):
+        """Fingerprints the node once its inputs are available."""
+        self._fingerprints[node.name] = self._fingerprint(node)
+
+    @hook_impl
+    def after_node_run(self, node: Node):
+        """Records the node fingerprint."""
+        self._store["nodes"][node.name] = self._fingerprints.pop(node.name)
+        for name in node.outputs:
+            self._store["run_ids"].pop(name, None)
+
+    @hook_impl
+    def after_dataset_saved(self, dataset_name: str):
+        """Records the mlflow run a dataset was saved in."""
+        dataset = self._dataset(dataset_name)
+        if _tracks_run(dataset):
+            self._store["run_ids"][dataset_name] = dataset.run_id  # type: ignore
+        self._write()
+
+    @hook_impl
+    def after_pipeline_run(self):
+        """Writes the fingerprints store."""
+        self._write()
+
+    @hook_impl
+    def on_pipeline_error(self):
+        """Writes the fingerprints of the nodes that succeeded."""
+        self._write()
+
+
+def _volume(data: Any) -> Tuple[int, int]:
+    """Counts the rows and bytes of a node input or output.
+
+    Args:
+        data (Any): A dataframe, array or a dict of them, like partitions.
+
+    Returns:
+        Tuple[int, int]: The number of rows and bytes, zero for other types.
+    """
+    if isinstance(data, dict):
+        return _total_volume(data.values())
+    if isinstance(data, pd.DataFrame):
+        return len(data), int(data.memory_usage(index=True).sum())
+    if isinstance(data, (pd.Series, np.ndarray)):
+        return len(data), int(data.nbytes)
+    return 0, 0
+
+
+def _total_volume(values: Iterable[Any]) -> Tuple[int, int]:
+    """Sums the rows and bytes of multiple node inputs or outputs."""
+    volumes = [_volume(value) for value in values]
+    return sum(rows for rows, _ in volumes), sum(size for _, size in volumes)
+
+
+def _metric_name(name: str) -> str:
+    """Replaces the characters mlflow does not accept in metric names."""
+    return re.sub(r"[^0-9A-Za-z_\-./ ]", "_", name)
+
+
+def _peak_rss() -> float:
+    """Gets the peak resident set size of the process in MB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _current_rss() -> Optional[float]:
+    """Gets the resident set size of the process in MB, None without `/proc`."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as file:
+            pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / _MB
+
+
+class _RssSampler:
+    """Samples the resident set size in a daemon thread, keeping its maximum.
+
+    Allocations freed between two samples are missed, so the peak is a lower
+    bound of the true high-water mark.
+    """
+
+    def __init__(self, interval: float):
+        """Starts sampling, unless the RSS can not be read.
+
+        Args:
+            interval (float): Seconds between two samples.
+        """
+        self._interval = interval
+        self._stopped = threading.Event()
+        self.peak = _current_rss()
+        self._thread = threading.Thread(target=self._run, name="rss", daemon=True)
+        if self.peak is not None:
+            self._thread.start()
+
+    def _sample(self):
+        rss = _current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            self._sample()
+
+    def stop(self) -> Optional[float]:
+        """Stops sampling.
+
+        Returns:
+            Optional[float]: The peak RSS in MB, None if it can not be read.
+        """
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._sample()
+        return self.peak
+
+
+class ProfilingHooks:  # pylint: disable=too-many-instance-attributes
+    """Records the time, memory and data volume of every node.
+
+    The records are logged as metrics of the active mlflow run, prefixed with
+    `profile.<node>`, and written as a JSON report at the end of the run. The
+    peak RSS of each node is sampled from `/proc/self/statm` while it runs, or
+    is the high-water mark of the process when the node ends where `/proc` is
+    not available. The peak RSS of the whole process is recorded under
+    `PIPELINE`.
+    """
+
+    PIPELINE = "__pipeline__"
+    """Report entry of the measures of the whole run."""
+
+    def __init__(
+        self,
+        report_path: str = "data/08_reporting/profile.json",
+        trace_allocations: bool = False,
+        cprofile_dir: Optional[str] = None,
+        rss_interval: float = 0.01,
+    ):
+        """Initializes the hooks.
+
+        Args:
+            report_path (str): Where the JSON report is written.
+            trace_allocations (bool): Whether python allocations are traced
+                with `tracemalloc`, which slows down every allocation.
+                Defaults to False.
+            cprofile_dir (Optional[str]): Where a `cProfile` dump of every node
+                is written. Defaults to None, which disables `cProfile`.
+            rss_interval (float): Seconds between two samples of the RSS of a
+                running node. Defaults to 0.01.
+        """
+        self._report_path = Path(report_path)
+        self._trace_allocations = trace_allocations
+        self._cprofile_dir = Path(cprofile_dir) if cprofile_dir else None
+        self._rss_interval = rss_interval
+        self._rss: Dict[str, _RssSampler] = {}
+        self._report: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._producers: Dict[str, str] = {}
+        self._io_started: Dict[str, float] = {}
+        self._load_times: Dict[str, float] = {}
+        self._node_started: Dict[str, Tuple[float, float, int]] = {}
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._started_tracing = False
+
+    def _log(self, node_name: str, metrics: Dict[str, float]):
+        """Adds metrics to the report and logs them to the active mlflow run."""
+        self._report[node_name].update(metrics)
+        if mlflow.active_run():
+            prefix = (
+                "profile"
+                if node_name == self.PIPELINE
+                else f"profile.{_metric_name(node_name)}"
+            )
+            mlflow.log_metrics({f"{prefix}.{k}": v for k, v in metrics.items()})
+
+    @hook_impl
+    def before_pipeline_run(self, pipeline: Pipeline):
+        """Maps the datasets to the nodes that save them."""
+        self._report.clear()
+        self._producers = {
+            output: node.name for node in pipeline.nodes for output in node.outputs
+        }
+        if self._trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @hook_impl
+    def before_dataset_loaded(self, dataset_name: str):
+        """Starts timing the dataset load."""
+        self._io_started[dataset_name] = time.perf_counter()
+
+    @hook_impl
+    def after_dataset_loaded(self, dataset_name: str):
+        """Records the dataset load time for the node that is about to run."""
+        started = self._io_started.pop(dataset_name)
+        self._load_times[dataset_name] = time.perf_counter() - started
+
+    @hook_impl
+    def before_node_run(self, node: Node, inputs: Dict[str, Any]):
+        """Starts measuring the node."""
+        rows, size = _total_volume(inputs.values())
+        self._report[node.name].update(
+            load_time=sum(self._load_times.pop(name, 0.0) for name in node.inputs),
+            input_rows=rows,
+            input_mb=size / _MB,
+        )
+        allocated = 0
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            allocated = tracemalloc.get_traced_memory()[0]
+        if self._cprofile_dir:
+            self._profiles[node.name] = cProfile.Profile()
+            self._profiles[node.name].enable()
+        self._rss[node.name] = _RssSampler(self._rss_interval)
+        self._node_started[node.name] = (
+            time.perf_counter(),
+            time.process_time(),
+            allocated,
+        )
+
+    @hook_impl
+    def after_node_run(self, node: Node, outputs: Dict[str, Any]):
+        """Records the node measures."""
+        wall_started, cpu_started, allocated = self._node_started.pop(node.name)
+        wall_time = time.perf_counter() - wall_started
+        cpu_time = time.process_time() - cpu_started
+        peak_rss = self._rss.pop(node.name).stop()
+        profile = self._profiles.pop(node.name, None)
+        if profile and self._cprofile_dir:
+            profile.disable()
+            self._cprofile_dir.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(self._cprofile_dir / f"{_metric_name(node.name)}.prof")
+        rows, size = _total_volume(outputs.values())
+        input_rows = self._report[node.name]["input_rows"]
+        metrics = dict(
+            wall_time=wall_time,
+            cpu_time=cpu_time,
+            output_rows=rows,
+            output_mb=size / _MB,
+            rows_per_sec=input_rows / wall_time if wall_time else 0.0,
+            peak_rss_mb=_peak_rss() if peak_rss is None else peak_rss,
+        )
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            metrics.update(
+                alloc_delta_mb=(current - allocated) / _MB,
+                alloc_peak_mb=(peak - allocated) / _MB,
+            )
+        self._log(node.name, {**self._report[node.name], **metrics})
+
+    @hook_impl
+    def before_dataset_saved(self, dataset_name: str):
+        """Starts timing the dataset save."""
+        self._io_started[dataset_name] = time.perf_counter()
+
+    @hook_impl
+    def after_dataset_saved(self, dataset_name: str):
+        """Records the dataset save time in the node that produced it."""
+        elapsed = time.perf_counter() - self._io_started.pop(dataset_name)
+        node_name = self._producers.get(dataset_name)
+        if node_name:
+            save_time = self._report[node_name].get("save_time", 0.0) + elapsed
+            self._log(node_name, {"save_time": save_time})
+
+    @hook_impl
+    def after_pipeline_run(self):
+        """Writes the JSON report."""
+        self._log(self.PIPELINE, {"peak_rss_mb": _peak_rss()})
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._report_path.parent.mkdir(parents=True, exist_ok=True)
+        self._report_path.write_text(
+            json.dumps(self._report, indent=2), encoding="utf-8"
+        )
@@ -0,0 +1,355 @@
+"""Load generator for the scoring API.
+
+Sends synthetic `Booking` batches to a running scoring server, or to one
+started locally against a model trained on the fly and registered in a
+sqlite backed mlflow registry, so capacity tests run fully offline.
+
+Two traffic models are supported:
+
+* `closed`: `concurrency` clients send a request as soon as their previous one
+  is answered, measuring the throughput the server sustains.
+* `open`: requests start at a fixed `rate` regardless of the answers, measuring
+  the latency at a given load. Latencies are measured from the scheduled start,
+  so a slow server is not hidden by fewer requests being sent.
+"""
+import asyncio
+import contextlib
+import json
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import aiohttp
+import click
+import numpy as np
+import pandas as pd
+from kedro.config import TemplatedConfigLoader
+
+from .pipelines.data_engineering.nodes import preprocess_bookings
+from .pipelines.scoring.nodes import Booking
+
+PERCENTILES = (50, 95, 99, 99.9)
+_MODEL_NAME = "loadtest"
+
+
+def synthetic_bookings(
+    n: int, mappings: Dict[str, Dict[str, int]], seed: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Generates random valid `Booking` payloads.
+
+    Args:
+        n (int): Number of bookings.
+        mappings (Dict[str, Dict[str, int]]): The preprocessing `columns_to_map`,
+            whose keys are the valid values of the categorical fields.
+        seed (Optional[int]): Seed of the generator.
+
+    Returns:
+        List[Dict[str, Any]]: The bookings.
+
+    Example:
+        >>> bookings = synthetic_bookings(2, {"hotel": {"City Hotel": 1}}, seed=0)
+        >>> [booking["hotel"] for booking in bookings]
+        ['City Hotel', 'City Hotel']
+    """
+    rng = np.random.default_rng(seed)
+    example = Booking.Config.schema_extra["example"]
+    start = date(2015, 1, 1)
+    columns: Dict[str, Any] = {}
+    for name, field_ in Booking.__fields__.items():
+        if name in mappings:
+            columns[name] = rng.choice(list(mappings[name]), n)
+        elif field_.type_ is str:
+            columns[name] = np.repeat(example[name], n)
+        elif field_.type_ is date:
+            days = rng.integers(0, 3 * 365, n)
+            columns[name] = [str(start + timedelta(days=int(day))) for day in days]
+        elif field_.type_ is int:
+            columns[name] = rng.integers(0, 10, n)
+        else:
+            columns[name] = rng.gamma(2.0, 50.0, n).round(2)
+    # Bookings without guests are removed by the preprocessing
+    columns["adults"] = rng.integers(1, 4, n)
+    return pd.DataFrame(columns).to_dict("records")
+
+
+@dataclass
+class LoadResult:
+    """Outcome of a load test."""
+
+    batch_size: int
+    """Number of bookings per request."""
+    latencies: List[float] = field(default_factory=list)
+    """Latency in seconds of each answered request."""
+    errors: int = 0
+    """Number of failed requests."""
+    duration: float = 0.0
+    """Elapsed seconds of the test."""
+
+    def summary(self) -> Dict[str, float]:
+        """Summarizes the throughput, latency and errors.
+
+        Returns:
+            Dict[str, float]: The summary.
+
+        Example:
+            >>> result = LoadResult(batch_size=10, latencies=[0.1, 0.3], errors=2,
+            ...                     duration=2.0)
+            >>> summary = result.summary()
+            >>> summary["requests_per_sec"], summary["error_rate"], summary["p50_ms"]
+            (2.0, 0.5, 200.0)
+        """
+        requests = len(self.latencies) + self.errors
+        duration = self.duration or float("nan")
+        latencies = np.array(self.latencies or [np.nan]) * 1000
+        summary = {
+            "requests": float(requests),
+            "requests_per_sec": requests / duration,
+            "bookings_per_sec": len(self.latencies) * self.batch_size / duration,
+            "error_rate": self.errors / requests if requests else 0.0,
+        }
+        for percentile, value in zip(
+            PERCENTILES, np.percentile(latencies, PERCENTILES)
+        ):
+            summary[f"p{str(percentile).replace('.', '')}_ms"] = float(value)
+        return summary
+
+
+async def _send(
+    session: aiohttp.ClientSession,
+    url: str,
+    payload: bytes,
+    result: LoadResult,
+    started: float,
+):
+    """Sends a request, recording its latency since `started` or its failure.
+
+    Connection errors and timeouts count as failures rather than stopping the
+    load test.
+    """
+    try:
+        async with session.post(
+            url, data=payload, headers={"Content-Type": "application/json"}
+        ) as response:
+            await response.read()
+            if response.status != 200:
+                result.errors += 1
+                return
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        result.errors += 1
+        return
+    result.latencies.append(time.perf_counter() - started)
+
+
+async def closed_loop(
+    url: str, payloads: List[bytes], concurrency: int, duration: float
+) -> LoadResult:
+    """Sends requests from `concurrency` clients waiting for each answer.
+
+    Args:
+        url (str): The scoring endpoint.
+        payloads (List[bytes]): Request bodies, sent in turns.
+        concurrency (int): Number of clients.
+        duration (float): Seconds to send requests for.
+
+    Returns:
+        LoadResult: The latencies of the requests.
+    """
+    result = LoadResult(batch_size=0)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def client(offset: int):
+            sent = offset
+            while time.perf_counter() < deadline:
+                payload = payloads[sent % len(payloads)]
+                await _send(session, url, payload, result, time.perf_counter())
+                sent += concurrency
+
+        await asyncio.gather(*(client(i) for i in range(concurrency)))
+        result.duration = time.perf_counter() - start
+    return result
+
+
+async def open_loop(
+    url: str, payloads: List[bytes], rate: float, duration: float, concurrency: int
+) -> LoadResult:
+    """Starts requests at a fixed rate regardless of their answers.
+
+    Args:
+        url (str): The scoring endpoint.
+        payloads (List[bytes]): Request bodies, sent in turns.
+        rate (float): Requests started per second.
+        duration (float): Seconds to send requests for.
+        concurrency (int): Maximum number of open connections. Requests over it
+            wait for a connection, which counts in their latency.
+
+    Returns:
+        LoadResult: The latencies of the requests.
+    """
+    result = LoadResult(batch_size=0)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        tasks = []
+        for sent in range(int(rate * duration)):
+            scheduled = start + sent / rate
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            payload = payloads[sent % len(payloads)]
+            tasks.append(
+                asyncio.create_task(_send(session, url, payload, result, scheduled))
+            )
+        await asyncio.gather(*tasks)
+        result.duration = time.perf_counter() - start
+    return result
+
+
+def _train_model(parameters: Dict[str, Any], rows: int, seed: int):
+    """Trains a small model over synthetic bookings."""
+    # pylint: disable=import-outside-toplevel
+    from catboost import CatBoostClassifier  # type: ignore
+
+    preprocessing = parameters["preprocessing"]
+    target = preprocessing["target"]
+    df = pd.DataFrame(
+        synthetic_bookings(rows, preprocessing.get("columns_to_map", {}), seed)
+    )
+    df[target] = np.random.default_rng(seed).integers(0, 2, len(df))
+    df = preprocess_bookings(df, preprocessing)
+    model = CatBoostClassifier(iterations=50, verbose=False, allow_writing_files=False)
+    return model.fit(df.drop(columns=target), df[target])
+
+
+@contextlib.contextmanager
+def local_server(
+    parameters: Dict[str, Any], port: int, rows: int = 1000, seed: int = 0
+) -> Iterator[str]:
+    """Starts a scoring server against a locally trained and registered model.
+
+    The model is registered in a temporary sqlite backed registry and
+    transitioned to `Production`, then served by uvicorn in a thread.
+
+    Args:
+        parameters (Dict[str, Any]): The project parameters.
+        port (int): Port of the server.
+        rows (int): Number of synthetic bookings to train on.
+        seed (int): Seed of the synthetic bookings.
+
+    Yields:
+        str: The scoring endpoint.
+    """
+    # pylint: disable=import-outside-toplevel
+    import mlflow  # type: ignore
+    import uvicorn
+
+    from .pipelines.scoring import MlflowModelLoaderDataSet
+    from .pipelines.scoring.nodes import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mlflow.set_tracking_uri(Path(tmp, "mlruns").as_uri())
+        mlflow.set_registry_uri(f"sqlite:///{Path(tmp, 'mlflow.db').as_posix()}")
+        with mlflow.start_run():
+            info = mlflow.catboost.log_model(
+                _train_model(parameters, rows, seed),
+                artifact_path="model",
+                registered_model_name=_MODEL_NAME,
+            )
+        version = info.registered_model_version
+        mlflow.MlflowClient().transition_model_version_stage(
+            _MODEL_NAME, version, "Production"
+        )
+        dataset = MlflowModelLoaderDataSet(
+            model=_MODEL_NAME, flavor="mlflow.catboost", stage="production"
+        )
+        app = create_app(
+            dataset.load(), parameters["preprocessing"], parameters["scoring"]
+        )
+        server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        )
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            if not thread.is_alive():
+                raise click.ClickException(f"Scoring server failed on port {port}")
+            time.sleep(0.05)
+        try:
+            yield f"http://127.0.0.1:{port}/"
+        finally:
+            server.should_exit = True
+            thread.join()
+
+
+@click.command()
+@click.option("--url", default="http://localhost:8000/", help="Scoring endpoint.")
+@click.option(
+    "--serve", is_flag=True, help="Start a server with a locally trained model."
+)
+@click.option("--port", default=8765, help="Port of the server started by --serve.")
+@click.option(
+    "--mode", type=click.Choice(["closed", "open"]), default="closed", show_default=True
+)
+@click.option(
+    "--batch-size",
+    "batch_sizes",
+    multiple=True,
+    type=int,
+    default=[1],
+    help="Bookings per request. Repeat to test several sizes.",
+)
+@click.option("--concurrency", default=8, show_default=True)
+@click.option("--rate", default=50.0, show_default=True, help="Requests/s (open).")
+@click.option("--duration", default=10.0, show_default=True, help="Seconds per run.")
+@click.option("--seed", default=0, show_default=True)
+@click.option("--conf-source", default="conf", show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False), help="JSON report file.")
+def main(  # pylint: disable=too-many-arguments,too-many-locals
+    url: str,
+    serve: bool,
+    port: int,
+    mode: str,
+    batch_sizes: List[int],
+    concurrency: int,
+    rate: float,
+    duration: float,
+    seed: int,
+    conf_source: str,
+    output: Optional[str],
+):
+    """Load tests the scoring API with synthetic bookings."""
+    parameters = TemplatedConfigLoader(conf_source).get("parameters*", "parameters*/**")
+    mappings = parameters["preprocessing"].get("columns_to_map", {})
+    server = (
+        local_server(parameters, port, seed=seed)
+        if serve
+        else contextlib.nullcontext(url)
+    )
+    with server as endpoint:
+        report = {}
+        for batch_size in batch_sizes:
+            payloads = [
+                json.dumps(synthetic_bookings(batch_size, mappings, seed + i)).encode()
+                for i in range(16)
+            ]
+            if mode == "closed":
+                run = closed_loop(endpoint, payloads, concurrency, duration)
+            else:
+                run = open_loop(endpoint, payloads, rate, duration, concurrency)
+            result = asyncio.run(run)
+            result.batch_size = batch_size
+            report[batch_size] = summary = result.summary()
+            click.echo(
+                f"batch={batch_size} "
+                + " ".join(f"{key}={value:.2f}" for key, value in summary.items())
+            )
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -1,21 +1,76 @@
 """Project pipelines."""
-from typing import Dict
+import importlib
+from typing import Callable, Dict, Iterator, Mapping
 
 from kedro.pipeline import Pipeline
 
-from .pipelines import data_engineering, data_science, scoring
 
+def _factory(package: str, name: str = "create_pipeline") -> Callable[[], Pipeline]:
+    """Gets a factory importing the pipeline package only when called.
 
-def register_pipelines() -> Dict[str, Pipeline]:
+    Args:
+        package (str): The pipeline package, relative to `pipelines`.
+        name (str): The pipeline factory function of the package.
+
+    Returns:
+        Callable[[], Pipeline]: The pipeline factory.
+    """
+
+    def create() -> Pipeline:
+        module = importlib.import_module(f"{__package__}.pipelines.{package}")
+        return getattr(module, name)()
+
+    return create
+
+
+class LazyPipelines(Mapping[str, Pipeline]):
+    """Pipelines created, along with the imports of their nodes, on first access.
+
+    Example:
+        >>> pipelines = LazyPipelines({"empty": lambda: Pipeline([])})
+        >>> list(pipelines), pipelines._pipelines
+        (['empty'], {})
+        >>> pipelines["empty"].nodes
+        []
+    """
+
+    def __init__(self, factories: Dict[str, Callable[[], Pipeline]]):
+        """Initializes the registry.
+
+        Args:
+            factories (Dict[str, Callable[[], Pipeline]]): The pipeline factories.
+        """
+        self._factories = factories
+        self._pipelines: Dict[str, Pipeline] = {}
+
+    def __getitem__(self, name: str) -> Pipeline:
+        if name not in self._pipelines:
+            self._pipelines[name] = self._factories[name]()
+        return self._pipelines[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
+
+
+def register_pipelines() -> Mapping[str, Pipeline]:
     """Register the project's pipelines.
 
+    Pipelines are created on access, so running one of them does not import the
+    dependencies of the others' nodes.
+
     Returns:
         A mapping from a pipeline name to a ``Pipeline`` object.
     """
-    pipelines = {
-        "de": data_engineering.create_pipeline(),
-        "ds": data_science.create_pipeline(),
-        "scoring": scoring.create_pipeline(),
-    }
-    pipelines["__default__"] = pipelines["de"] + pipelines["ds"]
+    pipelines = LazyPipelines(
+        {
+            "de": _factory("data_engineering"),
+            "ds": _factory("data_science"),
+            "retrain": _factory("data_science", "create_retrain_pipeline"),
+            "scoring": _factory("scoring"),
+            "__default__": lambda: pipelines["de"] + pipelines["ds"],
+        }
+    )
     return pipelines
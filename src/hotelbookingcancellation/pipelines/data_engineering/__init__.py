@@ -2,9 +2,18 @@
 This is a boilerplate pipeline 'data_engineering'
 generated using Kedro 0.18.2
 """
+import importlib
 
-from .pipeline import create_pipeline
+from .parquet_dataset import LayoutParquetDataSet, Partitions
+from .watermark_dataset import WatermarkDataSet
 
 __all__ = ["create_pipeline"]
 
 __version__ = "0.1"
+
+
+def __getattr__(name: str):
+    """Imports the pipeline factories, and so the nodes dependencies, on use."""
+    if name in __all__:
+        return getattr(importlib.import_module(".pipeline", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,125 @@
+"""Hash partitioning of bookings for deduplicating inputs larger than memory."""
+import itertools
+import tempfile
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+HASH = "__hash"
+"""Column of the row hashes in the partitions."""
+
+
+def row_hashes(df: pd.DataFrame, columns: Optional[List[str]] = None) -> np.ndarray:
+    """Hashes the rows, vectorized over every column.
+
+    Numeric and boolean columns are hashed as float64 and the others as
+    objects, so equal rows hash the same whatever dtypes were inferred for
+    their chunk, e.g. a column read as int64 in a chunk without missing values
+    and as float64 in another.
+
+    Args:
+        df (pd.DataFrame): The rows.
+        columns (Optional[List[str]]): The columns hashed. All if None.
+
+    Returns:
+        np.ndarray: The uint64 hash of each row, the same for equal rows.
+
+    Example:
+        >>> df = pd.DataFrame({"a": [1, 2, 1], "b": ["x", "y", "x"]})
+        >>> hashes = row_hashes(df)
+        >>> bool(hashes[0] == hashes[2]), bool(hashes[0] == hashes[1])
+        (True, False)
+    """
+    df = df if columns is None else df[columns]
+    return pd.util.hash_pandas_object(
+        df.astype(
+            {
+                column: "float64"
+                if pd.api.types.is_numeric_dtype(dtype)
+                or pd.api.types.is_bool_dtype(dtype)
+                else "object"
+                for column, dtype in df.dtypes.items()
+            }
+        ),
+        index=False,
+    ).to_numpy()
+
+
+class HashPartitions:
+    """Rows kept in memory up to `max_rows`, then spilled to disk by hash.
+
+    Equal rows have equal hashes, so once spilled every copy of a row is in the
+    same partition, and the partitions can be deduplicated one at a time with
+    the memory of a single partition.
+    """
+
+    def __init__(
+        self, max_rows: int, partitions: int = 64, directory: Optional[str] = None
+    ):
+        """Initializes the partitions.
+
+        Args:
+            max_rows (int): Number of rows kept in memory before spilling.
+            partitions (int): Number of partitions on disk.
+            directory (Optional[str]): Where the partitions are spilled. The
+                system temporary directory if None.
+        """
+        self._max_rows = max_rows
+        self._partitions = partitions
+        self._directory = directory
+        self._spill: Optional[tempfile.TemporaryDirectory] = None
+        self._buffer: List[pd.DataFrame] = []
+        self._rows = 0
+        self._files = itertools.count()
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the rows were spilled to disk."""
+        return self._spill is not None
+
+    def add(self, df: pd.DataFrame, hashes: np.ndarray):
+        """Adds rows, spilling every row to disk once above `max_rows`.
+
+        Args:
+            df (pd.DataFrame): The rows.
+            hashes (np.ndarray): The hash of each row.
+        """
+        self._buffer.append(df.assign(**{HASH: hashes}))
+        self._rows += len(df)
+        if self._rows > self._max_rows:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryDirectory(dir=self._directory)
+            for buffered in self._buffer:
+                self._write(buffered)
+            self._buffer = []
+
+    def _write(self, df: pd.DataFrame):
+        """Appends rows to the files of their partitions."""
+        buckets = df[HASH].to_numpy() % np.uint64(self._partitions)
+        for bucket, part in df.groupby(buckets, sort=False):
+            path = Path(self._spill.name, str(bucket))  # type: ignore
+            path.mkdir(exist_ok=True)
+            part.to_pickle(path / f"{next(self._files)}.pkl")
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        """Iterates over the partitions, with their `HASH` column.
+
+        The rows of a partition are in the order they were added.
+        """
+        if self._spill is None:
+            if self._buffer:
+                yield pd.concat(self._buffer)
+            return
+        for path in sorted(Path(self._spill.name).iterdir()):
+            files = sorted(path.iterdir(), key=lambda file: int(file.stem))
+            yield pd.concat(pd.read_pickle(file) for file in files)
+
+    def __enter__(self) -> "HashPartitions":
+        return self
+
+    def __exit__(self, *_):
+        self._buffer = []
+        if self._spill is not None:
+            self._spill.cleanup()
@@ -1,11 +1,31 @@
 """Contains the functions related to the raw data refinement step."""
+import hashlib
+import json
+import logging
 from functools import reduce
-from typing import Any, Callable, Dict, List, Literal, Optional, TypedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    TypedDict,
+    Union,
+)
 
 import numpy as np
 import pandas as pd
 from pandas.api import types
 
+from .deduplication import HASH, HashPartitions, row_hashes
+from .parquet_dataset import Partitions
+
+logger = logging.getLogger(__name__)
+
 
 def remove_if_all_equal(df: pd.DataFrame, columns: List[str], value: Any):
     """Removes all rows where all specified columns contain zero.
@@ -135,6 +155,33 @@ def fillna(df: pd.DataFrame, columns: Dict[str, Literal["mean", "median"]]):
     return df
 
 
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Narrows the numeric columns to float32 and at most int32.
+
+    CatBoost stores its features as float32, so the narrower floats do not
+    change the model. The widths do not depend on the values, so every batch
+    and partition gets the same schema.
+
+    Args:
+        df (pd.DataFrame): The dataframe to compact.
+
+    Returns:
+        pd.DataFrame: The dataframe with compact columns.
+
+    Example:
+        >>> df = pd.DataFrame({"a": [0.5], "b": [1], "c": np.int8(1), "d": ["x"]})
+        >>> compact_dtypes(df).dtypes.tolist()
+        [dtype('float32'), dtype('int32'), dtype('int8'), dtype('O')]
+    """
+    dtypes = {}
+    for col, dtype in df.dtypes.items():
+        if types.is_float_dtype(dtype) and dtype.itemsize > 4:
+            dtypes[col] = np.float32
+        elif types.is_signed_integer_dtype(dtype) and dtype.itemsize > 4:
+            dtypes[col] = np.int32
+    return df.astype(dtypes)
+
+
 class _ColumnsToRemove(TypedDict):
     """The columns to validate."""
 
@@ -162,6 +209,119 @@ class _PreprocessBookingsParams(TypedDict, total=False):
     selected."""
     columns_to_fillna: Dict[str, Literal["mean", "median"]]
     """Columns to fill missing values with `fillna`."""
+    compact_dtypes: bool
+    """Whether the features are narrowed with `compact_dtypes`."""
+    weight: str
+    """Sample weight column, kept as is when present."""
+
+
+class _DeduplicationParams(TypedDict, total=False):
+    enabled: bool
+    """Whether the duplicate bookings are removed."""
+    weight: Optional[str]
+    """Column counting the copies of each kept booking. None to drop the
+    duplicates without weights."""
+    columns: Optional[List[str]]
+    """Columns compared. If None, all columns are compared."""
+    dtypes: Dict[str, str]
+    """Dtypes the chunks are cast to, for the columns whose inferred dtype may
+    differ between chunks beyond int and float, e.g. a text column without any
+    value in a chunk."""
+    max_memory_rows: int
+    """Number of bookings deduplicated in memory, above which they are spilled
+    to disk partitioned by hash."""
+    partitions: int
+    """Number of disk partitions."""
+    spill_dir: Optional[str]
+    """Where the partitions are spilled. The temporary directory if None."""
+
+
+_ROW = "__row"
+
+
+def deduplicate_bookings(
+    bookings: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    params: _DeduplicationParams,
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Removes the exact duplicate bookings, or collapses them into weights.
+
+    Rows are matched by a vectorized 64 bit hash of their values, with numeric
+    columns hashed as float64 so chunks inferred as int or float match. Bookings
+    are kept in memory up to `max_memory_rows`, then spilled to disk partitions
+    by hash, so every copy of a booking lands in the same partition and only one
+    partition is in memory at a time. The first copy of each booking is kept,
+    in the input order, and the unique bookings are gathered in memory, so only
+    the duplicates may exceed it.
+
+    Args:
+        bookings (Union[pd.DataFrame, Iterable[pd.DataFrame]]): The raw
+            bookings, or chunks of them, e.g. from `load_args: {chunksize}`.
+        params (_DeduplicationParams): The deduplication params.
+
+    Returns:
+        Tuple[pd.DataFrame, Dict[str, Any]]:
+            0. The unique bookings, with their number of copies in the `weight`
+                column if set.
+            1. The duplicate statistics.
+
+    Example:
+        >>> df = pd.DataFrame({"a": [1, 2, 1, 1], "b": ["x", "y", "x", "z"]})
+        >>> unique, stats = deduplicate_bookings(df, {"weight": "weight"})
+        >>> unique
+           a  b  weight
+        0  1  x       2
+        1  2  y       1
+        3  1  z       1
+        >>> stats["duplicates"], stats["max_copies"]
+        (1, 2)
+    """
+    chunks = [bookings] if isinstance(bookings, pd.DataFrame) else bookings
+    if not params.get("enabled", True):
+        df = pd.concat(chunks)
+        return df, {"rows": len(df), "enabled": False}
+    weight = params.get("weight")
+    columns = params.get("columns")
+    dtypes = params.get("dtypes", {})
+    rows, kept, max_copies = 0, [], 0
+    partitions = HashPartitions(
+        params.get("max_memory_rows", 1_000_000),
+        params.get("partitions", 64),
+        params.get("spill_dir"),
+    )
+    with partitions:
+        for chunk in chunks:
+            chunk = chunk.astype(dtypes)
+            hashes = row_hashes(chunk, columns)
+            partitions.add(
+                chunk.assign(**{_ROW: np.arange(rows, rows + len(chunk))}), hashes
+            )
+            rows += len(chunk)
+        for part in partitions:
+            copies = part[HASH].value_counts()
+            max_copies = max(max_copies, int(copies.max()) if len(copies) else 0)
+            unique = part[~part[HASH].duplicated()]
+            if weight:
+                unique = unique.assign(
+                    **{weight: unique[HASH].map(copies).astype("int32")}
+                )
+            kept.append(unique)
+        spilled = partitions.spilled
+    df = pd.concat(kept).sort_values(_ROW).drop(columns=[_ROW, HASH])
+    stats = {
+        "rows": rows,
+        "unique": len(df),
+        "duplicates": rows - len(df),
+        "duplicate_rate": (rows - len(df)) / rows if rows else 0.0,
+        "max_copies": max_copies,
+        "spilled": spilled,
+    }
+    logger.info(
+        "Removed %d duplicates of %d bookings (%.2f%%)",
+        stats["duplicates"],
+        rows,
+        stats["duplicate_rate"] * 100,
+    )
+    return df, stats
 
 
 def preprocess_bookings(df: pd.DataFrame, params: _PreprocessBookingsParams):
@@ -172,6 +332,7 @@ def preprocess_bookings(df: pd.DataFrame, params: _PreprocessBookingsParams):
     3. Maps categorical columns.
     4. Normalize numeric columns.
     5. Fill missing values.
+    6. Narrows the numeric columns, if `compact_dtypes` is set.
 
     Args:
         df (pd.DataFrame): The raw `hotel_bookings` dataset.
@@ -190,12 +351,177 @@ def preprocess_bookings(df: pd.DataFrame, params: _PreprocessBookingsParams):
         )
     )
     target = df[params["target"]].astype("int8")
+    weight = params.get("weight")
+    weights = {weight: df[weight]} if weight in df.columns else {}
     df = (
-        df.drop(columns=[params["target"]])
+        df.drop(columns=[params["target"], *weights])
         .pipe(log_normalize, params.get("columns_to_normalize", None))
         .pipe(map_columns, params.get("columns_to_map", {}))
         .pipe(unpack_date, params["date_column"])
-        .assign(**{params["target"]: target})
+        .assign(**{params["target"]: target}, **weights)
         .pipe(fillna, params.get("columns_to_fillna", {}))
     )
+    if params.get("compact_dtypes", False):
+        df = compact_dtypes(df)
     return df
+
+
+class _IncrementalParams(TypedDict, total=False):
+    enabled: bool
+    """Whether only bookings newer than the watermark are preprocessed."""
+    freq: str
+    """Pandas period frequency of the partitions, e.g. 'D' or 'M'."""
+
+
+def _periods(df: pd.DataFrame, date_column: str, freq: str) -> pd.Series:
+    """Gets the partition period of each booking.
+
+    Args:
+        df (pd.DataFrame): The raw bookings.
+        date_column (str): The date column the partitions are based on.
+        freq (str): The period frequency.
+
+    Returns:
+        pd.Series: The period of each row.
+
+    Example:
+        >>> df = pd.DataFrame({"date": ["2020-01-01", "2020-02-03"]})
+        >>> _periods(df, "date", "M").astype(str).tolist()
+        ['2020-01', '2020-02']
+    """
+    return pd.to_datetime(df[date_column]).dt.to_period(freq)
+
+
+def _fingerprint(
+    preprocess_params: _PreprocessBookingsParams,
+    freq: str,
+    dedup_params: Optional[_DeduplicationParams] = None,
+) -> str:
+    """Hashes the parameters that define the preprocessed partitions.
+
+    Args:
+        preprocess_params (_PreprocessBookingsParams): The preprocessing params.
+        freq (str): The period frequency.
+        dedup_params (Optional[_DeduplicationParams]): The deduplication
+            params. Only the ones changing the kept rows and their columns are
+            hashed.
+
+    Returns:
+        str: The parameters fingerprint.
+    """
+    dedup = {
+        key: value
+        for key, value in (dedup_params or {}).items()
+        if key in ("enabled", "weight", "columns")
+    }
+    content = json.dumps(
+        {"preprocessing": preprocess_params, "freq": freq, "deduplication": dedup},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _since(
+    chunks: Iterable[pd.DataFrame], since: pd.Period, date_column: str, freq: str
+) -> Iterator[pd.DataFrame]:
+    """Lazily keeps the rows of each chunk from the `since` period onwards."""
+    for chunk in chunks:
+        yield chunk[_periods(chunk, date_column, freq) >= since]
+
+
+def select_new_bookings(
+    bookings: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+    watermark: Dict[str, str],
+    preprocess_params: _PreprocessBookingsParams,
+    params: _IncrementalParams,
+    dedup_params: Optional[_DeduplicationParams] = None,
+) -> Tuple[Union[pd.DataFrame, Iterator[pd.DataFrame]], Dict[str, Any]]:
+    """Selects the bookings that were not preprocessed yet.
+
+    Bookings from the watermark period onwards are selected, so the last period
+    is reprocessed with the rows that arrived after it was written. Every row is
+    selected when the incremental mode is disabled, when there is no watermark,
+    or when the preprocessing or deduplication parameters changed since it was
+    saved, and the watermark is then marked `full` so every saved partition is
+    replaced. Chunks, e.g. from `load_args: {chunksize}`, are selected lazily,
+    as they are deduplicated.
+
+    Args:
+        bookings (Union[pd.DataFrame, Iterable[pd.DataFrame]]): The raw
+            bookings, or chunks of them.
+        watermark (Dict[str, str]): The watermark of the last run.
+        preprocess_params (_PreprocessBookingsParams): The preprocessing params.
+        params (_IncrementalParams): The incremental preprocessing params.
+        dedup_params (Optional[_DeduplicationParams]): The deduplication params.
+
+    Returns:
+        Tuple[Union[pd.DataFrame, Iterator[pd.DataFrame]], Dict[str, Any]]:
+            0. The bookings to deduplicate and preprocess.
+            1. The watermark with the new fingerprint. Its period is updated
+                by `partition_bookings`.
+    """
+    freq = params.get("freq", "D")
+    date_column = preprocess_params["date_column"]
+    updated: Dict[str, Any] = {
+        "fingerprint": _fingerprint(preprocess_params, freq, dedup_params)
+    }
+    if (
+        params.get("enabled", True)
+        and watermark.get("fingerprint") == updated["fingerprint"]
+        and "period" in watermark
+    ):
+        since = pd.Period(watermark["period"], freq)
+        logger.info("Selecting the bookings since %s", watermark["period"])
+        updated["period"] = watermark["period"]
+        if isinstance(bookings, pd.DataFrame):
+            return bookings[_periods(bookings, date_column, freq) >= since], updated
+        return _since(bookings, since, date_column, freq), updated
+    logger.info("Selecting all the bookings")
+    updated["full"] = True
+    return bookings, updated
+
+
+def partition_bookings(
+    df: pd.DataFrame,
+    watermark: Dict[str, Any],
+    preprocess_params: _PreprocessBookingsParams,
+    params: _IncrementalParams,
+) -> Tuple[Partitions, Dict[str, str]]:
+    """Preprocesses the bookings and splits them into period partitions.
+
+    Every period found in the raw bookings gets a partition, even if all of its
+    rows were removed by the preprocessing, so stale partitions are overwritten.
+    After a `full` selection, the partitions are complete, so the ones of other
+    periods, e.g. of another `freq`, are deleted.
+
+    Args:
+        df (pd.DataFrame): The selected and deduplicated raw bookings.
+        watermark (Dict[str, Any]): The updated watermark. It is returned with
+            the last period of the bookings, or the previous one if there are
+            none, and without its `full` flag, so it is only saved after the
+            partitions.
+        preprocess_params (_PreprocessBookingsParams): The preprocessing params.
+        params (_IncrementalParams): The incremental preprocessing params.
+
+    Returns:
+        Tuple[Partitions, Dict[str, str]]:
+            0. The preprocessed partitions by period.
+            1. The updated watermark.
+    """
+    periods = _periods(df, preprocess_params["date_column"], params.get("freq", "D"))
+    watermark = watermark.copy()
+    if periods.notna().any():
+        watermark["period"] = str(periods.max())
+    periods = periods.astype(str)
+    preprocessed = preprocess_bookings(df, preprocess_params)
+    partitions = {
+        period: part.reset_index(drop=True)
+        for period, part in preprocessed.groupby(
+            periods.loc[preprocessed.index], sort=False
+        )
+    }
+    for period in periods.unique():
+        partitions.setdefault(period, preprocessed.iloc[0:0])
+    complete = bool(watermark.pop("full", False))
+    return Partitions(partitions, complete), watermark
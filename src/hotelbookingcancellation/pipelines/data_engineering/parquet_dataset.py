@@ -0,0 +1,192 @@
+"""DataSet for Parquet files and hive partitioned directories with a tuned layout."""
+import re
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa  # type: ignore
+import pyarrow.dataset as ds  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
+from kedro.extras.datasets.pandas import ParquetDataSet
+from kedro.io.core import DataSetError, get_filepath_str
+
+
+def _restore_partition(series: pd.Series, dtype: Optional[str] = None) -> pd.Series:
+    """Converts a hive partition column, loaded as categorical, to its values.
+
+    Args:
+        series (pd.Series): The categorical partition column.
+        dtype (Optional[str]): The dtype of the column when it was saved. The
+            dtype inferred from the values if None.
+
+    Returns:
+        pd.Series: The values of the column.
+
+    Example:
+        >>> _restore_partition(pd.Series(["1", "0", "1"], dtype="category"))
+        0    1
+        1    0
+        2    1
+        dtype: int64
+    """
+    categories = series.cat.categories
+    if categories.dtype == object:
+        try:
+            categories = pd.Index(pd.to_numeric(categories))
+        except ValueError:
+            pass
+    values = categories.to_numpy()[series.cat.codes.to_numpy()]
+    restored = pd.Series(values, index=series.index, name=series.name)
+    if dtype is not None and categories.dtype.kind in "iuf":
+        restored = restored.astype(dtype)
+    return restored
+
+
+def _file_key(key: str) -> str:
+    """Replaces the characters of a partition key that are unsafe in file names.
+
+    Example:
+        >>> _file_key("2017-01-02/2017-01-08")
+        '2017-01-02_2017-01-08'
+    """
+    return re.sub(r"[^0-9A-Za-z_.-]", "_", str(key))
+
+
+class Partitions(Dict[str, pd.DataFrame]):
+    """Dataframes by partition key, optionally replacing every saved partition."""
+
+    def __init__(self, partitions: Dict[str, pd.DataFrame], complete: bool = False):
+        """Initializes the partitions.
+
+        Args:
+            partitions (Dict[str, pd.DataFrame]): The dataframes by key.
+            complete (bool): Whether these are all the partitions, so the
+                partitions of other keys are deleted when saved.
+        """
+        super().__init__(partitions)
+        self.complete = complete
+
+
+class LayoutParquetDataSet(ParquetDataSet):
+    """Parquet dataset with a configurable layout, for pushdown on load.
+
+    Save args, on top of the `pyarrow` Parquet writer options such as
+    `compression`, `compression_level` and `use_dictionary`:
+
+    * `partition_cols`: columns of a hive partitioned directory, e.g.
+      `hotel=1/year=2017/part-0.parquet`.
+    * `sort_by`: columns the rows are sorted by, so the row group statistics
+      let the filters skip most row groups.
+    * `row_group_size`: number of rows of each row group.
+
+    A dataframe replaces the whole directory. A dict of dataframes is saved
+    into the same partitioned directory, each one replacing the files of its
+    key only, so incremental runs can rewrite some periods. Characters of the
+    keys that are unsafe in file names, e.g. the `/` of weekly periods, are
+    replaced by `_`. Complete `Partitions` replace the whole directory too.
+
+    Load args are passed to `pyarrow.parquet.read_table`: `columns` only reads
+    those columns and `filters` skips the partitions and row groups whose
+    values can not match. Partition columns are loaded with their saved dtype,
+    in their saved position.
+    """
+
+    DEFAULT_SAVE_ARGS: Dict[str, Any] = {"compression": "zstd"}
+
+    def __init__(self, filepath: str, **kwargs: Any):
+        """Initializes the dataset.
+
+        Args:
+            filepath (str): The Parquet file, or directory if partitioned.
+            **kwargs: The `ParquetDataSet` arguments.
+        """
+        super().__init__(filepath, **kwargs)
+        self._partition_cols: List[str] = self._save_args.pop("partition_cols", [])
+        self._sort_by: List[str] = self._save_args.pop("sort_by", [])
+        self._row_group_size: Optional[int] = self._save_args.pop(
+            "row_group_size", None
+        )
+
+    def _describe(self) -> Dict[str, Any]:
+        return {
+            **super()._describe(),
+            "partition_cols": self._partition_cols,
+            "sort_by": self._sort_by,
+            "row_group_size": self._row_group_size,
+        }
+
+    def _load(self) -> pd.DataFrame:
+        load_path = get_filepath_str(self._get_load_path(), self._protocol)
+        table = pq.read_table(load_path, filesystem=self._fs, **self._load_args)
+        df = table.to_pandas()
+        if not self._partition_cols:
+            return df
+        saved = {
+            column["name"]: column["numpy_type"]
+            for column in (table.schema.pandas_metadata or {}).get("columns", [])
+        }
+        for column in self._partition_cols:
+            if column in df.columns and isinstance(
+                df[column].dtype, pd.CategoricalDtype
+            ):
+                df[column] = _restore_partition(df[column], saved.get(column))
+        order = [column for column in saved if column in df.columns]
+        return df[order + [column for column in df.columns if column not in saved]]
+
+    def _table(self, data: pd.DataFrame) -> pa.Table:
+        """Converts the rows to an Arrow table, sorted by `sort_by`."""
+        if self._sort_by:
+            data = data.sort_values(self._sort_by, kind="stable")
+        return pa.Table.from_pandas(data, preserve_index=False)
+
+    def _write_partitioned(
+        self, save_path: str, data: pd.DataFrame, basename: str, behavior: str
+    ):
+        """Writes the rows into the hive partitioned directory."""
+        table = self._table(data)
+        schema = pa.schema([table.schema.field(col) for col in self._partition_cols])
+        parquet = ds.ParquetFileFormat()
+        ds.write_dataset(
+            table,
+            save_path,
+            format=parquet,
+            file_options=parquet.make_write_options(**self._save_args),
+            partitioning=ds.partitioning(schema, flavor="hive"),
+            basename_template=basename,
+            filesystem=self._fs,
+            existing_data_behavior=behavior,
+            min_rows_per_group=self._row_group_size or 0,
+            max_rows_per_group=self._row_group_size or 1 << 20,
+            # Keeps the rows of each file in the `sort_by` order
+            use_threads=not self._sort_by,
+        )
+
+    def _save(self, data: Union[pd.DataFrame, Dict[str, pd.DataFrame]]):
+        save_path = get_filepath_str(self._get_save_path(), self._protocol)
+        if isinstance(data, dict):
+            if not self._partition_cols:
+                raise DataSetError("Saving a dict requires `partition_cols`")
+            if getattr(data, "complete", False) and self._fs.exists(save_path):
+                self._fs.rm(save_path, recursive=True)
+            for key, part in data.items():
+                key = _file_key(key)
+                for stale in self._fs.glob(f"{save_path}/**/{key}-*.parquet"):
+                    self._fs.rm(stale)
+                if len(part):
+                    self._write_partitioned(
+                        save_path, part, f"{key}-{{i}}.parquet", "overwrite_or_ignore"
+                    )
+        elif self._partition_cols:
+            if self._fs.exists(save_path):
+                self._fs.rm(save_path, recursive=True)
+            self._write_partitioned(
+                save_path, data, "part-{i}.parquet", "overwrite_or_ignore"
+            )
+        else:
+            with self._fs.open(save_path, mode="wb") as file:
+                pq.write_table(
+                    self._table(data),
+                    file,
+                    row_group_size=self._row_group_size,
+                    **self._save_args,
+                )
+        self._invalidate_cache()
@@ -5,7 +5,7 @@ generated using Kedro 0.18.2
 
 from kedro.pipeline import Pipeline, node, pipeline
 
-from .nodes import preprocess_bookings
+from .nodes import deduplicate_bookings, partition_bookings, select_new_bookings
 
 
 def create_pipeline() -> Pipeline:
@@ -13,9 +13,36 @@ def create_pipeline() -> Pipeline:
     return pipeline(
         [
             node(
-                func=preprocess_bookings,
-                inputs=["hotel_bookings", "params:preprocessing"],
-                outputs="preprocessed_hotel_bookings",
-            )
+                func=select_new_bookings,
+                inputs=[
+                    "hotel_bookings",
+                    "preprocessing_watermark",
+                    "params:preprocessing",
+                    "params:incremental",
+                    "params:deduplication",
+                ],
+                outputs=["selected_hotel_bookings", "new_preprocessing_watermark"],
+                name="select_new_bookings",
+            ),
+            node(
+                func=deduplicate_bookings,
+                inputs=["selected_hotel_bookings", "params:deduplication"],
+                outputs=["deduplicated_hotel_bookings", "duplicate_stats"],
+                name="deduplicate_bookings",
+            ),
+            node(
+                func=partition_bookings,
+                inputs=[
+                    "deduplicated_hotel_bookings",
+                    "new_preprocessing_watermark",
+                    "params:preprocessing",
+                    "params:incremental",
+                ],
+                outputs=[
+                    "preprocessed_hotel_bookings@partitions",
+                    "updated_preprocessing_watermark",
+                ],
+                name="preprocess_bookings",
+            ),
         ]
     )
@@ -0,0 +1,19 @@
+"""DataSet for persisting the incremental preprocessing watermark."""
+from typing import Any, Dict
+
+from kedro.extras.datasets.json import JSONDataSet
+
+
+class WatermarkDataSet(JSONDataSet):
+    """JSON dataset that loads an empty watermark before the first save."""
+
+    def _load(self) -> Dict[str, Any]:
+        """Loads the watermark.
+
+        Returns:
+            Dict[str, Any]: The saved watermark, or an empty one if nothing was
+                saved yet.
+        """
+        if not self._exists():
+            return {}
+        return super()._load()
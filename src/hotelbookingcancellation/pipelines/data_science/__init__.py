@@ -2,9 +2,18 @@
 This is a boilerplate pipeline 'data_science'
 generated using Kedro 0.18.2
 """
+import importlib
 
-from .pipeline import create_pipeline
+from .mlflow_batch_metrics_dataset import MlflowBatchMetricsDataSet
+from .optional_dataset import OptionalDataSet
 
-__all__ = ["create_pipeline"]
+__all__ = ["create_pipeline", "create_retrain_pipeline"]
 
 __version__ = "0.1"
+
+
+def __getattr__(name: str):
+    """Imports the pipeline factories, and so the nodes dependencies, on use."""
+    if name in __all__:
+        return getattr(importlib.import_module(".pipeline", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
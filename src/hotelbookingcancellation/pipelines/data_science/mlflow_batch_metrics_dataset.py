@@ -0,0 +1,60 @@
+"""DataSet for logging metrics histories to mlflow in batches."""
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from kedro_mlflow.io.metrics import MlflowMetricsDataSet  # type: ignore
+from mlflow.entities import Metric  # type: ignore
+from mlflow.tracking import MlflowClient  # type: ignore
+
+MetricPoint = Dict[str, Union[float, int]]
+
+
+class MlflowBatchMetricsDataSet(MlflowMetricsDataSet):
+    """Logs metrics with one `log_batch` call per `batch_size` points."""
+
+    def __init__(
+        self,
+        run_id: Optional[str] = None,
+        load_args: Optional[Dict[str, Any]] = None,
+        prefix: Optional[str] = None,
+        batch_size: int = 1000,
+    ):
+        """Initializes the dataset.
+
+        Args:
+            run_id (Optional[str]): ID of the mlflow run to log to. Defaults to
+                the active run.
+            load_args (Optional[Dict[str, Any]]): Arguments for loading metrics.
+            prefix (Optional[str]): Prefix of the metric names.
+            batch_size (int): Number of points per `log_batch` call. Mlflow
+                accepts at most 1000. Defaults to 1000.
+        """
+        super().__init__(run_id=run_id, load_args=load_args, prefix=prefix)
+        self._batch_size = batch_size
+
+    def _key(self, name: str) -> str:
+        """Gets the prefixed metric name."""
+        return f"{self._prefix}.{name}" if self._prefix else name
+
+    def _save(self, data: Dict[str, Union[MetricPoint, List[MetricPoint]]]):
+        """Logs the metrics.
+
+        Args:
+            data (Dict[str, Union[MetricPoint, List[MetricPoint]]]): The metrics,
+                each one a `{"step", "value"}` point or a history of them.
+        """
+        if not getattr(self, "_logging_activated", True):
+            return
+        timestamp = int(time.time() * 1000)
+        metrics = [
+            Metric(
+                self._key(name), float(point["value"]), timestamp, point.get("step", 0)
+            )
+            for name, points in data.items()
+            for point in (points if isinstance(points, list) else [points])
+        ]
+        client = MlflowClient()
+        run_id = self.run_id
+        for start in range(0, len(metrics), self._batch_size):
+            end = start + self._batch_size
+            client.log_batch(run_id, metrics=metrics[start:end])
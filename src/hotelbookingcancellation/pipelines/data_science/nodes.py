@@ -1,10 +1,28 @@
 """Contains functions related to the data science step."""
 import itertools
-from typing import Any, Dict, List, Tuple, TypedDict
+import logging
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    TypedDict,
+)
 
 import numpy as np
 import pandas as pd
-from catboost import CatBoostClassifier, Pool  # type: ignore
+
+if TYPE_CHECKING:
+    from catboost import CatBoostClassifier  # type: ignore
+
+    from ..scoring.cascade import CascadePythonModel
+    from ..scoring.mlflow_model_loader_dataset import MlflowModelLoaderDataSet
+
+logger = logging.getLogger(__name__)
 
 
 # Created this function in order to not require sklearn's train_test_split as a
@@ -52,11 +70,13 @@ def index_split(
     ]
 
 
-class _SplitTrainTestParams(TypedDict):
+class _SplitTrainTestParams(TypedDict, total=False):
     target: str
     """The target column."""
     test_size: float
     """The proportion of the test set."""
+    weight: str
+    """Sample weight column, moved next to the target when present."""
 
 
 def split_train_test(
@@ -72,20 +92,60 @@ def split_train_test(
         Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
             0. x_train (pd.DataFrame): The training features.
             1. x_test (pd.DataFrame): The test features.
-            2. y_train (pd.DataFrame): The training target.
-            3. y_test (pd.DataFrame): The test target.
+            2. y_train (pd.DataFrame): The training target, and weights.
+            3. y_test (pd.DataFrame): The test target, and weights.
     """
     train_size = 1 - params["test_size"]
-    target = params["target"]
-    parts = index_split(
-        df.drop(columns=[target]), df[target].to_frame(), ratio=train_size
-    )
+    target = [params["target"]]
+    if params.get("weight") in df.columns:
+        target.append(params["weight"])
+    parts = index_split(df.drop(columns=target), df[target], ratio=train_size)
+    return tuple(itertools.chain(*parts))  # type: ignore
+
+
+class _SplitValidationParams(TypedDict):
+    validation_size: float
+    """The proportion of the training data kept for validation."""
+
+
+def split_validation(
+    x: pd.DataFrame, y: pd.DataFrame, params: _SplitValidationParams
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Carves a validation set out of the training data.
+
+    The feature selection and the cascade calibration are tuned on it, so the
+    test set is only used by the evaluation.
+
+    Args:
+        x (pd.DataFrame): The training features.
+        y (pd.DataFrame): The training target, and weights.
+        params (_SplitValidationParams): params for the split.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+            0. x_train (pd.DataFrame): The features the models are fitted on.
+            1. x_val (pd.DataFrame): The validation features.
+            2. y_train (pd.DataFrame): The target the models are fitted on.
+            3. y_val (pd.DataFrame): The validation target.
+    """
+    parts = index_split(x, y, ratio=1 - params["validation_size"])
     return tuple(itertools.chain(*parts))  # type: ignore
 
 
+def _target_weight(y: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[pd.Series]]:
+    """Splits the target frame into the target and the optional sample weights.
+
+    Example:
+        >>> y, weight = _target_weight(pd.DataFrame({"t": [0, 1], "w": [2, 1]}))
+        >>> list(y), weight.tolist()
+        (['t'], [2, 1])
+    """
+    return y.iloc[:, :1], y.iloc[:, 1] if y.shape[1] > 1 else None
+
+
 def optimize(
     x: pd.DataFrame, y: pd.DataFrame, params: Dict[str, Any]
-) -> CatBoostClassifier:
+) -> "CatBoostClassifier":
     """Generates a `CatBoostClassifier` model.
 
     Note:
@@ -96,34 +156,460 @@ def optimize(
 
     Args:
         x (pd.DataFrame): The training features.
-        y (pd.DataFrame): The training target.
+        y (pd.DataFrame): The training target, and optionally the sample weights.
         params (Dict[str, Any]): Kwargs for the `CatBoostClassifier`.
 
     Returns:
         CatBoostClassifier: The trained model.
     """
+    from catboost import CatBoostClassifier  # pylint: disable=import-outside-toplevel
+
+    params["train_dir"] = params.get("train_dir", "logs/catboost")
+    cat = CatBoostClassifier(**params)
+    y, weight = _target_weight(y)
+    cat.fit(x, y, sample_weight=weight)
+    return cat
+
+
+class _SelectFeaturesParams(TypedDict, total=False):
+    enabled: bool
+    """Whether the features are selected. Every feature is kept otherwise."""
+    algorithm: Literal["importance", "recursive"]
+    """Ranks the features by the importance of a model trained on all of them,
+    or by the elimination order of CatBoost recursive selection on SHAP values."""
+    max_accuracy_loss: float
+    """Highest validation accuracy loss compared to the model with all the
+    features."""
+    min_features: int
+    """Lowest number of features kept."""
+    step: int
+    """Number of features removed at each step."""
+
+
+def _accuracy(model: "CatBoostClassifier", x: pd.DataFrame, y: pd.DataFrame) -> float:
+    """Computes the accuracy of the model predictions, weighted if `y` has weights."""
+    y, weight = _target_weight(y)
+    correct = np.ravel(model.predict(x)) == y.to_numpy().ravel()
+    return float(np.average(correct, weights=weight))
+
+
+def select_features(
+    x_train: pd.DataFrame,
+    y_train: pd.DataFrame,
+    x_val: pd.DataFrame,
+    y_val: pd.DataFrame,
+    model_params: Dict[str, Any],
+    params: _SelectFeaturesParams,
+) -> List[str]:
+    """Selects the fewest features keeping the accuracy within a tolerance.
+
+    The features are ranked from the most to the least useful, then the least
+    useful ones are removed `step` at a time, retraining the model each time,
+    while its validation accuracy is within `max_accuracy_loss` of the model
+    with all the features.
+
+    Args:
+        x_train (pd.DataFrame): The training features.
+        y_train (pd.DataFrame): The training target.
+        x_val (pd.DataFrame): The validation features.
+        y_val (pd.DataFrame): The validation target.
+        model_params (Dict[str, Any]): Kwargs for the `CatBoostClassifier`.
+        params (_SelectFeaturesParams): The selection params.
+
+    Returns:
+        List[str]: The selected features, in the order of `x_train`.
+    """
+    columns = list(x_train.columns)
+    if not params.get("enabled", True):
+        return columns
+    from catboost import (  # pylint: disable=import-outside-toplevel
+        CatBoostClassifier,
+        EFeaturesSelectionAlgorithm,
+        Pool,
+    )
+
+    model_params = {"train_dir": "logs/catboost", **model_params}
+    target, weight = _target_weight(y_train)
+
+    def fit(features: List[str]) -> CatBoostClassifier:
+        return CatBoostClassifier(**model_params).fit(
+            x_train[features], target, sample_weight=weight
+        )
+
+    full = fit(columns)
+    baseline = _accuracy(full, x_val, y_val)
+    if params.get("algorithm", "importance") == "recursive":
+        summary = CatBoostClassifier(**model_params).select_features(
+            Pool(x_train, target, weight=weight),
+            eval_set=Pool(x_val, *_target_weight(y_val)),
+            features_for_select=list(range(len(columns))),
+            num_features_to_select=1,
+            steps=max(len(columns) - 1, 1),
+            algorithm=EFeaturesSelectionAlgorithm.RecursiveByShapValues,
+            train_final_model=False,
+            logging_level="Silent",
+        )
+        ranking = summary["selected_features_names"] + list(
+            reversed(summary["eliminated_features_names"])
+        )
+    else:
+        importances = full.get_feature_importance()
+        ranking = [columns[i] for i in np.argsort(-importances, kind="stable")]
+    selected = ranking
+    step = params.get("step", 1)
+    min_features = max(params.get("min_features", 1), 1)
+    for count in range(len(ranking) - step, min_features - 1, -step):
+        accuracy = _accuracy(fit(ranking[:count]), x_val[ranking[:count]], y_val)
+        if accuracy < baseline - params.get("max_accuracy_loss", 0.0):
+            break
+        selected = ranking[:count]
+    logger.info(
+        "Selected %d of %d features with validation accuracy %.4f: %s",
+        len(selected),
+        len(columns),
+        baseline,
+        ", ".join(sorted(set(columns) - set(selected))) or "none",
+    )
+    return [column for column in columns if column in selected]
+
+
+def select_columns(
+    x_train: pd.DataFrame,
+    x_val: pd.DataFrame,
+    x_test: pd.DataFrame,
+    features: List[str],
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Keeps the selected features of the training, validation and test data.
+
+    Args:
+        x_train (pd.DataFrame): The training features.
+        x_val (pd.DataFrame): The validation features.
+        x_test (pd.DataFrame): The test features.
+        features (List[str]): The selected features.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+            0. The selected training features.
+            1. The selected validation features.
+            2. The selected test features.
+
+    Example:
+        >>> df = pd.DataFrame({"a": [1], "b": [2]})
+        >>> select_columns(df, df, df, ["b"])[0]
+           b
+        0  2
+    """
+    return x_train[features], x_val[features], x_test[features]
+
+
+def select_model_features(
+    dataset: "MlflowModelLoaderDataSet", x_train: pd.DataFrame, x_test: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Keeps the features the registry model was trained on.
+
+    Args:
+        dataset (MlflowModelLoaderDataSet): Loader of the current model.
+        x_train (pd.DataFrame): The training features.
+        x_test (pd.DataFrame): The test features.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]:
+            0. The selected training features.
+            1. The selected test features.
+    """
+    features = list(dataset.model.feature_names_)
+    return x_train[features], x_test[features]
+
+
+class _SummarizeFeaturesParams(TypedDict, total=False):
+    bins: int
+    """Number of quantile bins of the numeric features."""
+
+
+def summarize_features(
+    x: pd.DataFrame,
+    preprocess_params: Dict[str, Any],
+    params: _SummarizeFeaturesParams,
+) -> Dict[str, Any]:
+    """Summarizes the training features, to compare the served ones against.
+
+    The summary is logged with the model, and read by the scoring server to
+    report the drift of the features it scores.
+
+    Args:
+        x (pd.DataFrame): The training features.
+        preprocess_params (Dict[str, Any]): The preprocessing parameters, whose
+            `columns_to_map` are the categorical features.
+        params (_SummarizeFeaturesParams): The summary params.
+
+    Returns:
+        Dict[str, Any]: The `FeatureSketch` of the features, as a dict.
+    """
+    # pylint: disable=import-outside-toplevel
+    from ..scoring.drift import FeatureSketch
+
+    categorical = preprocess_params.get("columns_to_map", {})
+    return FeatureSketch.fit(x, categorical, params.get("bins", 10)).to_dict()
+
+
+class _CalibrateCascadeParams(TypedDict):
+    max_accuracy_loss: float
+    """Highest validation accuracy loss of the cascade compared to the full
+    model."""
+
+
+def calibrate_cascade(
+    small: "CatBoostClassifier",
+    full: "CatBoostClassifier",
+    x: pd.DataFrame,
+    y: pd.DataFrame,
+    params: _CalibrateCascadeParams,
+) -> "CascadePythonModel":
+    """Creates a cascade of the small and full models, calibrated on validation data.
+
+    The confidence threshold of the small model is the lowest one whose
+    cascade accuracy on the validation data is within `max_accuracy_loss` of
+    the full model accuracy.
+
+    Args:
+        small (CatBoostClassifier): The small model.
+        full (CatBoostClassifier): The full model.
+        x (pd.DataFrame): The validation features.
+        y (pd.DataFrame): The validation target.
+        params (_CalibrateCascadeParams): The calibration params.
+
+    Returns:
+        CascadePythonModel: The cascade, to be logged as a pyfunc model.
+    """
+    # pylint: disable=import-outside-toplevel
+    from ..scoring.cascade import CascadeModel, CascadePythonModel, calibrate_threshold
+
+    actual = y.iloc[:, 0].to_numpy()
+    proba = small.predict_proba(x)
+    small_predictions = np.asarray(small.classes_)[proba.argmax(axis=1)]
+    threshold, coverage, accuracy = calibrate_threshold(
+        proba.max(axis=1),
+        small_predictions == actual,
+        np.ravel(full.predict(x)) == actual,
+        params["max_accuracy_loss"],
+    )
+    logger.info(
+        "Cascade threshold %.4f answers %.2f%% of the validation bookings with the "
+        "small model, with %.4f accuracy",
+        threshold,
+        coverage * 100,
+        accuracy,
+    )
+    return CascadePythonModel(CascadeModel(small, full, threshold))
+
+
+class _DriftParams(TypedDict):
+    metric: str
+    """CatBoost metric used to score the current model on the new data."""
+    min_score: float
+    """Score below which the model is considered drifted."""
+
+
+def _has_drifted(
+    model: "CatBoostClassifier",
+    x: pd.DataFrame,
+    y: pd.DataFrame,
+    params: _DriftParams,
+) -> bool:
+    """Checks whether the model performance on new data is below the threshold.
+
+    Args:
+        model (CatBoostClassifier): The model to check.
+        x (pd.DataFrame): The new features.
+        y (pd.DataFrame): The new target.
+        params (_DriftParams): The drift thresholds.
+
+    Returns:
+        bool: Whether the model has drifted.
+    """
+    from catboost import Pool  # pylint: disable=import-outside-toplevel
+
+    metric = params["metric"]
+    y, weight = _target_weight(y)
+    trees = model.tree_count_
+    values = model.eval_metrics(Pool(x, y, weight=weight), [metric], eval_period=trees)
+    score = values[metric][-1]
+    logger.info("Current model %s on new data: %.4f", metric, score)
+    return score < params["min_score"]
+
+
+def retrain(
+    dataset: "MlflowModelLoaderDataSet",
+    x: pd.DataFrame,
+    y: pd.DataFrame,
+    params: Dict[str, Any],
+) -> Optional["CatBoostClassifier"]:
+    """Continues boosting the registry model on new data.
+
+    The current model is used as `init_model`, so only `iterations` new trees
+    are fitted over the new data instead of rebuilding the model from the whole
+    history. If `drift` thresholds are given, the model is only retrained when
+    its score on the new data is below them.
+
+    Args:
+        dataset (MlflowModelLoaderDataSet): Loader of the current model.
+        x (pd.DataFrame): The new training features.
+        y (pd.DataFrame): The new training target, and optionally the sample
+            weights.
+        params (Dict[str, Any]): Kwargs for the `CatBoostClassifier` and an
+            optional `drift` entry with the retraining thresholds.
+
+    Returns:
+        Optional[CatBoostClassifier]: The retrained model, or None if the
+            current one has not drifted, so no new version is registered.
+    """
+    params = params.copy()
+    drift = params.pop("drift", None)
+    base = dataset.model
+    if drift and not _has_drifted(base, x, y, drift):
+        logger.info("Model has not drifted, skipping retraining")
+        return None
+    from catboost import CatBoostClassifier  # pylint: disable=import-outside-toplevel
+
     params["train_dir"] = params.get("train_dir", "logs/catboost")
     cat = CatBoostClassifier(**params)
-    cat.fit(x, y)
+    y, weight = _target_weight(y)
+    cat.fit(x, y, sample_weight=weight, init_model=base)
     return cat
 
 
+def _divide(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """Divides the arrays, returning zero where the denominator is zero."""
+    return np.divide(num, den, out=np.zeros(len(num)), where=den != 0)
+
+
+CONFUSION_METRICS: Dict[str, Callable[..., np.ndarray]] = {
+    "Accuracy": lambda tp, fp, fn, tn: _divide(tp + tn, tp + fp + fn + tn),
+    "Precision": lambda tp, fp, fn, tn: _divide(tp, tp + fp),
+    "Recall": lambda tp, fp, fn, tn: _divide(tp, tp + fn),
+    "F1": lambda tp, fp, fn, tn: _divide(2 * tp, 2 * tp + fp + fn),
+}
+
+
+def _confusion_metrics(
+    predictions: np.ndarray,
+    actual: np.ndarray,
+    metrics: List[str],
+    weight: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """Computes confusion matrix metrics for every step at once.
+
+    Args:
+        predictions (np.ndarray): Whether each row was predicted as positive,
+            with one line per step.
+        actual (np.ndarray): Whether each row is positive.
+        metrics (List[str]): The `CONFUSION_METRICS` to compute.
+        weight (Optional[np.ndarray]): The weight of each row. One if None.
+
+    Returns:
+        Dict[str, np.ndarray]: The metric values of each step.
+
+    Example:
+        >>> predictions = np.array([[True, True, False], [True, False, False]])
+        >>> actual = np.array([True, False, False])
+        >>> _confusion_metrics(predictions, actual, ["Accuracy", "Precision"])
+        {'Accuracy': array([0.66666667, 1.        ]), 'Precision': array([0.5, 1. ])}
+    """
+    weight = np.ones(len(actual)) if weight is None else weight
+    tp = ((predictions & actual) * weight).sum(axis=1)
+    fp = ((predictions & ~actual) * weight).sum(axis=1)
+    fn = ((~predictions & actual) * weight).sum(axis=1)
+    tn = weight.sum() - tp - fp - fn
+    return {metric: CONFUSION_METRICS[metric](tp, fp, fn, tn) for metric in metrics}
+
+
+class _EvaluateParams(TypedDict, total=False):
+    metrics: List[str]
+    """The metrics to compute."""
+    eval_period: int
+    """Number of trees between evaluation steps."""
+    final_only: bool
+    """Whether only the final model is evaluated."""
+
+
 def evaluate(
-    model: CatBoostClassifier, x: pd.DataFrame, y: pd.DataFrame, params: Dict[str, Any]
+    model: Optional["CatBoostClassifier"],
+    x: pd.DataFrame,
+    y: pd.DataFrame,
+    params: _EvaluateParams,
 ) -> Dict[str, list]:
     """Evaluates the model.
 
+    The model is evaluated every `eval_period` trees, or only with all of its
+    trees if `final_only` is set. For binary models, the `CONFUSION_METRICS` of
+    every step are computed together from the staged class predictions, the
+    other metrics are computed by the `eval_metrics` method.
+
     Args:
-        model (CatBoostClassifier): The model to evaluate.
+        model (Optional[CatBoostClassifier]): The model to evaluate, None if
+            it was not retrained.
         x (pd.DataFrame): The test features.
-        y (pd.DataFrame): The test target.
-        params (Dict[str, Any]): Kwargs for the `eval_metrics` method.
+        y (pd.DataFrame): The test target, and optionally the sample weights.
+        params (_EvaluateParams): The evaluation params. Other entries are
+            kwargs for the `eval_metrics` method.
 
     Returns:
-        Dict[str, list]: The evaluation metrics history.
+        Dict[str, list]: The evaluation metrics history, empty without a model.
     """
-    pool = Pool(x, y)
+    from catboost import Pool  # pylint: disable=import-outside-toplevel
+
+    if model is None:
+        return {}
+
+    params = params.copy()
+    y, weight = _target_weight(y)
+    metrics = params.pop("metrics")
+    period = params.pop("eval_period", 1)
+    final_only = params.pop("final_only", False)
+    trees = model.tree_count_
+    confusion = (
+        [metric for metric in metrics if metric in CONFUSION_METRICS]
+        if len(model.classes_) == 2
+        else []
+    )
+    others = [metric for metric in metrics if metric not in confusion]
+    if final_only:
+        steps = [trees - 1]
+        staged = [model.predict(x, prediction_type="Class")]
+        kwargs = {"eval_period": trees}
+    else:
+        steps = [min(end, trees) - 1 for end in range(period, trees + period, period)]
+        staged = model.staged_predict(x, prediction_type="Class", eval_period=period)
+        kwargs = {"eval_period": period}
+    history: Dict[str, Any] = {}
+    if confusion:
+        positive = model.classes_[-1]
+        predictions = np.stack([np.ravel(pred) == positive for pred in staged])
+        actual = y.to_numpy().ravel() == positive
+        history.update(
+            _confusion_metrics(
+                predictions,
+                actual,
+                confusion,
+                None if weight is None else weight.to_numpy(),
+            )
+        )
+    if others:
+        pool = Pool(x, y, weight=weight)
+        values = model.eval_metrics(pool, others, **kwargs, **params)
+        if final_only:
+            values = {
+                metric: metric_values[-1:] for metric, metric_values in values.items()
+            }
+        history.update(values)
+    for metric, values in history.items():
+        if len(values) != len(steps):
+            raise ValueError(
+                f"Got {len(values)} values of {metric} for {len(steps)} steps"
+            )
     return {
-        metric: [{"step": i, "value": value} for i, value in enumerate(values)]
-        for metric, values in model.eval_metrics(pool, **params).items()
+        metric: [
+            {"step": step, "value": float(value)} for step, value in zip(steps, values)
+        ]
+        for metric, values in history.items()
     }
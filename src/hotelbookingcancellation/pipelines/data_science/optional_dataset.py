@@ -0,0 +1,42 @@
+"""DataSet skipping the saves of data that was not produced."""
+from typing import Any, Dict
+
+from kedro.io import AbstractDataSet
+
+
+class OptionalDataSet(AbstractDataSet):
+    """Wraps a dataset, saving nothing when the node returns None.
+
+    Used for the models of the `retrain` pipeline, which are not logged nor
+    registered when the production model is kept. Loading after a skipped save
+    returns None.
+    """
+
+    def __init__(self, data_set: Dict[str, Any]):
+        """Initializes the dataset.
+
+        Args:
+            data_set (Dict[str, Any]): The configuration of the wrapped dataset.
+        """
+        self._data_set = AbstractDataSet.from_config("data_set", data_set)
+        self._skipped = False
+
+    def save(self, data: Any):
+        """Saves the data to the wrapped dataset, unless it is None."""
+        self._skipped = data is None
+        if self._skipped:
+            self._logger.info("Nothing to save to %s", str(self._data_set))
+            return
+        super().save(data)
+
+    def _save(self, data: Any):
+        self._data_set.save(data)
+
+    def _load(self) -> Any:
+        return None if self._skipped else self._data_set.load()
+
+    def _exists(self) -> bool:
+        return not self._skipped and self._data_set.exists()
+
+    def _describe(self) -> Dict[str, Any]:
+        return {"data_set": str(self._data_set)}
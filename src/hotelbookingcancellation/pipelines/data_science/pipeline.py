@@ -2,7 +2,19 @@
 
 from kedro.pipeline import Pipeline, node, pipeline
 
-from .nodes import evaluate, optimize, split_train_test
+from ..data_engineering.nodes import preprocess_bookings
+from .nodes import (
+    calibrate_cascade,
+    evaluate,
+    optimize,
+    retrain,
+    select_columns,
+    select_features,
+    select_model_features,
+    split_train_test,
+    split_validation,
+    summarize_features,
+)
 
 
 def create_pipeline() -> Pipeline:
@@ -11,10 +23,44 @@ def create_pipeline() -> Pipeline:
         [
             node(
                 func=split_train_test,
-                inputs=["preprocessed_hotel_bookings", "params:split_train_test"],
-                outputs=["x_train", "x_test", "y_train", "y_test"],
+                inputs=[
+                    "preprocessed_hotel_bookings@pandas",
+                    "params:split_train_test",
+                ],
+                outputs=["x_dev_all", "x_test_all", "y_dev", "y_test"],
                 name="split_train_test",
             ),
+            node(
+                func=split_validation,
+                inputs=["x_dev_all", "y_dev", "params:split_validation"],
+                outputs=["x_train_all", "x_val_all", "y_train", "y_val"],
+                name="split_validation",
+            ),
+            node(
+                func=select_features,
+                inputs=[
+                    "x_train_all",
+                    "y_train",
+                    "x_val_all",
+                    "y_val",
+                    "params:optimize",
+                    "params:select_features",
+                ],
+                outputs="selected_features",
+                name="select_features",
+            ),
+            node(
+                func=select_columns,
+                inputs=["x_train_all", "x_val_all", "x_test_all", "selected_features"],
+                outputs=["x_train", "x_val", "x_test"],
+                name="select_columns",
+            ),
+            node(
+                func=summarize_features,
+                inputs=["x_train", "params:preprocessing", "params:feature_summary"],
+                outputs="feature_summary",
+                name="summarize_features",
+            ),
             node(
                 func=optimize,
                 inputs=["x_train", "y_train", "params:optimize"],
@@ -27,5 +73,86 @@ def create_pipeline() -> Pipeline:
                 outputs="metrics",
                 name="evaluate",
             ),
+            node(
+                func=optimize,
+                inputs=["x_train", "y_train", "params:cascade.small"],
+                outputs="small_model",
+                name="optimize_small",
+            ),
+            node(
+                func=calibrate_cascade,
+                inputs=[
+                    "small_model",
+                    "model",
+                    "x_val",
+                    "y_val",
+                    "params:cascade.calibration",
+                ],
+                outputs="cascade_model",
+                name="calibrate_cascade",
+            ),
+        ]
+    )
+
+
+def create_retrain_pipeline() -> Pipeline:
+    """Creates the pipeline for warm-start retraining over new bookings."""
+    return pipeline(
+        [
+            node(
+                func=preprocess_bookings,
+                inputs=["new_hotel_bookings", "params:preprocessing"],
+                outputs="preprocessed_new_hotel_bookings",
+                name="preprocess_new_bookings",
+            ),
+            node(
+                func=split_train_test,
+                inputs=["preprocessed_new_hotel_bookings", "params:split_train_test"],
+                outputs=[
+                    "new_x_train_all",
+                    "new_x_test_all",
+                    "new_y_train",
+                    "new_y_test",
+                ],
+                name="split_new_train_test",
+            ),
+            node(
+                func=select_model_features,
+                inputs=["production_model", "new_x_train_all", "new_x_test_all"],
+                outputs=["new_x_train", "new_x_test"],
+                name="select_model_features",
+            ),
+            node(
+                func=summarize_features,
+                inputs=[
+                    "new_x_train",
+                    "params:preprocessing",
+                    "params:feature_summary",
+                ],
+                outputs="feature_summary",
+                name="summarize_new_features",
+            ),
+            node(
+                func=retrain,
+                inputs=[
+                    "production_model",
+                    "new_x_train",
+                    "new_y_train",
+                    "params:retrain",
+                ],
+                outputs="retrained_model",
+                name="retrain",
+            ),
+            node(
+                func=evaluate,
+                inputs=[
+                    "retrained_model",
+                    "new_x_test",
+                    "new_y_test",
+                    "params:evaluate",
+                ],
+                outputs="metrics",
+                name="evaluate_retrained",
+            ),
         ]
     )
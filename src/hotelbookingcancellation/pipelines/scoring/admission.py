@@ -0,0 +1,228 @@
+"""Admission control and deadline-aware load shedding of the scoring server."""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Mapping, Optional, Tuple, TypedDict
+
+DEADLINE_HEADER = "x-deadline-ms"
+"""Header with the milliseconds a client waits for its response."""
+
+_Waiter = Tuple["asyncio.Future[None]", int]
+
+
+class _AdmissionParams(TypedDict, total=False):
+    max_rows: int
+    """Maximum number of bookings being scored at once."""
+    max_queued_rows: int
+    """Maximum number of bookings waiting to be scored."""
+    priority_rows: int
+    """Requests of up to this number of bookings are served ahead of larger
+    ones. No priority lane if 0."""
+    queue_timeout: float
+    """Maximum seconds a request waits to be scored."""
+    row_bytes: int
+    """Estimated bytes per booking of the bodies not parsed before admission."""
+
+
+class AdmissionRejected(Exception):
+    """A request is rejected to shed load."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        """Initializes the error.
+
+        Args:
+            status_code (int): 429 if too much work is queued, 503 if the work
+                can not be done in time.
+            detail (str): The error description.
+            retry_after (int): Seconds to wait before retrying.
+        """
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def deadline(headers: Mapping[str, str], started: float) -> Optional[float]:
+    """Gets the deadline of a request from its `X-Deadline-Ms` header.
+
+    Args:
+        headers (Mapping[str, str]): The request headers, with lowercase names.
+        started (float): `time.perf_counter` value of the request start.
+
+    Returns:
+        Optional[float]: The `time.perf_counter` value the response is due by,
+            or None without a valid header.
+
+    Example:
+        >>> deadline({"x-deadline-ms": "250"}, 10.0)
+        10.25
+        >>> deadline({"x-deadline-ms": "soon"}, 10.0) is None
+        True
+    """
+    try:
+        milliseconds = float(headers[DEADLINE_HEADER])
+    except (KeyError, ValueError):
+        return None
+    return started + milliseconds / 1000
+
+
+class AdmissionController:
+    """Bounds the bookings being scored and waiting, failing fast above them.
+
+    Requests are admitted while the bookings in flight are below `max_rows`,
+    and wait in a FIFO queue otherwise. A request is rejected with a 429 if the
+    queue is above `max_queued_rows`, and with a 503 if its deadline is earlier
+    than the estimated end of its scoring or it waited longer than allowed.
+    Small requests have a lane of their own, served before the queued bulk ones.
+
+    It must be used from the event loop only.
+    """
+
+    def __init__(self, params: Optional[_AdmissionParams] = None):
+        """Initializes the controller.
+
+        Args:
+            params (Optional[_AdmissionParams]): The admission params.
+        """
+        params = params or {}
+        self.max_rows = params.get("max_rows", 20_000)
+        self._max_queued_rows = params.get("max_queued_rows", 100_000)
+        self._priority_rows = params.get("priority_rows", 0)
+        self._queue_timeout = params.get("queue_timeout", 10.0)
+        self.row_bytes = params.get("row_bytes", 300)
+        self.in_flight = 0
+        self.queued = 0
+        self._lanes: Tuple[Deque[_Waiter], Deque[_Waiter]] = (deque(), deque())
+        self._queued_priority = 0
+        self._seconds_per_row: Optional[float] = None
+
+    def _priority(self, rows: int) -> bool:
+        """Whether a request goes in the priority lane."""
+        return rows <= self._priority_rows
+
+    def _fits(self, rows: int) -> bool:
+        """Whether a request can be scored now. Oversized ones are scored alone."""
+        return self.in_flight == 0 or self.in_flight + rows <= self.max_rows
+
+    def estimate(self, rows: int, priority: bool = False) -> float:
+        """Estimates the seconds until a new request is scored.
+
+        Args:
+            rows (int): Number of bookings of the request.
+            priority (bool): Whether the request goes in the priority lane.
+
+        Returns:
+            float: Seconds to score the bookings queued ahead and the request,
+                or 0 before any request was scored.
+        """
+        if self._seconds_per_row is None:
+            return 0.0
+        ahead = self._queued_priority if priority else self.queued
+        return (ahead + rows) * self._seconds_per_row
+
+    def _retry_after(self) -> int:
+        """Estimates the seconds to drain the queue."""
+        return max(1, math.ceil(self.estimate(0)))
+
+    def _dispatch(self):
+        """Admits the queued requests that fit, priority lane first."""
+        for priority, lane in zip((True, False), self._lanes):
+            while lane and self._fits(lane[0][1]):
+                future, rows = lane.popleft()
+                self.queued -= rows
+                if priority:
+                    self._queued_priority -= rows
+                if not future.done():
+                    self.in_flight += rows
+                    future.set_result(None)
+            if lane:
+                return
+
+    async def _acquire(self, rows: int, due: Optional[float]):
+        """Waits until the request is admitted, or rejects it."""
+        priority = self._priority(rows)
+        timeout = self._queue_timeout
+        if due is not None:
+            remaining = due - time.perf_counter()
+            if remaining <= 0 or remaining < self.estimate(rows, priority):
+                raise AdmissionRejected(
+                    503, "Deadline can not be met", self._retry_after()
+                )
+            timeout = min(timeout, remaining)
+        waiting = self._queued_priority if priority else self.queued
+        if not waiting and self._fits(rows):
+            self.in_flight += rows
+            return
+        if self.queued + rows > self._max_queued_rows:
+            raise AdmissionRejected(
+                429, "Too many bookings queued", self._retry_after()
+            )
+        future = asyncio.get_running_loop().create_future()
+        waiter = (future, rows)
+        self._lanes[0 if priority else 1].append(waiter)
+        self.queued += rows
+        if priority:
+            self._queued_priority += rows
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except BaseException as exc:
+            if future.done():
+                if isinstance(exc, asyncio.TimeoutError):
+                    return
+                self._release(rows)
+                raise
+            future.cancel()
+            self._lanes[0 if priority else 1].remove(waiter)
+            self.queued -= rows
+            if priority:
+                self._queued_priority -= rows
+            self._dispatch()
+            if isinstance(exc, asyncio.TimeoutError):
+                raise AdmissionRejected(
+                    503, "Queued past the deadline", self._retry_after()
+                ) from exc
+            raise
+
+    def resize(self, max_rows: int):
+        """Sets the in-flight limit, admitting the queued requests that now fit.
+
+        Args:
+            max_rows (int): Maximum number of bookings being scored at once.
+        """
+        self.max_rows = max_rows
+        self._dispatch()
+
+    def _release(self, rows: int, seconds: Optional[float] = None):
+        """Frees the rows of a scored request, updating the scoring speed."""
+        self.in_flight -= rows
+        if seconds is not None and rows:
+            speed = seconds / rows
+            self._seconds_per_row = (
+                speed
+                if self._seconds_per_row is None
+                else 0.9 * self._seconds_per_row + 0.1 * speed
+            )
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(
+        self, rows: int, due: Optional[float] = None
+    ) -> AsyncIterator[None]:
+        """Holds `rows` of the in-flight limit while the request is scored.
+
+        Args:
+            rows (int): Number of bookings of the request.
+            due (Optional[float]): `time.perf_counter` value the response is
+                due by.
+
+        Raises:
+            AdmissionRejected: If the request is shed.
+        """
+        await self._acquire(rows, due)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(rows, time.perf_counter() - started)
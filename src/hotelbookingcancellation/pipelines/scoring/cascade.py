@@ -0,0 +1,162 @@
+"""Two-stage cascade of a small model and the full model.
+
+The module is also an mlflow flavor for `MlflowModelLoaderDataSet`: its
+`load_model` loads the `CascadeModel` of a registered cascade.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Any, Tuple
+
+import mlflow.pyfunc  # type: ignore
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class CascadeStats:
+    """Counters of the rows scored by a cascade."""
+
+    rows: int = 0
+    """Number of rows scored."""
+    escalated: int = 0
+    """Number of rows not confident enough for the small model."""
+
+
+class CascadeModel:
+    """Answers the confident rows with a small model, the others with the full one.
+
+    A row is confident when the highest class probability of the small model
+    is at least `threshold`.
+    """
+
+    def __init__(self, small: Any, full: Any, threshold: float):
+        """Initializes the cascade.
+
+        Args:
+            small (Any): The small CatBoost model.
+            full (Any): The full CatBoost model.
+            threshold (float): Lowest small model probability answered by it.
+        """
+        self.small = small
+        self.full = full
+        self.threshold = threshold
+        self.cascade_stats = CascadeStats()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.cascade_stats = CascadeStats()
+        self._lock = threading.Lock()
+
+    def predict(self, x: pd.DataFrame, **kwargs: Any) -> np.ndarray:
+        """Predicts the classes of the rows.
+
+        Args:
+            x (pd.DataFrame): The features.
+            **kwargs: Kwargs of the CatBoost predictions, e.g. `thread_count`.
+
+        Returns:
+            np.ndarray: The predicted classes.
+        """
+        proba = self.small.predict_proba(x, **kwargs)
+        predictions = np.asarray(self.small.classes_)[proba.argmax(axis=1)]
+        escalated = proba.max(axis=1) < self.threshold
+        count = int(escalated.sum())
+        if count:
+            predictions[escalated] = np.ravel(self.full.predict(x[escalated], **kwargs))
+        with self._lock:
+            self.cascade_stats.rows += len(predictions)
+            self.cascade_stats.escalated += count
+        return predictions
+
+    @property
+    def feature_names_(self) -> Any:
+        """Gets the features of the full model, which the small one is trained on."""
+        return getattr(self.full, "feature_names_", None)
+
+    def get_feature_importance(self, *args: Any, **kwargs: Any) -> Any:
+        """Gets the feature importance, e.g. SHAP values, of the full model."""
+        return self.full.get_feature_importance(*args, **kwargs)
+
+
+class CascadePythonModel(mlflow.pyfunc.PythonModel):
+    """Logs a `CascadeModel` as a single mlflow pyfunc model."""
+
+    def __init__(self, cascade: CascadeModel):
+        """Initializes the model.
+
+        Args:
+            cascade (CascadeModel): The cascade.
+        """
+        self.cascade = cascade
+
+    def predict(self, context: Any, model_input: pd.DataFrame) -> np.ndarray:
+        """Predicts with the cascade."""
+        return self.cascade.predict(model_input)
+
+
+def load_model(model_uri: str, **kwargs: Any) -> CascadeModel:
+    """Loads the cascade of a logged `CascadePythonModel`.
+
+    Args:
+        model_uri (str): The model uri.
+        **kwargs: Kwargs for `mlflow.pyfunc.load_model`.
+
+    Returns:
+        CascadeModel: The cascade.
+    """
+    model = mlflow.pyfunc.load_model(model_uri, **kwargs)
+    unwrap = getattr(model, "unwrap_python_model", None)
+    python_model = unwrap() if unwrap else model._model_impl.python_model
+    return python_model.cascade
+
+
+def calibrate_threshold(
+    confidence: np.ndarray,
+    small_correct: np.ndarray,
+    full_correct: np.ndarray,
+    max_accuracy_loss: float,
+) -> Tuple[float, float, float]:
+    """Finds the lowest threshold keeping the cascade within an accuracy loss.
+
+    Args:
+        confidence (np.ndarray): The small model probability of each row.
+        small_correct (np.ndarray): Whether the small model is right on each row.
+        full_correct (np.ndarray): Whether the full model is right on each row.
+        max_accuracy_loss (float): Highest accuracy loss of the cascade compared
+            to the full model.
+
+    Returns:
+        Tuple[float, float, float]:
+            0. threshold (float): The threshold. Above 1 if every row must be
+                escalated.
+            1. coverage (float): Proportion of rows answered by the small model.
+            2. accuracy (float): Accuracy of the cascade.
+
+    Example:
+        >>> calibrate_threshold(
+        ...     np.array([0.99, 0.9, 0.8, 0.6]),
+        ...     np.array([True, True, False, False]),
+        ...     np.array([True, True, True, True]),
+        ...     0.0,
+        ... )
+        (0.9, 0.5, 1.0)
+    """
+    order = np.argsort(-confidence, kind="stable")
+    confidence = confidence[order]
+    rows = len(order)
+    # Correct rows when the `k` most confident rows are answered by the small model
+    small = np.concatenate([[0], np.cumsum(small_correct[order])])
+    full = np.concatenate([[0], np.cumsum(full_correct[order])])
+    accuracy = (small + full[-1] - full) / max(rows, 1)
+    allowed = accuracy >= accuracy[0] - max_accuracy_loss
+    # The threshold can only split rows of different confidence
+    allowed[1:-1] &= confidence[:-1] > confidence[1:]
+    k = int(np.flatnonzero(allowed)[-1])
+    threshold = float(confidence[k - 1] if k else np.nextafter(1.0, 2.0))
+    return threshold, k / max(rows, 1), float(accuracy[k])
@@ -0,0 +1,191 @@
+"""Online tuning of the in-flight limit and the inference batch size."""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple, TypedDict
+
+import numpy as np
+
+from .admission import AdmissionController
+
+logger = logging.getLogger(__name__)
+
+
+class _ControllerParams(TypedDict, total=False):
+    enabled: bool
+    """Whether the limits are tuned online. They are fixed otherwise."""
+    latency_slo: float
+    """Target p95 of the seconds a request is processed, queueing excluded."""
+    interval: float
+    """Seconds between adjustments."""
+    min_rows: int
+    """Lowest in-flight limit, in bookings."""
+    max_rows: int
+    """Highest in-flight limit, in bookings."""
+    increase_rows: int
+    """Bookings added to the in-flight limit while the SLO is met."""
+    decrease_factor: float
+    """Factor of the in-flight limit when the SLO is missed."""
+    batch_size: int
+    """Initial number of bookings predicted at once."""
+    min_batch_size: int
+    """Lowest number of bookings predicted at once."""
+    max_batch_size: int
+    """Highest number of bookings predicted at once."""
+    thread_count: Optional[int]
+    """CatBoost `thread_count` of the predictions. Model default if None."""
+
+
+class ConcurrencyController:
+    """Tunes the admission in-flight limit and the prediction batch size.
+
+    Every `interval` seconds, one of the two is adjusted while the other is
+    held, alternately, so throughput changes are attributed to the right one.
+    The p95 latency of the processed requests drives the in-flight limit with
+    AIMD: it is increased by `increase_rows` while the p95 is within
+    `latency_slo`, and multiplied by `decrease_factor` otherwise. The batch size
+    climbs towards the highest prediction throughput, doubling or halving it
+    while throughput improves, and reversing when it worsens.
+
+    Requests are only recorded while enabled, in a window bounded to
+    `MAX_WINDOW` requests.
+    """
+
+    MAX_WINDOW = 100_000
+    """Most requests recorded between two adjustments."""
+
+    def __init__(
+        self, admission: AdmissionController, params: Optional[_ControllerParams] = None
+    ):
+        """Initializes the controller.
+
+        Args:
+            admission (AdmissionController): The admission control whose
+                `max_rows` is tuned.
+            params (Optional[_ControllerParams]): The controller params.
+        """
+        params = params or {}
+        self._admission = admission
+        self.enabled = params.get("enabled", False)
+        self._slo = params.get("latency_slo", 0.1)
+        self._interval = params.get("interval", 5.0)
+        self._min_rows = params.get("min_rows", 100)
+        self._max_rows = params.get("max_rows", admission.max_rows)
+        self._increase_rows = params.get("increase_rows", 500)
+        self._decrease_factor = params.get("decrease_factor", 0.7)
+        self.batch_size = params.get("batch_size", 10_000)
+        self._min_batch_size = params.get("min_batch_size", 100)
+        self._max_batch_size = params.get("max_batch_size", 100_000)
+        thread_count = params.get("thread_count")
+        self.predict_kwargs: Dict[str, Any] = (
+            {} if thread_count is None else {"thread_count": thread_count}
+        )
+        self._direction = 1
+        self._throughput: Optional[float] = None
+        self._tune_batch = False
+        self._window: Deque[Tuple[int, float, float]] = deque(maxlen=self.MAX_WINDOW)
+        self._lock = threading.Lock()
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def observe(self, rows: int, seconds: float, predict_seconds: float):
+        """Records a processed request. Thread safe.
+
+        Args:
+            rows (int): Number of bookings of the request.
+            seconds (float): Seconds the request was processed.
+            predict_seconds (float): Seconds spent in the model predictions.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._window.append((rows, seconds, predict_seconds))
+
+    def _batch_size(self, throughput: float) -> int:
+        """Moves the batch size towards a higher throughput."""
+        if self._throughput is not None and throughput < self._throughput:
+            self._direction = -self._direction
+        self._throughput = throughput
+        size = self.batch_size * 2 if self._direction > 0 else self.batch_size // 2
+        return min(max(size, self._min_batch_size), self._max_batch_size)
+
+    def adjust(self) -> Optional[Dict[str, Any]]:
+        """Adjusts the limits to the requests processed since the last call.
+
+        Returns:
+            Optional[Dict[str, Any]]: The decision, or None without requests.
+        """
+        with self._lock:
+            window = list(self._window)
+            self._window.clear()
+        if not window:
+            return None
+        rows, seconds, predict_seconds = np.array(window).T
+        p95 = float(np.percentile(seconds, 95))
+        throughput = float(rows.sum() / max(predict_seconds.sum(), 1e-9))
+        max_rows = self._admission.max_rows
+        tuned = "batch_size" if self._tune_batch else "max_rows"
+        if self._tune_batch:
+            self.batch_size = self._batch_size(throughput)
+        else:
+            if p95 > self._slo:
+                max_rows = int(max_rows * self._decrease_factor)
+            else:
+                max_rows += self._increase_rows
+            max_rows = min(max(max_rows, self._min_rows), self._max_rows)
+            self._admission.resize(max_rows)
+        self._tune_batch = not self._tune_batch
+        decision = {
+            "time": time.time(),
+            "tuned": tuned,
+            "requests": len(window),
+            "p95_seconds": p95,
+            "rows_per_second": throughput,
+            "max_rows": max_rows,
+            "batch_size": self.batch_size,
+        }
+        logger.info(
+            "Scoring p95 %.4fs (SLO %.4fs), %.0f bookings/s: "
+            "in-flight limit %d bookings, batch size %d",
+            p95,
+            self._slo,
+            throughput,
+            max_rows,
+            self.batch_size,
+        )
+        self.decisions.append(decision)
+        return decision
+
+    async def _run(self):
+        """Adjusts the limits every `interval` seconds."""
+        while True:
+            await asyncio.sleep(self._interval)
+            self.adjust()
+
+    def start(self):
+        """Starts adjusting the limits if enabled. Must run in the event loop."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stops adjusting the limits."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def state(self) -> Dict[str, Any]:
+        """Gets the current limits and the latest decisions.
+
+        Returns:
+            Dict[str, Any]: The controller state.
+        """
+        return {
+            "enabled": self.enabled,
+            "latency_slo": self._slo,
+            "max_rows": self._admission.max_rows,
+            "batch_size": self.batch_size,
+            **self.predict_kwargs,
+            "decisions": list(self.decisions),
+        }
@@ -0,0 +1,264 @@
+"""Admin endpoints profiling the live scoring process.
+
+Nothing runs until an endpoint is called: the CPU profiler samples the thread
+stacks only for the requested seconds, and `tracemalloc` traces allocations
+from the first snapshot until the snapshots are deleted.
+"""
+import hmac
+import marshal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict, defaultdict
+from types import FrameType
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+_Function = Tuple[str, int, str]
+_Stack = Tuple[_Function, ...]
+
+
+class _DebugParams(TypedDict, total=False):
+    enabled: bool
+    """Whether the debug endpoints are served."""
+    token: str
+    """Bearer token required by the debug endpoints."""
+    max_seconds: float
+    """Longest CPU profile."""
+    interval: float
+    """Seconds between the CPU profile samples."""
+    max_snapshots: int
+    """Number of `tracemalloc` snapshots kept."""
+
+
+def _stack(frame: Optional[FrameType]) -> _Stack:
+    """Gets the functions of a stack, from the outermost."""
+    functions = []
+    while frame is not None:
+        code = frame.f_code
+        functions.append((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    return tuple(reversed(functions))
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter:
+    """Samples the stacks of every other thread, idle ones included.
+
+    Args:
+        seconds (float): Duration of the profile.
+        interval (float): Seconds between samples.
+
+    Returns:
+        Counter: Number of samples of each stack.
+    """
+    current = threading.get_ident()
+    samples: Counter = Counter()
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for ident, frame in sys._current_frames().items():  # pylint: disable=W0212
+            if ident != current:
+                samples[_stack(frame)] += 1
+        time.sleep(interval)
+    return samples
+
+
+def collapsed(samples: Counter) -> str:
+    """Formats stack samples as collapsed stacks, as read by flame graph tools.
+
+    Args:
+        samples (Counter): Number of samples of each stack.
+
+    Returns:
+        str: One `outer;...;inner count` line per stack.
+
+    Example:
+        >>> collapsed(Counter({(("a.py", 1, "main"), ("b.py", 3, "run")): 2}))
+        'main (a.py:1);run (b.py:3) 2\\n'
+    """
+    return "".join(
+        ";".join(f"{name} ({filename}:{line})" for filename, line, name in stack)
+        + f" {count}\n"
+        for stack, count in samples.most_common()
+    )
+
+
+def pstats_dump(samples: Counter, interval: float) -> bytes:
+    """Converts stack samples into a `pstats` file of estimated times.
+
+    Every sample accounts for `interval` seconds of its innermost function,
+    and of the cumulative time of every function in its stack. The call counts
+    are the numbers of samples.
+
+    Args:
+        samples (Counter): Number of samples of each stack.
+        interval (float): Seconds between samples.
+
+    Returns:
+        bytes: The content of a file loadable with `pstats.Stats`.
+    """
+    calls: Dict[_Function, int] = defaultdict(int)
+    inner: Dict[_Function, float] = defaultdict(float)
+    cumulative: Dict[_Function, float] = defaultdict(float)
+    callers: Dict[_Function, Dict[_Function, List[float]]] = defaultdict(dict)
+    for stack, count in samples.items():
+        seconds = count * interval
+        for function in set(stack):
+            calls[function] += count
+            cumulative[function] += seconds
+        if stack:
+            inner[stack[-1]] += seconds
+        for depth, (caller, function) in enumerate(zip(stack, stack[1:]), 2):
+            edge = callers[function].setdefault(caller, [0, 0, 0.0, 0.0])
+            edge[0] += count
+            edge[1] += count
+            edge[3] += seconds
+            if depth == len(stack):
+                edge[2] += seconds
+    return marshal.dumps(
+        {
+            function: (
+                calls[function],
+                calls[function],
+                inner[function],
+                cumulative[function],
+                {caller: tuple(stats) for caller, stats in callers[function].items()},
+            )
+            for function in cumulative
+        }
+    )
+
+
+def thread_dump() -> str:
+    """Formats the current stack of every thread.
+
+    Returns:
+        str: The stacks, innermost call last.
+    """
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    dumps = []
+    for ident, frame in sys._current_frames().items():  # pylint: disable=W0212
+        lines = [f'Thread "{names.get(ident, "unknown")}" ({ident}):']
+        lines.extend(
+            f'  File "{filename}", line {line}, in {name}'
+            for filename, line, name in _stack(frame)
+        )
+        dumps.append("\n".join(lines))
+    return "\n\n".join(dumps) + "\n"
+
+
+class _Snapshots:
+    """The latest `tracemalloc` snapshots."""
+
+    def __init__(self, max_snapshots: int):
+        """Initializes the snapshots."""
+        self._max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def take(self, frames: int) -> int:
+        """Takes a snapshot, starting to trace allocations if needed."""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._next += 1
+            self._snapshots[self._next] = tracemalloc.take_snapshot()
+            while len(self._snapshots) > self._max_snapshots:
+                self._snapshots.popitem(last=False)
+            return self._next
+
+    def diff(self, first: int, second: int, group_by: str, limit: int) -> str:
+        """Formats the top allocation differences between two snapshots."""
+        try:
+            old, new = self._snapshots[first], self._snapshots[second]
+        except KeyError as exc:
+            raise HTTPException(404, f"Snapshot {exc.args[0]} not found") from exc
+        differences = new.compare_to(old, group_by)[:limit]
+        return "".join(f"{difference}\n" for difference in differences)
+
+    def clear(self):
+        """Deletes the snapshots and stops tracing allocations."""
+        with self._lock:
+            self._snapshots.clear()
+            tracemalloc.stop()
+
+
+def debug_router(params: _DebugParams) -> APIRouter:
+    """Creates the router of the debug endpoints.
+
+    Args:
+        params (_DebugParams): The debug params.
+
+    Returns:
+        APIRouter: The debug endpoints, requiring the bearer `token`.
+
+    Raises:
+        ValueError: If no `token` is set.
+    """
+    token = params.get("token")
+    if not token:
+        raise ValueError("A token is required to enable the debug endpoints")
+    max_seconds = params.get("max_seconds", 60.0)
+    interval = params.get("interval", 0.005)
+    snapshots = _Snapshots(params.get("max_snapshots", 4))
+    profiling = threading.Lock()
+
+    def authorize(request: Request):
+        authorization = request.headers.get("authorization", "")
+        if not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+            raise HTTPException(401, "Invalid debug token")
+
+    router = APIRouter(prefix="/admin/debug", dependencies=[Depends(authorize)])
+
+    def profile(seconds: float) -> Counter:
+        if not profiling.acquire(blocking=False):
+            raise HTTPException(409, "A profile is already running")
+        try:
+            return sample_stacks(seconds, interval)
+        finally:
+            profiling.release()
+
+    @router.get("/profile")
+    async def cpu_profile(
+        seconds: float = Query(5.0, gt=0), output: str = Query("collapsed")
+    ):
+        if seconds > max_seconds:
+            raise HTTPException(422, f"Profiles are up to {max_seconds} seconds")
+        if output not in ("collapsed", "pstats"):
+            raise HTTPException(422, "The output is either collapsed or pstats")
+        samples = await run_in_threadpool(profile, seconds)
+        if output == "pstats":
+            return Response(
+                pstats_dump(samples, interval),
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": 'attachment; filename="scoring.prof"'},
+            )
+        return Response(collapsed(samples), media_type="text/plain")
+
+    @router.get("/threads")
+    def threads():
+        return Response(thread_dump(), media_type="text/plain")
+
+    @router.post("/memory/snapshots", status_code=201)
+    def take_snapshot(frames: int = Query(1, ge=1)):
+        return {"id": snapshots.take(frames)}
+
+    @router.get("/memory/snapshots/{first}/diff/{second}")
+    def diff_snapshots(
+        first: int,
+        second: int,
+        group_by: str = Query("lineno", regex="^(filename|lineno|traceback)$"),
+        limit: int = Query(20, ge=1),
+    ):
+        return Response(
+            snapshots.diff(first, second, group_by, limit), media_type="text/plain"
+        )
+
+    @router.delete("/memory/snapshots", status_code=204)
+    def clear_snapshots():
+        snapshots.clear()
+
+    return router
@@ -0,0 +1,289 @@
+"""Streaming summaries of the model features and their drift from training."""
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypedDict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_EPSILON = 1e-4
+
+
+class FeatureSketch:
+    """Constant-memory histograms of the features, binned at training quantiles.
+
+    Numeric features are counted in the bins between their training quantiles,
+    and the mapped categorical features in one bin per training code, plus one
+    below and one above them for the codes not seen in training. Missing
+    values, which include the categories with no mapping, are counted in a last
+    bin of their own. Every feature is binned at once with a few numpy
+    operations, so an update costs tens of microseconds for small batches.
+    """
+
+    def __init__(
+        self,
+        columns: List[str],
+        edges: List[List[float]],
+        categorical: Iterable[str] = (),
+        counts: Optional[List[List[int]]] = None,
+    ):
+        """Initializes the sketch.
+
+        Args:
+            columns (List[str]): The features.
+            edges (List[List[float]]): The sorted bin edges of each feature.
+            categorical (Iterable[str]): The categorical features.
+            counts (Optional[List[List[int]]]): The counts of each bin. Empty
+                if None.
+        """
+        self.columns = list(columns)
+        self.categorical = [column for column in categorical if column in columns]
+        self.edges = [list(map(float, column_edges)) for column_edges in edges]
+        width = max((len(column_edges) for column_edges in edges), default=0)
+        self._edges = np.full((len(columns), width), np.inf)
+        for position, column_edges in enumerate(self.edges):
+            end = len(column_edges)
+            self._edges[position, :end] = column_edges
+        self._bins = width + 2
+        self._offsets = np.arange(len(columns)) * self._bins
+        self.counts = np.zeros((len(columns), self._bins), dtype=np.int64)
+        if counts is not None:
+            self.counts[:] = counts
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fit(
+        cls, df: pd.DataFrame, categorical: Iterable[str] = (), bins: int = 10
+    ) -> "FeatureSketch":
+        """Creates the sketch of a dataset, binned at its quantiles.
+
+        Args:
+            df (pd.DataFrame): The features.
+            categorical (Iterable[str]): The categorical features.
+            bins (int): Number of quantile bins of the numeric features.
+
+        Returns:
+            FeatureSketch: The sketch, with the counts of `df`.
+
+        Example:
+            >>> df = pd.DataFrame({"a": [1.0, 2.0, 3.0, 4.0], "b": [0, 1, 1, 1]})
+            >>> sketch = FeatureSketch.fit(df, categorical=["b"], bins=2)
+            >>> sketch.edges
+            [[2.5], [-0.5, 0.5, 1.5]]
+            >>> sketch.counts.tolist()
+            [[2, 2, 0, 0, 0], [0, 1, 3, 0, 0]]
+        """
+        categorical = set(categorical)
+        columns = [
+            column for column in df.columns if pd.api.types.is_numeric_dtype(df[column])
+        ]
+        edges = []
+        for column in columns:
+            values = df[column].to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+            if not len(values):
+                edges.append([])
+            elif column in categorical:
+                codes = np.unique(values)
+                bounds = np.concatenate([[codes[0] - 1], codes, [codes[-1] + 1]])
+                edges.append(((bounds[:-1] + bounds[1:]) / 2).tolist())
+            else:
+                quantiles = np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])
+                edges.append(np.unique(quantiles).tolist())
+        sketch = cls(columns, edges, categorical)
+        sketch.update(df)
+        return sketch
+
+    def empty(self) -> "FeatureSketch":
+        """Creates a sketch with the same bins and no counts."""
+        return FeatureSketch(self.columns, self.edges, self.categorical)
+
+    def update(self, df: pd.DataFrame):
+        """Counts a batch of features. Thread safe.
+
+        Args:
+            df (pd.DataFrame): The features. Missing features are counted as
+                missing values.
+        """
+        if list(df.columns) != self.columns:
+            df = df.reindex(columns=self.columns)
+        values = df.to_numpy(dtype=float)
+        bins = (values[:, :, None] > self._edges).sum(axis=2)
+        bins[np.isnan(values)] = self._bins - 1
+        counts = np.bincount(
+            (bins + self._offsets).ravel(), minlength=self.counts.size
+        ).reshape(self.counts.shape)
+        with self._lock:
+            self.counts += counts
+
+    def reset(self):
+        """Clears the counts."""
+        with self._lock:
+            self.counts[:] = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializes the sketch to a JSON compatible dict."""
+        return {
+            "columns": self.columns,
+            "categorical": self.categorical,
+            "edges": self.edges,
+            "counts": self.counts.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, summary: Dict[str, Any]) -> "FeatureSketch":
+        """Deserializes a sketch from `to_dict`."""
+        return cls(
+            summary["columns"],
+            summary["edges"],
+            summary.get("categorical", []),
+            summary.get("counts"),
+        )
+
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> np.ndarray:
+    """Computes the population stability index of each row of bin counts.
+
+    Args:
+        expected (np.ndarray): The reference counts, with a row per feature.
+        actual (np.ndarray): The compared counts, with the same bins.
+
+    Returns:
+        np.ndarray: The PSI of each feature. Above 0.25 is usually a
+            significant shift.
+
+    Example:
+        >>> psi(np.array([[50, 50], [50, 50]]), np.array([[50, 50], [90, 10]]))
+        array([0.        , 0.87888983])
+    """
+    expected = np.maximum(expected / expected.sum(axis=1, keepdims=True), _EPSILON)
+    actual = np.maximum(actual / actual.sum(axis=1, keepdims=True), _EPSILON)
+    return ((actual - expected) * np.log(actual / expected)).sum(axis=1)
+
+
+class _DriftParams(TypedDict, total=False):
+    enabled: bool
+    """Whether the served features are summarized."""
+    artifact: str
+    """Path of the training summary in the run of the model."""
+    threshold: float
+    """PSI above which a feature is reported as drifted."""
+
+
+class DriftMonitor:
+    """Summarizes the served features and compares them with the training ones.
+
+    When the served model is reloaded, the summary of the new model is loaded
+    in the background and the served counts are cleared.
+    """
+
+    def __init__(
+        self,
+        load_summary: Callable[[str], Optional[str]],
+        params: Optional[_DriftParams] = None,
+        version: Callable[[], Any] = lambda: None,
+    ):
+        """Initializes the monitor.
+
+        Args:
+            load_summary (Callable[[str], Optional[str]]): Gets the local path
+                of an artifact of the model run, or None if it is missing.
+            params (Optional[_DriftParams]): The drift params.
+            version (Callable[[], Any]): Gets the version of the served model,
+                changed by reloads.
+        """
+        params = params or {}
+        self._load_summary = load_summary
+        self._version = version
+        self._loaded_version: Any = None
+        self._loading = threading.Lock()
+        self._enabled = params.get("enabled", True)
+        self._artifact = params.get("artifact", "feature_summary.json")
+        self._threshold = params.get("threshold", 0.25)
+        self.training: Optional[FeatureSketch] = None
+        self.live: Optional[FeatureSketch] = None
+
+    def start(self) -> Optional[threading.Thread]:
+        """Loads the training summary in a daemon thread, if enabled.
+
+        Returns:
+            Optional[threading.Thread]: The loading thread, None if disabled or
+                already loading.
+        """
+        if not self._enabled or not self._loading.acquire(blocking=False):
+            return None
+        thread = threading.Thread(target=self._reload, name="drift", daemon=True)
+        thread.start()
+        return thread
+
+    def _reload(self):
+        """Loads the training summary, then lets the next reload start."""
+        try:
+            self.load()
+        finally:
+            self._loading.release()
+
+    def _check_version(self):
+        """Starts loading the summary of the served model, if it was reloaded."""
+        if self._version() != self._loaded_version:
+            self.start()
+
+    def load(self):
+        """Loads the training summary of the model and clears the live counts."""
+        # Set first, so a missing summary is not loaded again for every batch
+        self._loaded_version = self._version()
+        try:
+            path = self._load_summary(self._artifact)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed to load the training feature summary")
+            return
+        if path is None:
+            logger.warning("No '%s' logged with the model", self._artifact)
+            return
+        with open(path, encoding="utf-8") as file:
+            training = FeatureSketch.from_dict(json.load(file))
+        self.live = training.empty()
+        self.training = training
+
+    def update(self, features: pd.DataFrame):
+        """Counts the served features, once the training summary is loaded."""
+        self._check_version()
+        live = self.live
+        if live is not None:
+            live.update(features)
+
+    def report(self) -> Dict[str, Any]:
+        """Compares the served features with the training ones.
+
+        Returns:
+            Dict[str, Any]: The PSI and missing values rate of each feature, and
+                the features above the threshold.
+        """
+        self._check_version()
+        training, live = self.training, self.live
+        if training is None or live is None:
+            return {"enabled": self._enabled, "loaded": False}
+        counts = live.counts.copy()
+        rows = int(counts[0].sum()) if len(counts) else 0
+        features = {}
+        values = psi(training.counts, counts) if rows else np.zeros(len(counts))
+        for column, value, column_counts in zip(live.columns, values, counts):
+            features[column] = {
+                "psi": float(value),
+                "missing": float(column_counts[-1] / rows) if rows else 0.0,
+            }
+        return {
+            "enabled": self._enabled,
+            "loaded": True,
+            "rows": rows,
+            "threshold": self._threshold,
+            "drifted": [
+                column
+                for column, stats in features.items()
+                if rows and stats["psi"] > self._threshold
+            ],
+            "features": features,
+        }
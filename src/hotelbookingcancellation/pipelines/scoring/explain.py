@@ -0,0 +1,156 @@
+"""Batched and cached SHAP explanations of the model predictions."""
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
+
+import numpy as np
+import pandas as pd
+
+from .admission import AdmissionRejected
+
+MODES = {"exact": "Regular", "fast": "Approximate"}
+"""CatBoost `shap_calc_type` of each explanation mode."""
+
+_Key = Tuple[Any, str, int]
+
+
+class _ExplainParams(TypedDict, total=False):
+    workers: int
+    """Number of threads computing explanations."""
+    max_concurrent: int
+    """Maximum number of explanation requests at once, above which they fail
+    with a 429."""
+    thread_count: int
+    """CatBoost threads of each explanation batch."""
+    cache_size: int
+    """Number of booking explanations kept."""
+
+
+class Explainer:
+    """Computes CatBoost SHAP values apart from the scoring traffic.
+
+    Explanations run on a thread pool of their own, at most `max_concurrent`
+    requests at once, so they can not take the threads of the predictions. The
+    bookings of a request are explained in a single batch, and each explanation
+    is cached by the hash of the booking features, the model version and the
+    mode, so repeated bookings are explained once.
+    """
+
+    def __init__(self, params: Optional[_ExplainParams] = None):
+        """Initializes the explainer.
+
+        Args:
+            params (Optional[_ExplainParams]): The explanation params.
+        """
+        params = params or {}
+        self._workers = params.get("workers", 1)
+        self._max_concurrent = params.get("max_concurrent", 2)
+        self._thread_count = params.get("thread_count", 1)
+        self._cache_size = params.get("cache_size", 100_000)
+        self._cache: "OrderedDict[_Key, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._running = 0
+        self.hits = 0
+        self.misses = 0
+
+    def explain(
+        self, model: Any, version: Any, features: pd.DataFrame, mode: str = "exact"
+    ) -> np.ndarray:
+        """Computes the SHAP values of the features, using the cached ones.
+
+        Args:
+            model (Any): The CatBoost model.
+            version (Any): The model version, part of the cache key.
+            features (pd.DataFrame): The model features of the bookings.
+            mode (str): One of `MODES`.
+
+        Returns:
+            np.ndarray: The SHAP values of each booking and feature, followed by
+                the expected value.
+        """
+        hashes = pd.util.hash_pandas_object(features, index=False).to_numpy()
+        keys = [(version, mode, int(row_hash)) for row_hash in hashes]
+        values: Dict[_Key, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    values[key] = cached
+            missing = [
+                position for position, key in enumerate(keys) if key not in values
+            ]
+            unique = list({keys[position]: position for position in missing}.values())
+            self.hits += len(keys) - len(unique)
+            self.misses += len(unique)
+        if unique:
+            from catboost import Pool  # pylint: disable=import-outside-toplevel
+
+            shap_values = model.get_feature_importance(
+                Pool(features.iloc[unique]),
+                type="ShapValues",
+                shap_calc_type=MODES[mode],
+                thread_count=self._thread_count,
+            )
+            with self._lock:
+                for position, row in zip(unique, shap_values):
+                    values[keys[position]] = row
+                    self._cache[keys[position]] = row
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return np.stack([values[key] for key in keys])
+
+    async def run(self, function: Any, *args: Any) -> Any:
+        """Runs a function on the explanation threads.
+
+        Raises:
+            AdmissionRejected: If `max_concurrent` requests are running.
+        """
+        if self._running >= self._max_concurrent:
+            raise AdmissionRejected(429, "Too many explanations running", 1)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self._workers, thread_name_prefix="explain"
+            )
+        self._running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, function, *args
+            )
+        finally:
+            self._running -= 1
+
+    def shutdown(self):
+        """Stops the explanation threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def format_explanations(
+    columns: List[str], shap_values: np.ndarray
+) -> List[Dict[str, Any]]:
+    """Formats the SHAP values of each booking.
+
+    Args:
+        columns (List[str]): The feature names.
+        shap_values (np.ndarray): The SHAP values of each booking and feature,
+            followed by the expected value.
+
+    Returns:
+        List[Dict[str, Any]]: The expected value and the SHAP value of each
+            feature, per booking.
+
+    Example:
+        >>> format_explanations(["a", "b"], np.array([[0.5, -0.25, 1.0]]))
+        [{'expected_value': 1.0, 'shap_values': {'a': 0.5, 'b': -0.25}}]
+    """
+    return [
+        {
+            "expected_value": float(row[-1]),
+            "shap_values": dict(zip(columns, row[:-1].tolist())),
+        }
+        for row in shap_values
+    ]
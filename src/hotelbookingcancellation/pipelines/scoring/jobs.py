@@ -0,0 +1,339 @@
+"""Batch scoring jobs run on a process pool."""
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, TypedDict
+
+import pandas as pd
+import pyarrow as pa  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
+
+from .validation import ColumnarValidationError
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "text/csv": "csv",
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+"""File format of each accepted content type."""
+
+_FINISHED = ("done", "failed")
+
+
+class JobsError(Exception):
+    """A job can not be submitted or accessed."""
+
+    def __init__(self, status_code: int, detail: str):
+        """Initializes the error.
+
+        Args:
+            status_code (int): The HTTP status code of the error.
+            detail (str): The error description.
+        """
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _write_status(job: Path, **status: Any):
+    """Updates the status file of a job atomically."""
+    path = job / "status.json"
+    current = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    tmp = job / "status.json.tmp"
+    tmp.write_text(json.dumps({**current, **status, "updated": time.time()}))
+    os.replace(tmp, path)
+
+
+def _read_chunks(
+    path: Path, fmt: str, chunk_size: int, columns: Optional[List[str]] = None
+) -> Iterator[pd.DataFrame]:
+    """Reads the input of a job in chunks of `chunk_size` rows.
+
+    Only the `columns` in the input are read from CSV and Parquet files, the
+    others are never parsed. Every column if None.
+    """
+    if fmt == "csv":
+        usecols = None if columns is None else set(columns).__contains__
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=usecols)
+    elif fmt == "ndjson":
+        yield from pd.read_json(
+            path, lines=True, chunksize=chunk_size, dtype=False, convert_dates=False
+        )
+    elif fmt == "parquet":
+        file = pq.ParquetFile(path)
+        if columns is not None:
+            names = set(file.schema_arrow.names)
+            columns = [column for column in columns if column in names]
+        for batch in file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        df = pd.read_json(path, dtype=False, convert_dates=False)
+        for start in range(0, len(df), chunk_size):
+            end = start + chunk_size
+            yield df.iloc[start:end]
+
+
+def run_job(
+    job: Path,
+    fmt: str,
+    score: Callable[[pd.DataFrame], pd.Series],
+    chunk_size: int,
+    columns: Optional[List[str]] = None,
+):
+    """Scores the input of a job into `results.parquet`.
+
+    Runs in the worker processes. The predictions of each chunk are appended
+    as a row group, so memory is bounded by `chunk_size`.
+
+    Args:
+        job (Path): The job directory.
+        fmt (str): The input file format.
+        score (Callable[[pd.DataFrame], pd.Series]): Validates and scores a
+            chunk of bookings, returning the predictions indexed by chunk row.
+        chunk_size (int): Number of rows scored at once.
+        columns (Optional[List[str]]): The columns read from the input. All if
+            None.
+    """
+    _write_status(job, status="running", rows=0)
+    schema = pa.schema([("row", pa.int64()), ("prediction", pa.int64())])
+    rows = 0
+    with pq.ParquetWriter(job / "results.parquet.tmp", schema) as writer:
+        for chunk in _read_chunks(job / f"input.{fmt}", fmt, chunk_size, columns):
+            chunk = chunk.reset_index(drop=True)
+            try:
+                predictions = score(chunk)
+            except ColumnarValidationError as exc:
+                detail = [
+                    {**error, "loc": [*error["loc"][:2], rows + error["loc"][2]]}
+                    if len(error["loc"]) == 3
+                    else error
+                    for error in exc.errors
+                ]
+                _write_status(job, status="failed", rows=rows, detail=detail)
+                return
+            results = pd.DataFrame(
+                {
+                    "row": pd.RangeIndex(rows, rows + len(chunk)),
+                    "prediction": predictions.reindex(chunk.index).astype("Int64"),
+                }
+            )
+            writer.write_table(
+                pa.Table.from_pandas(results, schema=schema, preserve_index=False)
+            )
+            rows += len(chunk)
+            _write_status(job, rows=rows)
+    os.replace(job / "results.parquet.tmp", job / "results.parquet")
+    _write_status(job, status="done", rows=rows)
+
+
+class _JobsParams(TypedDict, total=False):
+    path: str
+    """Directory of the job inputs, results and status."""
+    workers: int
+    """Number of jobs run at once."""
+    max_pending: int
+    """Maximum number of jobs being received or submitted and not finished."""
+    max_bytes: int
+    """Maximum size of a job input."""
+    retention: float
+    """Seconds finished jobs are kept for."""
+    chunk_size: int
+    """Number of rows scored at once."""
+
+
+class JobStore:
+    """Runs batch scoring jobs on a process pool, keeping them on local files.
+
+    Each job has a directory with its spilled input, its status and progress in
+    `status.json` and its predictions in `results.parquet`.
+    """
+
+    def __init__(self, params: Optional[_JobsParams] = None):
+        """Initializes the store, failing the jobs a previous server left running.
+
+        Args:
+            params (Optional[_JobsParams]): The jobs params.
+        """
+        params = params or {}
+        self._path = Path(params.get("path", "data/jobs"))
+        self._workers = params.get("workers", 2)
+        self._max_pending = params.get("max_pending", 8)
+        self._max_bytes = params.get("max_bytes", 1024**3)
+        self._retention = params.get("retention", 24 * 60 * 60)
+        self._chunk_size = params.get("chunk_size", 100_000)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._receiving: Set[str] = set()
+        self._lock = threading.Lock()
+        self._path.mkdir(parents=True, exist_ok=True)
+        for job in self._jobs():
+            if self._status(job).get("status") not in _FINISHED:
+                _write_status(job, status="failed", detail="interrupted")
+        self.cleanup()
+
+    def _jobs(self) -> List[Path]:
+        """Gets the job directories, ignoring other entries of the path."""
+        return sorted(job for job in self._path.iterdir() if job.is_dir())
+
+    def _job(self, job_id: str) -> Path:
+        """Gets the directory of an existing job."""
+        job = self._path / job_id
+        if not job_id.isalnum() or not (job / "status.json").exists():
+            raise JobsError(404, f"Job '{job_id}' not found")
+        return job
+
+    @staticmethod
+    def _status(job: Path) -> Dict[str, Any]:
+        """Reads the status of a job."""
+        try:
+            return json.loads((job / "status.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def create(self, content_type: str) -> Path:
+        """Creates a job directory for an input of the content type.
+
+        Args:
+            content_type (str): The content type of the input.
+
+        Returns:
+            Path: The path the input must be written to.
+
+        The job holds a slot of `max_pending` while its input is received,
+        until it is submitted or discarded, so inputs can not be uploaded past
+        the limit.
+
+        Raises:
+            JobsError: If the format is not supported or there are too many jobs.
+        """
+        fmt = FORMATS.get(content_type.split(";")[0].strip())
+        if fmt is None:
+            raise JobsError(415, f"Unsupported content type '{content_type}'")
+        self.cleanup()
+        job = self._path / uuid.uuid4().hex
+        with self._lock:
+            running = [future for future in self._futures.values() if not future.done()]
+            if len(self._receiving) + len(running) >= self._max_pending:
+                raise JobsError(429, "Too many pending jobs")
+            self._receiving.add(job.name)
+        job.mkdir()
+        _write_status(job, id=job.name, status="receiving", rows=0, created=time.time())
+        return job / f"input.{fmt}"
+
+    def check_size(self, size: int):
+        """Checks the size of a job input.
+
+        Raises:
+            JobsError: If `size` is above `max_bytes`.
+        """
+        if size > self._max_bytes:
+            raise JobsError(413, f"Job input above {self._max_bytes} bytes")
+
+    def discard(self, path: Path):
+        """Deletes the job of an input that could not be received or submitted."""
+        shutil.rmtree(path.parent, ignore_errors=True)
+        with self._lock:
+            self._receiving.discard(path.parent.name)
+
+    def submit(
+        self,
+        path: Path,
+        score: Callable[[pd.DataFrame], pd.Series],
+        columns: Optional[List[str]] = None,
+    ) -> str:
+        """Queues the job of a written input.
+
+        Args:
+            path (Path): The job input, as returned by `create`.
+            score (Callable[[pd.DataFrame], pd.Series]): Picklable function
+                validating and scoring a chunk of bookings.
+            columns (Optional[List[str]]): The columns read from the input. All
+                if None.
+
+        Returns:
+            str: The job id.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self._workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        job = path.parent
+        _write_status(job, status="pending")
+        future = self._executor.submit(
+            run_job, job, path.suffix[1:], score, self._chunk_size, columns
+        )
+        future.add_done_callback(lambda future: self._finished(job, future))
+        with self._lock:
+            self._futures[job.name] = future
+            self._receiving.discard(job.name)
+        return job.name
+
+    def _finished(self, job: Path, future: Future):
+        """Fails the job if its worker raised."""
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            logger.error("Job %s failed", job.name, exc_info=exc)
+            _write_status(job, status="failed", detail=str(exc))
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        """Gets the status and progress of a job.
+
+        Raises:
+            JobsError: If the job does not exist.
+        """
+        return self._status(self._job(job_id))
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Gets the status of every job."""
+        return [self._status(job) for job in self._jobs()]
+
+    def results(self, job_id: str) -> Path:
+        """Gets the results file of a finished job.
+
+        Raises:
+            JobsError: If the job does not exist or is not done.
+        """
+        job = self._job(job_id)
+        if self._status(job).get("status") != "done":
+            raise JobsError(409, f"Job '{job_id}' is not done")
+        return job / "results.parquet"
+
+    def delete(self, job_id: str):
+        """Cancels and deletes a job.
+
+        Raises:
+            JobsError: If the job does not exist or is running.
+        """
+        job = self._job(job_id)
+        future = self._futures.pop(job_id, None)
+        if future is not None and not future.cancel() and not future.done():
+            self._futures[job_id] = future
+            raise JobsError(409, f"Job '{job_id}' is running")
+        shutil.rmtree(job, ignore_errors=True)
+
+    def cleanup(self):
+        """Deletes the finished jobs older than the retention."""
+        expired = time.time() - self._retention
+        for job in self._jobs():
+            status = self._status(job)
+            if status.get("status") in _FINISHED and status["updated"] < expired:
+                self._futures.pop(job.name, None)
+                shutil.rmtree(job, ignore_errors=True)
+
+    def shutdown(self):
+        """Stops the workers, cancelling the pending jobs."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
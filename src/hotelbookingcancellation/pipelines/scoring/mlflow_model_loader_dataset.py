@@ -1,10 +1,13 @@
 """DataSet for loading mlflow models from registry."""
 import importlib
+import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Protocol
+from typing import Any, Dict, Optional, Protocol, Tuple
 
 import mlflow  # type: ignore
+import mlflow.artifacts  # type: ignore
 import mlflow.exceptions  # type: ignore
 from kedro.io import AbstractDataSet, DataSetError
 
@@ -25,8 +28,25 @@ class _Update:
     data: Any = None
 
 
+@dataclass
+class LoaderStats:
+    """Counters of the registry accesses."""
+
+    reloads: int = 0
+    """Number of models loaded from the registry."""
+    registry_checks: int = 0
+    """Number of registry checks for model updates."""
+    evictions: int = 0
+    """Number of pooled models evicted to load others."""
+
+
 class MlflowModelLoaderDataSet(AbstractDataSet):
-    """Continuously loads a model from the `Model Registry`."""
+    """Continuously loads a model from the `Model Registry`.
+
+    Other models of the registry can be loaded on demand with `get`. They are
+    kept in a pool of at most `max_models` resident models, evicting the least
+    recently used.
+    """
 
     def __init__(  # pylint: disable=too-many-arguments
         self,
@@ -35,6 +55,7 @@ class MlflowModelLoaderDataSet(AbstractDataSet):
         stage: Optional[str] = None,
         retry: Optional[Dict[str, Any]] = None,
         update_interval: Optional[float] = None,
+        max_models: int = 1,
     ):
         """Initializes the dataset.
 
@@ -47,6 +68,8 @@ class MlflowModelLoaderDataSet(AbstractDataSet):
                 Defaults to None.
             update_interval (Optional[float]): Interval between checks for
                 updated model in seconds. Defaults to 5.
+            max_models (int): Maximum number of resident models, this one
+                included. Defaults to 1.
         """
         self._model_name = model
         self._flavor = flavor
@@ -54,6 +77,15 @@ class MlflowModelLoaderDataSet(AbstractDataSet):
         self._retry = _Update(**retry) if retry else _Update()
         self._update = _Update(interval=update_interval or 10.0)
         self._model = _Update()
+        self._run_id: Optional[str] = None
+        self.stats = LoaderStats()
+        self.reloading = False
+        self._lock = threading.Lock()
+        self._max_models = max_models
+        self._pool: "OrderedDict[Tuple[str, str], MlflowModelLoaderDataSet]" = (
+            OrderedDict()
+        )
+        self._pool_lock = threading.Lock()
 
     @property
     def _mlflow_module(self) -> MlflowLoaderFlavor:
@@ -64,44 +96,153 @@ class MlflowModelLoaderDataSet(AbstractDataSet):
         """
         return importlib.import_module(self._flavor)
 
-    @property
-    def _model_uri(self) -> str:
-        """Gets the model uri.
-
-        Returns:
-            str: The model uri.
-        """
-        return f"models:/{self._model_name}/{self._stage}"
-
-    def _check_updated(self) -> bool:
-        """Fetches the timestamp of the model.
+    def _check_updated(self) -> Optional[Any]:
+        """Fetches the timestamp of the model, at most once per update interval.
 
         Returns:
-            bool: Whether the model has been updated.
+            Optional[Any]: The registry timestamp of the model if it has been
+                updated since the current model, None otherwise.
         """
         update_time = time.perf_counter()
         if update_time > (self._update.last + self._update.interval):
             self._update.last = update_time
+            self.stats.registry_checks += 1
             model_timestamp = (
                 mlflow.MlflowClient()
                 .get_registered_model(self._model_name)
                 .last_updated_timestamp
             )
             if model_timestamp != self._model.last:
-                self._model.last = model_timestamp
-                return False
-        return True
+                return model_timestamp
+        return None
 
-    @property
-    def model(self) -> Any:
-        """Gets the current model."""
+    def _refresh(self):
+        """Loads the model if it has been updated, or if the registry fails."""
         try:
-            if not self._check_updated():
-                self._load()
+            timestamp = self._check_updated()
         except mlflow.MlflowException:
             self._load()
+            return
+        if timestamp is not None:
+            self._load()
+            self._model.last = timestamp
+
+    @property
+    def model(self) -> Any:
+        """Gets the current model.
+
+        A single caller checks for updates and loads the new model, while the
+        others keep getting the current one. Calls wait for the load only when
+        there is no model yet.
+        """
+        current = self._model.data
+        if current is not None and not self._lock.acquire(blocking=False):
+            return current
+        if current is None:
+            self._lock.acquire()  # pylint: disable=consider-using-with
+        try:
+            self._refresh()
+        finally:
+            self._lock.release()
         return self._model.data
 
+    @property
+    def loaded(self) -> Any:
+        """Gets the current model without checking for updates, None if not loaded."""
+        return self._model.data
+
+    @property
+    def version(self) -> Any:
+        """Gets the registry timestamp of the current model, changed by updates."""
+        return self._model.last
+
+    def _pooled(self, key: Tuple[str, str]) -> "MlflowModelLoaderDataSet":
+        """Gets the loader of a pooled model, evicting the least recently used."""
+        with self._pool_lock:
+            loader = self._pool.get(key)
+            if loader is None:
+                loader = MlflowModelLoaderDataSet(
+                    model=key[0],
+                    flavor=self._flavor,
+                    stage=key[1],
+                    retry={"enabled": False},
+                    update_interval=self._update.interval,
+                )
+                loader.stats = self.stats
+                self._pool[key] = loader
+            self._pool.move_to_end(key)
+            while len(self._pool) >= self._max_models:
+                self._pool.popitem(last=False)
+                self.stats.evictions += 1
+            return loader
+
+    def get(self, model: Optional[str] = None, stage: Optional[str] = None) -> Any:
+        """Gets a model of the registry, loading it if it is not resident.
+
+        Args:
+            model (Optional[str]): The name of the model. Defaults to the
+                dataset model.
+            stage (Optional[str]): Stage or version of the model. Defaults to
+                the dataset stage.
+
+        Returns:
+            Any: The model.
+
+        Raises:
+            DataSetError: If the model is not found.
+        """
+        key = (model or self._model_name, stage or self._stage)
+        if key == (self._model_name, self._stage):
+            return self.model
+        loader = self._pooled(key)
+        try:
+            return loader.model
+        except DataSetError:
+            with self._pool_lock:
+                if self._pool.get(key) is loader:
+                    del self._pool[key]
+            raise
+
+    def artifact(self, path: str) -> Optional[str]:
+        """Downloads an artifact of the run that logged the loaded model version.
+
+        Args:
+            path (str): Path of the artifact in the run.
+
+        Returns:
+            Optional[str]: The local path of the artifact, or None if no model
+                is loaded or its run has no such artifact.
+        """
+        run_id = self._run_id
+        if run_id is None:
+            return None
+        try:
+            return mlflow.artifacts.download_artifacts(
+                run_id=run_id, artifact_path=path
+            )
+        except (mlflow.MlflowException, OSError):
+            return None
+
+    def _resolve_version(self) -> Any:
+        """Gets the registry version of the model in the stage.
+
+        Returns:
+            Any: The `ModelVersion`.
+
+        Raises:
+            mlflow.MlflowException: If the stage has no version.
+        """
+        client = mlflow.MlflowClient()
+        if self._stage.isdigit():
+            return client.get_model_version(self._model_name, self._stage)
+        stages = None if self._stage.lower() == "latest" else [self._stage]
+        versions = client.get_latest_versions(self._model_name, stages)
+        if not versions:
+            raise mlflow.MlflowException(
+                f"No version of model '{self._model_name}' in stage '{self._stage}'"
+            )
+        return max(versions, key=lambda version: int(version.version))
+
     def _load(self) -> Any:
         """Loads the model.
 
@@ -111,11 +252,26 @@ class MlflowModelLoaderDataSet(AbstractDataSet):
         Raises:
             mlflow.MlflowException: If the model is not found after retries.
         """
+        self.reloading = True
+        try:
+            return self._load_with_retries()
+        finally:
+            self.reloading = False
+
+    def _load_with_retries(self) -> Any:
+        """Loads the model, retrying on failures if enabled."""
         retry = 0
         max_retries = self._retry.max if self._retry.enabled else 1
         while retry != max_retries:
             try:
-                self._model.data = self._mlflow_module.load_model(self._model_uri)
+                # The exact version is loaded, so its run is the one of the model
+                version = self._resolve_version()
+                model = self._mlflow_module.load_model(
+                    f"models:/{self._model_name}/{version.version}"
+                )
+                # Swapped at once, so readers keep the previous model meanwhile
+                self._model.data, self._run_id = model, version.run_id
+                self.stats.reloads += 1
                 return self
             except mlflow.MlflowException:
                 self._logger.warning(
@@ -147,4 +303,5 @@ class MlflowModelLoaderDataSet(AbstractDataSet):
             stage=self._stage,
             retry=self._retry,
             update=self._update,
+            max_models=self._max_models,
         )
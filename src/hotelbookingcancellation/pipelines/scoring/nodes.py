@@ -1,14 +1,39 @@
 """Contains the nodes for the scoring pipeline."""
+import json
+import time
 from datetime import date
-from typing import List, TypedDict, Union
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple, TypedDict, Union
 
+import numpy as np
+import orjson
 import pandas as pd
-import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse
+from kedro.io import DataSetError
+from prometheus_client import CONTENT_TYPE_LATEST  # type: ignore
 from pydantic import BaseModel
+from starlette.routing import Route
 
 from ..data_engineering.nodes import _PreprocessBookingsParams, preprocess_bookings
+from .admission import (
+    AdmissionController,
+    AdmissionRejected,
+    _AdmissionParams,
+    deadline,
+)
+from .controller import ConcurrencyController, _ControllerParams
+from .debug import _DebugParams, debug_router
+from .drift import DriftMonitor, _DriftParams
+from .explain import Explainer, _ExplainParams, format_explanations
+from .jobs import JobsError, JobStore, _JobsParams
 from .mlflow_model_loader_dataset import MlflowModelLoaderDataSet
+from .shadow import ShadowScorer, _ShadowParams
+from .streaming import NDJSONScorer, format_results, parse_lines
+from .telemetry import ScoringTelemetry, StageTimer, TelemetryMiddleware
+from .validation import ColumnarValidationError, validate_columns
+from .warmup import WarmUp, _WarmUpParams
 
 
 class Booking(BaseModel):
@@ -75,29 +100,468 @@ class _ScoringParams(TypedDict):
     """Uvicorn parameters."""
     fastapi: dict
     """FastAPI parameters."""
+    startup_target: float
+    """Seconds to be ready to serve, used by the standalone server."""
+    warmup: _WarmUpParams
+    """Model warm-up parameters."""
+    stream: dict
+    """Kwargs for the `NDJSONScorer` of the streaming endpoint."""
+    jobs: _JobsParams
+    """Batch scoring jobs parameters."""
+    models: Dict[str, dict]
+    """Preprocessing overrides of the models selected by request."""
+    shadow: _ShadowParams
+    """Shadow scoring parameters of a candidate model."""
+    admission: _AdmissionParams
+    """Admission control parameters."""
+    controller: _ControllerParams
+    """Online tuning parameters of the in-flight limit and batch size."""
+    debug: _DebugParams
+    """Profiling endpoints parameters."""
+    drift: _DriftParams
+    """Feature drift monitoring parameters."""
+    explain: _ExplainParams
+    """SHAP explanations parameters."""
 
 
-def scoring_server(
+ModelRef = Tuple[str, Optional[str], Optional[str]]
+
+
+def _model_refs(header: Optional[str]) -> List[ModelRef]:
+    """Parses the `X-Model` header, with comma separated `name[/stage]` models.
+
+    Args:
+        header (Optional[str]): The header value.
+
+    Returns:
+        List[ModelRef]: The reference, name and stage of each model. Defaults
+            to the dataset model.
+
+    Example:
+        >>> _model_refs("resort/Staging, city")
+        [('resort/Staging', 'resort', 'Staging'), ('city', 'city', None)]
+        >>> _model_refs(None)
+        [('', None, None)]
+    """
+    if not header:
+        return [("", None, None)]
+    refs = []
+    for ref in header.split(","):
+        name, _, stage = ref.strip().partition("/")
+        refs.append((ref.strip(), name or None, stage or None))
+    return refs
+
+
+def _feature_names(model: Any) -> Optional[List[str]]:
+    """Gets the features a model was trained on, None if it does not say."""
+    names = getattr(model, "feature_names_", None)
+    return None if names is None else list(names)
+
+
+def _features(
+    df: pd.DataFrame,
+    preprocess_params: _PreprocessBookingsParams,
+    columns: Optional[List[str]] = None,
+):
+    """Preprocesses the bookings into the model features.
+
+    Args:
+        df (pd.DataFrame): The bookings.
+        preprocess_params (_PreprocessBookingsParams): Preprocessing parameters.
+        columns (Optional[List[str]]): The model features, in order. Only the
+            booking columns they need are preprocessed. All the features if None.
+
+    Returns:
+        pd.DataFrame: The model features.
+    """
+    target = preprocess_params["target"]
+    if columns is not None:
+        required = {
+            *columns,
+            target,
+            preprocess_params["date_column"],
+            *preprocess_params["columns_to_remove"]["columns"],
+            *(preprocess_params.get("columns_to_normalize") or []),
+        }
+        df = df[[column for column in df.columns if column in required]]
+        preprocess_params = {
+            **preprocess_params,
+            "columns_to_map": {
+                column: mapping
+                for column, mapping in preprocess_params.get(
+                    "columns_to_map", {}
+                ).items()
+                if column in required
+            },
+            "columns_to_fillna": {
+                column: fill
+                for column, fill in preprocess_params.get(
+                    "columns_to_fillna", {}
+                ).items()
+                if column in required
+            },
+        }
+    features = preprocess_bookings(df.assign(**{target: 0}), preprocess_params)
+    return features[columns] if columns is not None else features.drop(columns=target)
+
+
+def _score_frame(
+    df: pd.DataFrame, model: Any, preprocess_params: _PreprocessBookingsParams
+) -> pd.Series:
+    """Validates and scores bookings, used by the batch scoring jobs.
+
+    Args:
+        df (pd.DataFrame): The bookings.
+        model (Any): The model.
+        preprocess_params (_PreprocessBookingsParams): Preprocessing parameters.
+
+    Returns:
+        pd.Series: The predictions, indexed as the bookings kept by the
+            preprocessing.
+    """
+    categories = preprocess_params.get("columns_to_map", {})
+    df = validate_columns(df.to_dict("list"), Booking, categories, len(df))
+    df = _features(df, preprocess_params, _feature_names(model))
+    return pd.Series(model.predict(df), index=df.index)
+
+
+def _json_response(content: Any, status_code: int = 200) -> Response:
+    """Serializes the content, numpy arrays included, with `orjson`.
+
+    Args:
+        content (Any): The response content.
+        status_code (int): The response status code.
+
+    Returns:
+        Response: The JSON response.
+    """
+    return Response(
+        orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+def create_app(
     dataset: MlflowModelLoaderDataSet,
     preprocess_params: _PreprocessBookingsParams,
     scoring_params: _ScoringParams,
-):
-    """Creates a FastAPI server for scoring the model.
+) -> FastAPI:
+    """Creates the FastAPI app for scoring the model.
 
     Args:
         dataset: MlflowModelLoaderDataSet instance.
         preprocess_params: Preprocessing parameters.
         scoring_params: Scoring parameters.
+
+    Returns:
+        FastAPI: The scoring app.
     """
     app = FastAPI(**scoring_params.get("fastapi", {}))
+    telemetry = ScoringTelemetry(dataset)
+    example = Booking.Config.schema_extra["example"]
+
+    def warm(size: int):
+        model = dataset.model
+        df = pd.json_normalize([example] * size)
+        model.predict(_features(df, preprocess_params, _feature_names(model)))
+
+    warmup = WarmUp(dataset, warm, scoring_params.get("warmup"))
+    app.add_event_handler("startup", warmup.start)
+
+    app.add_middleware(TelemetryMiddleware, telemetry=telemetry)
+
+    shadow = ShadowScorer(dataset, scoring_params.get("shadow"))
+    telemetry.registry.register(shadow)
+    app.add_event_handler("shutdown", shadow.shutdown)
+
+    @app.get("/shadow")
+    def shadow_summary():
+        return shadow.summary()
+
+    drift = DriftMonitor(
+        getattr(dataset, "artifact", lambda _: None),
+        scoring_params.get("drift"),
+        lambda: getattr(dataset, "version", None),
+    )
+    app.add_event_handler("startup", drift.start)
+
+    @app.get("/drift")
+    def drift_report():
+        return drift.report()
+
+    @app.post("/drift/reset")
+    def drift_reset():
+        drift.load()
+        return drift.report()
+
+    @app.get("/live")
+    def live():
+        if not warmup.alive:
+            return JSONResponse({"status": "failed"}, status_code=503)
+        return {"status": "alive"}
+
+    @app.get("/ready")
+    def ready():
+        if not warmup.ready:
+            return JSONResponse({"status": "unavailable"}, status_code=503)
+        return {"status": "ready"}
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(telemetry.export(), media_type=CONTENT_TYPE_LATEST)
+
+    admission = AdmissionController(scoring_params.get("admission"))
+    controller = ConcurrencyController(admission, scoring_params.get("controller"))
+    app.add_event_handler("startup", controller.start)
+    app.add_event_handler("shutdown", controller.stop)
+
+    @app.get("/admin/controller")
+    def controller_state():
+        return controller.state()
+
+    debug = scoring_params.get("debug", {})
+    if debug.get("enabled"):
+        app.include_router(debug_router(debug))
+
+    def predict_batches(model: Any, features: pd.DataFrame) -> np.ndarray:
+        size = controller.batch_size
+        if len(features) <= size:
+            return np.asarray(model.predict(features, **controller.predict_kwargs))
+        batches = []
+        for start in range(0, len(features), size):
+            end = start + size
+            batch = features.iloc[start:end]
+            batches.append(model.predict(batch, **controller.predict_kwargs))
+        return np.concatenate(batches)
+
+    models = scoring_params.get("models", {})
+    model_preprocessing: Dict[Optional[str], Tuple[str, dict]] = {}
+
+    def preprocessing(name: Optional[str]) -> Tuple[str, dict]:
+        if name not in model_preprocessing:
+            overrides = models.get(name or "", {}).get("preprocessing", {})
+            params = {**preprocess_params, **overrides}
+            model_preprocessing[name] = json.dumps(params, sort_keys=True), params
+        return model_preprocessing[name]
+
+    def predict(df: pd.DataFrame, timer: StageTimer, refs: List[ModelRef]) -> Response:
+        started = time.perf_counter()
+        predict_seconds = 0.0
+        size = len(df)
+        timer.lap("parse")
+        features: Dict[Tuple[str, Optional[Tuple[str, ...]]], pd.DataFrame] = {}
+        results = {}
+        served: Optional[Tuple[pd.DataFrame, np.ndarray]] = None
+        for ref, name, stage in refs:
+            try:
+                model = dataset.get(name, stage)
+            except DataSetError:
+                return _json_response({"detail": f"Model '{ref}' not found"}, 404)
+            params_key, params = preprocessing(name)
+            columns = _feature_names(model)
+            key = params_key, None if columns is None else tuple(columns)
+            if key not in features:
+                features[key] = _features(df, params, columns)
+                timer.lap("preprocess")
+            predict_started = time.perf_counter()
+            results[ref] = np.ascontiguousarray(predict_batches(model, features[key]))
+            predict_seconds += time.perf_counter() - predict_started
+            timer.lap("predict")
+            if name is None and stage is None:
+                served = features[key], results[ref]
+        response = _json_response(results if len(refs) > 1 else results[refs[0][0]])
+        timer.lap("serialize")
+        response.headers["Server-Timing"] = timer.server_timing
+        telemetry.observe_batch(size)
+        controller.observe(size, time.perf_counter() - started, predict_seconds)
+        if served is not None:
+            drift.update(served[0])
+            shadow.submit(*served)
+        return response
+
+    @app.exception_handler(AdmissionRejected)
+    def admission_rejected(_: Request, exc: AdmissionRejected):
+        telemetry.observe_rejected(exc.status_code)
+        return JSONResponse(
+            {"detail": exc.detail},
+            status_code=exc.status_code,
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    def score_bookings(
+        bookings: List[Booking], timer: StageTimer, refs: List[ModelRef]
+    ) -> Response:
+        df = pd.json_normalize([booking.dict() for booking in bookings])
+        return predict(df, timer, refs)
+
+    async def admit_bookings(
+        bookings: List[Booking], request: Request, refs: List[ModelRef]
+    ) -> Response:
+        started = request.state.started
+        timer = telemetry.timer(started)
+        due = deadline(request.headers, started)
+        async with admission.admit(len(bookings), due):
+            timer.lap("queue")
+            return await run_in_threadpool(score_bookings, bookings, timer, refs)
 
     @app.post("/")
-    def score(bookings: List[Booking]):
+    async def score(bookings: List[Booking], request: Request):
+        refs = _model_refs(request.headers.get("x-model"))
+        return await admit_bookings(bookings, request, refs)
+
+    @app.post("/models/{name}/{stage}")
+    async def score_model(
+        name: str, stage: str, bookings: List[Booking], request: Request
+    ):
+        return await admit_bookings(
+            bookings, request, [(f"{name}/{stage}", name, stage)]
+        )
+
+    explainer = Explainer(scoring_params.get("explain"))
+    app.add_event_handler("shutdown", explainer.shutdown)
+
+    def explain_bookings(bookings: List[Booking], mode: str) -> Response:
         df = pd.json_normalize([booking.dict() for booking in bookings])
-        df[preprocess_params["target"]] = 0
-        df = preprocess_bookings(df, preprocess_params).drop(
-            columns=preprocess_params["target"]
+        model = dataset.model
+        features = _features(df, preprocess_params, _feature_names(model))
+        version = getattr(dataset, "version", None)
+        shap_values = explainer.explain(model, version, features, mode)
+        return _json_response(format_explanations(list(features), shap_values))
+
+    @app.post("/explain")
+    async def explain(
+        bookings: List[Booking], mode: str = Query("exact", regex="^(exact|fast)$")
+    ):
+        return await explainer.run(explain_bookings, bookings, mode)
+
+    categories = preprocess_params.get("columns_to_map", {})
+
+    def score_body(body: bytes, timer: StageTimer, refs: List[ModelRef]) -> Response:
+        try:
+            df = validate_columns(orjson.loads(body), Booking, categories)
+        except orjson.JSONDecodeError:
+            error = {"loc": ["body"], "msg": "invalid JSON", "type": "value_error.json"}
+            return _json_response({"detail": [error]}, status_code=422)
+        except ColumnarValidationError as exc:
+            return _json_response({"detail": exc.errors}, status_code=422)
+        return predict(df, timer, refs)
+
+    @app.post("/columnar")
+    async def score_columnar(request: Request):
+        started = request.state.started
+        timer = telemetry.timer(started)
+        refs = _model_refs(request.headers.get("x-model"))
+        body = await request.body()
+        rows = max(1, len(body) // admission.row_bytes)
+        async with admission.admit(rows, deadline(request.headers, started)):
+            timer.lap("queue")
+            return await run_in_threadpool(score_body, body, timer, refs)
+
+    def score_lines(lines: List[bytes], offset: int) -> bytes:
+        started = time.perf_counter()
+        predict_seconds = 0.0
+        df, errors = parse_lines(lines, Booking, categories)
+        predictions = {}
+        if len(df):
+            model = dataset.model
+            df = _features(df, preprocess_params, _feature_names(model))
+            predict_started = time.perf_counter()
+            served = predict_batches(model, df)
+            predict_seconds = time.perf_counter() - predict_started
+            predictions = dict(zip(df.index, served.tolist()))
+            drift.update(df)
+            shadow.submit(df, served)
+        telemetry.observe_batch(len(lines))
+        controller.observe(len(lines), time.perf_counter() - started, predict_seconds)
+        return format_results(len(lines), offset, predictions, errors)
+
+    jobs = JobStore(scoring_params.get("jobs"))
+    app.add_event_handler("shutdown", jobs.shutdown)
+
+    @app.exception_handler(JobsError)
+    def jobs_error(_: Request, exc: JobsError):
+        return JSONResponse({"detail": exc.detail}, status_code=exc.status_code)
+
+    @app.post("/jobs", status_code=202)
+    async def submit_job(request: Request):
+        # The files and the model are accessed on the threadpool, so the event
+        # loop keeps serving other requests during uploads and model loads
+        path = await run_in_threadpool(
+            jobs.create, request.headers.get("content-type", "")
+        )
+        size = 0
+        try:
+            file = await run_in_threadpool(open, path, "wb")
+            try:
+                async for chunk in request.stream():
+                    size += len(chunk)
+                    jobs.check_size(size)
+                    await run_in_threadpool(file.write, chunk)
+            finally:
+                await run_in_threadpool(file.close)
+            model = await run_in_threadpool(getattr, dataset, "model")
+            score = partial(
+                _score_frame, model=model, preprocess_params=preprocess_params
+            )
+            job_id = await run_in_threadpool(
+                jobs.submit, path, score, list(Booking.__fields__)
+            )
+        except BaseException:
+            # Frees the slot the job held while its input was received
+            jobs.discard(path)
+            raise
+        return {"id": job_id, "status": "pending"}
+
+    @app.get("/jobs")
+    def list_jobs():
+        return jobs.list_jobs()
+
+    @app.get("/jobs/{job_id}")
+    def job_status(job_id: str):
+        return jobs.status(job_id)
+
+    @app.get("/jobs/{job_id}/results")
+    def job_results(job_id: str):
+        return FileResponse(
+            jobs.results(job_id),
+            media_type="application/vnd.apache.parquet",
+            filename=f"{job_id}.parquet",
+        )
+
+    @app.delete("/jobs/{job_id}", status_code=204)
+    def delete_job(job_id: str):
+        jobs.delete(job_id)
+
+    app.router.routes.append(
+        Route(
+            "/stream",
+            NDJSONScorer(
+                score_lines,
+                admit=admission.admit,
+                rejected=telemetry.observe_rejected,
+                **scoring_params.get("stream", {}),
+            ),
+            methods=["POST"],
         )
-        return dataset.model.predict(df).tolist()
+    )
+
+    return app
+
+
+def scoring_server(
+    dataset: MlflowModelLoaderDataSet,
+    preprocess_params: _PreprocessBookingsParams,
+    scoring_params: _ScoringParams,
+):
+    """Creates a FastAPI server for scoring the model.
+
+    Args:
+        dataset: MlflowModelLoaderDataSet instance.
+        preprocess_params: Preprocessing parameters.
+        scoring_params: Scoring parameters.
+    """
+    import uvicorn  # pylint: disable=import-outside-toplevel
 
+    app = create_app(dataset, preprocess_params, scoring_params)
     uvicorn.run(app, **scoring_params.get("uvicorn", {}))
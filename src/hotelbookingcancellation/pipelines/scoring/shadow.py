@@ -0,0 +1,167 @@
+"""Shadow scoring of a candidate model on live traffic."""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, Optional, TypedDict
+
+import numpy as np
+import pandas as pd
+from prometheus_client.core import CounterMetricFamily, Metric  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class _ShadowParams(TypedDict, total=False):
+    model: str
+    """Name of the candidate model. Defaults to the served model."""
+    stage: str
+    """Stage or version of the candidate model. Shadowing is off without it."""
+    workers: int
+    """Number of threads scoring the candidate."""
+    max_pending: int
+    """Maximum number of batches waiting for the candidate, above which new
+    batches are dropped."""
+
+
+@dataclass
+class ShadowStats:
+    """Counters of the shadow scoring."""
+
+    batches: int = 0
+    """Number of batches scored by the candidate."""
+    dropped: int = 0
+    """Number of batches dropped because too many were pending."""
+    failed: int = 0
+    """Number of batches the candidate failed to score."""
+    rows: int = 0
+    """Number of bookings scored by the candidate."""
+    agreements: int = 0
+    """Number of bookings with the same prediction from both models."""
+    seconds: float = 0.0
+    """Time spent predicting with the candidate."""
+
+
+class ShadowScorer:
+    """Scores the served batches with a candidate model off the response path.
+
+    The candidate predicts the features already preprocessed for the served
+    model on a thread pool of its own. Batches are dropped instead of queued
+    once `max_pending` are waiting, so shadowing never delays the responses.
+    The candidate gets the served features it was trained on, and fails on the
+    batches without them.
+    """
+
+    def __init__(self, dataset: Any, params: Optional[_ShadowParams] = None):
+        """Initializes the scorer.
+
+        Args:
+            dataset (Any): The model loader, whose `get` loads the candidate.
+            params (Optional[_ShadowParams]): The shadow params.
+        """
+        params = params or {}
+        self._dataset = dataset
+        self._model = params.get("model")
+        self._stage = params.get("stage")
+        self._workers = params.get("workers", 1)
+        self._max_pending = params.get("max_pending", 4)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.stats = ShadowStats()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a candidate model is configured."""
+        return self._stage is not None
+
+    def submit(self, features: pd.DataFrame, predictions: Any) -> bool:
+        """Queues a served batch for the candidate, unless too many are pending.
+
+        Args:
+            features (pd.DataFrame): The preprocessed features of the batch.
+                They must not be modified afterwards.
+            predictions (Any): The predictions of the served model.
+
+        Returns:
+            bool: Whether the batch was queued.
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            if self._pending >= self._max_pending:
+                self.stats.dropped += 1
+                return False
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self._workers, thread_name_prefix="shadow"
+                )
+        self._executor.submit(self._score, features, predictions)
+        return True
+
+    def _score(self, features: pd.DataFrame, predictions: Any):
+        """Scores a batch with the candidate and records the agreement."""
+        try:
+            started = time.perf_counter()
+            model = self._dataset.get(self._model, self._stage)
+            columns = getattr(model, "feature_names_", None)
+            if columns is not None:
+                features = features[list(columns)]
+            candidate = np.asarray(model.predict(features))
+            seconds = time.perf_counter() - started
+            agreements = np.count_nonzero(candidate == np.asarray(predictions))
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Shadow scoring failed")
+            with self._lock:
+                self._pending -= 1
+                self.stats.failed += 1
+            return
+        with self._lock:
+            self._pending -= 1
+            self.stats.batches += 1
+            self.stats.rows += len(candidate)
+            self.stats.agreements += int(agreements)
+            self.stats.seconds += seconds
+
+    def summary(self) -> Dict[str, Any]:
+        """Gets the counters, agreement rate and mean latency of the candidate.
+
+        Returns:
+            Dict[str, Any]: The shadow scoring summary.
+        """
+        with self._lock:
+            stats = asdict(self.stats)
+        batches, rows = stats["batches"], stats["rows"]
+        return {
+            "enabled": self.enabled,
+            "model": self._model,
+            "stage": self._stage,
+            **stats,
+            "agreement": stats["agreements"] / rows if rows else None,
+            "mean_seconds": stats["seconds"] / batches if batches else None,
+        }
+
+    def collect(self) -> Iterator[Metric]:
+        """Collects the counters as Prometheus metrics."""
+        for name, description in (
+            ("batches", "Number of batches scored by the shadow model."),
+            ("dropped", "Number of batches dropped by the shadow model."),
+            ("failed", "Number of batches the shadow model failed to score."),
+            ("rows", "Number of bookings scored by the shadow model."),
+            ("agreements", "Number of bookings predicted alike by both models."),
+            ("seconds", "Time spent predicting with the shadow model."),
+        ):
+            metric = CounterMetricFamily(f"scoring_shadow_{name}", description)
+            metric.add_metric([], getattr(self.stats, name))
+            yield metric
+
+    def shutdown(self, wait: bool = False):
+        """Stops the candidate threads, dropping the pending batches.
+
+        Args:
+            wait (bool): Whether to wait for the batches being scored.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
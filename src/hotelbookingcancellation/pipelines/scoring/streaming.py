@@ -0,0 +1,231 @@
+"""Streaming scoring of newline-delimited JSON bookings."""
+import time
+from typing import (
+    Any,
+    AsyncContextManager,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+)
+
+import orjson
+import pandas as pd
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
+
+from .admission import AdmissionRejected, deadline
+from .validation import ColumnarValidationError, validate_columns
+
+Errors = Dict[int, List[Dict[str, Any]]]
+
+Admit = Callable[[int, Optional[float]], AsyncContextManager[None]]
+"""Holds a number of bookings of the in-flight limit, given the deadline."""
+
+
+def _columns(records: List[Tuple[int, dict]], fields: Iterable[str]) -> dict:
+    """Gets the column-oriented values of the records."""
+    return {name: [record.get(name) for _, record in records] for name in fields}
+
+
+def parse_lines(
+    lines: List[bytes], model: Type[BaseModel], categories: Dict[str, Iterable[str]]
+) -> Tuple[pd.DataFrame, Errors]:
+    """Parses and validates a batch of JSON lines.
+
+    Args:
+        lines (List[bytes]): The JSON encoded records.
+        model (Type[BaseModel]): The model of a record.
+        categories (Dict[str, Iterable[str]]): The allowed values of `str`
+            fields.
+
+    Returns:
+        Tuple[pd.DataFrame, Errors]:
+            0. df (pd.DataFrame): The valid records, indexed by their line.
+            1. errors (Errors): The validation errors of each invalid line.
+    """
+    fields = model.__fields__
+    required = {name for name, field in fields.items() if field.required}
+    errors: Errors = {}
+    records = []
+    for line, raw in enumerate(lines):
+        try:
+            record = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            errors[line] = [
+                {"loc": [], "msg": "invalid JSON", "type": "value_error.json"}
+            ]
+            continue
+        if not isinstance(record, dict):
+            msg = "value is not a valid dict"
+            errors[line] = [{"loc": [], "msg": msg, "type": "type_error.dict"}]
+            continue
+        missing = required - record.keys()
+        if missing:
+            errors[line] = [
+                {"loc": [name], "msg": "field required", "type": "value_error.missing"}
+                for name in sorted(missing)
+            ]
+            continue
+        records.append((line, record))
+    try:
+        df = validate_columns(
+            _columns(records, fields), model, categories, len(records) * len(fields)
+        )
+    except ColumnarValidationError as exc:
+        for error in exc.errors:
+            _, name, position = error["loc"]
+            line = records[position][0]
+            errors.setdefault(line, []).append({**error, "loc": [name]})
+        records = [(line, record) for line, record in records if line not in errors]
+        df = validate_columns(_columns(records, fields), model, categories)
+    df.index = [line for line, _ in records]
+    return df, errors
+
+
+def format_results(
+    size: int, offset: int, predictions: Dict[int, Any], errors: Errors
+) -> bytes:
+    """Formats the results of a batch as JSON lines.
+
+    Args:
+        size (int): Number of lines of the batch.
+        offset (int): Number of lines before the batch.
+        predictions (Dict[int, Any]): The prediction of each scored line.
+        errors (Errors): The validation errors of each invalid line.
+
+    Returns:
+        bytes: One `{"row", "prediction"}` or `{"row", "detail"}` line per line.
+
+    Example:
+        >>> format_results(2, 10, {0: 1}, {1: [{"msg": "invalid JSON"}]})
+        b'{"row":10,"prediction":1}\\n{"row":11,"detail":[{"msg":"invalid JSON"}]}\\n'
+    """
+    return b"".join(
+        orjson.dumps(
+            {"row": offset + line, "detail": errors[line]}
+            if line in errors
+            else {"row": offset + line, "prediction": predictions.get(line)},
+            option=orjson.OPT_APPEND_NEWLINE,
+        )
+        for line in range(size)
+    )
+
+
+class NDJSONScorer:  # pylint: disable=too-few-public-methods
+    """ASGI app scoring newline-delimited bookings while they arrive.
+
+    The lines are scored in batches of `batch_size` as soon as they are
+    complete, and their results are sent before more of the body is read.
+    Memory is bounded by the batch size, and a client reading slowly pauses the
+    reading of its own request.
+
+    Each batch is admitted by `admit` before being scored, with the deadline
+    of the `X-Deadline-Ms` header. A request whose first batch is shed gets the
+    429 or 503 response of the other endpoints. Once results were sent, the
+    lines of a shed batch get the rejection as their `detail` and the stream
+    ends.
+    """
+
+    def __init__(
+        self,
+        score: Callable[[List[bytes], int], bytes],
+        batch_size: int = 1000,
+        max_line_bytes: int = 65536,
+        admit: Optional[Admit] = None,
+        rejected: Callable[[int], None] = lambda _: None,
+    ):
+        """Initializes the app.
+
+        Args:
+            score (Callable[[List[bytes], int], bytes]): Scores a batch of lines,
+                given the number of lines before it, into NDJSON results.
+            batch_size (int): Number of lines scored at once.
+            max_line_bytes (int): Maximum size of a line.
+            admit (Optional[Admit]): Admits a batch, raising `AdmissionRejected`
+                to shed it. Every batch is admitted if None.
+            rejected (Callable[[int], None]): Called with the status code of
+                the shed requests.
+        """
+        self._score = score
+        self._batch_size = batch_size
+        self._max_line_bytes = max_line_bytes
+        self._admit = admit
+        self._rejected = rejected
+
+    async def _score_batch(
+        self, batch: List[bytes], offset: int, due: Optional[float]
+    ) -> bytes:
+        """Scores a batch on the threadpool, once admitted."""
+        if self._admit is None:
+            return await run_in_threadpool(self._score, batch, offset)
+        async with self._admit(len(batch), due):
+            return await run_in_threadpool(self._score, batch, offset)
+
+    async def _send(self, send: Send, body: bytes, more_body: bool = True):
+        await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        started = scope.get("state", {}).get("started", time.perf_counter())
+        due = deadline(Headers(scope=scope), started)
+        responded = False
+
+        async def respond(body: bytes, more_body: bool = True):
+            nonlocal responded
+            if not responded:
+                responded = True
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 200,
+                        "headers": [(b"content-type", b"application/x-ndjson")],
+                    }
+                )
+            await self._send(send, body, more_body)
+
+        buffer = b""
+        lines: List[bytes] = []
+        offset = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            more_body = message.get("more_body", False)
+            *complete, buffer = (buffer + message.get("body", b"")).split(b"\n")
+            if len(buffer) > self._max_line_bytes:
+                error = {"loc": [], "msg": "line too long", "type": "value_error.line"}
+                row = offset + len(lines) + len(complete)
+                await respond(format_results(1, row, {}, {0: [error]}), False)
+                return
+            lines.extend(line for line in complete if line.strip())
+            if not more_body and buffer.strip():
+                lines.append(buffer)
+            while len(lines) >= self._batch_size or (lines and not more_body):
+                size = self._batch_size
+                batch, lines = lines[:size], lines[size:]
+                try:
+                    results = await self._score_batch(batch, offset, due)
+                except AdmissionRejected as exc:
+                    self._rejected(exc.status_code)
+                    if not responded:
+                        response = JSONResponse(
+                            {"detail": exc.detail},
+                            status_code=exc.status_code,
+                            headers={"Retry-After": str(exc.retry_after)},
+                        )
+                        await response(scope, receive, send)
+                        return
+                    error = {"loc": [], "msg": exc.detail, "type": "value_error.shed"}
+                    errors = {line: [error] for line in range(len(batch))}
+                    await respond(format_results(len(batch), offset, {}, errors), False)
+                    return
+                await respond(results)
+                offset += len(batch)
+        await respond(b"", more_body=False)
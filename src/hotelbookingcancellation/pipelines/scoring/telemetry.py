@@ -0,0 +1,201 @@
+"""Prometheus metrics of the scoring server."""
+import time
+from typing import Any, Dict, Iterator
+
+from prometheus_client import (  # type: ignore
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, Metric  # type: ignore
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+_LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+_BATCH_BUCKETS = (1, 2, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+
+class _LoaderCollector:  # pylint: disable=too-few-public-methods
+    """Exposes the registry access counters of a model loader."""
+
+    def __init__(self, dataset: Any):
+        """Initializes the collector.
+
+        Args:
+            dataset (Any): The model loader. Its `stats`, and the
+                `cascade_stats` of a loaded cascade, are read on scrape.
+        """
+        self._dataset = dataset
+
+    def collect(self) -> Iterator[Metric]:
+        """Collects the counters."""
+        stats = getattr(self._dataset, "stats", None)
+        reloads = CounterMetricFamily(
+            "scoring_model_reloads", "Number of models loaded from the registry."
+        )
+        reloads.add_metric([], getattr(stats, "reloads", 0))
+        checks = CounterMetricFamily(
+            "scoring_registry_checks", "Number of registry checks for model updates."
+        )
+        checks.add_metric([], getattr(stats, "registry_checks", 0))
+        evictions = CounterMetricFamily(
+            "scoring_model_evictions", "Number of pooled models evicted."
+        )
+        evictions.add_metric([], getattr(stats, "evictions", 0))
+        metrics = [reloads, checks, evictions]
+        cascade_stats = getattr(
+            getattr(self._dataset, "loaded", None), "cascade_stats", None
+        )
+        if cascade_stats is not None:
+            rows = CounterMetricFamily(
+                "scoring_cascade_rows", "Number of bookings scored by the cascade."
+            )
+            rows.add_metric([], cascade_stats.rows)
+            escalated = CounterMetricFamily(
+                "scoring_cascade_escalated",
+                "Number of bookings escalated to the full model by the cascade.",
+            )
+            escalated.add_metric([], cascade_stats.escalated)
+            metrics.extend([rows, escalated])
+        return iter(metrics)
+
+
+class StageTimer:
+    """Measures the consecutive stages of a request."""
+
+    def __init__(self, telemetry: "ScoringTelemetry", started: float):
+        """Initializes the timer.
+
+        Args:
+            telemetry (ScoringTelemetry): Where the stage latencies are recorded.
+            started (float): `time.perf_counter` value of the request start.
+        """
+        self._telemetry = telemetry
+        self._last = started
+        self.timings: Dict[str, float] = {}
+
+    def lap(self, stage: str):
+        """Adds the time since the previous stage to the `stage` latency.
+
+        Args:
+            stage (str): The stage that just finished.
+        """
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        self.timings[stage] = self.timings.get(stage, 0.0) + elapsed
+        self._telemetry.observe_stage(stage, elapsed)
+
+    @property
+    def server_timing(self) -> str:
+        """Gets the `Server-Timing` header value of the recorded stages."""
+        return ", ".join(
+            f"{stage};dur={seconds * 1000:.3f}"
+            for stage, seconds in self.timings.items()
+        )
+
+
+class ScoringTelemetry:
+    """Latency, batch size, concurrency and model loader metrics."""
+
+    def __init__(self, dataset: Any):
+        """Initializes the metrics in a registry of their own.
+
+        Args:
+            dataset (Any): The model loader.
+        """
+        self.registry = CollectorRegistry()
+        self._stages = Histogram(
+            "scoring_stage_seconds",
+            "Latency of each scoring stage.",
+            ["stage"],
+            buckets=_LATENCY_BUCKETS,
+            registry=self.registry,
+        )
+        self._batch_size = Histogram(
+            "scoring_batch_size",
+            "Number of bookings per request.",
+            buckets=_BATCH_BUCKETS,
+            registry=self.registry,
+        )
+        self.in_flight = Gauge(
+            "scoring_requests_in_flight",
+            "Number of requests being handled.",
+            registry=self.registry,
+        )
+        self._rejected = Counter(
+            "scoring_rejected_requests",
+            "Number of requests shed by the admission control.",
+            ["status"],
+            registry=self.registry,
+        )
+        self.registry.register(_LoaderCollector(dataset))
+
+    def timer(self, started: float) -> StageTimer:
+        """Creates a timer for the stages of a request.
+
+        Args:
+            started (float): `time.perf_counter` value of the request start.
+
+        Returns:
+            StageTimer: The request timer.
+        """
+        return StageTimer(self, started)
+
+    def observe_stage(self, stage: str, seconds: float):
+        """Records the latency of a stage."""
+        self._stages.labels(stage).observe(seconds)
+
+    def observe_batch(self, size: int):
+        """Records the number of bookings of a request."""
+        self._batch_size.observe(size)
+
+    def observe_rejected(self, status_code: int):
+        """Records a request shed with the status code."""
+        self._rejected.labels(str(status_code)).inc()
+
+    def export(self) -> bytes:
+        """Exports the metrics in the Prometheus text format."""
+        return generate_latest(self.registry)
+
+
+class TelemetryMiddleware:  # pylint: disable=too-few-public-methods
+    """Records the start and concurrency of the HTTP requests.
+
+    It is a plain ASGI middleware, so streamed requests and responses are passed
+    through as they are, keeping the backpressure of the server.
+    """
+
+    def __init__(self, app: ASGIApp, telemetry: ScoringTelemetry):
+        """Initializes the middleware.
+
+        Args:
+            app (ASGIApp): The wrapped app.
+            telemetry (ScoringTelemetry): Where the requests in flight are counted.
+        """
+        self._app = app
+        self._telemetry = telemetry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+        scope.setdefault("state", {})["started"] = time.perf_counter()
+        with self._telemetry.in_flight.track_inprogress():
+            await self._app(scope, receive, send)
@@ -0,0 +1,193 @@
+"""Vectorized validation of column-oriented scoring requests."""
+from datetime import date
+from typing import Any, Dict, Iterable, List, Tuple, Type
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+MAX_ERRORS = 100
+"""Maximum number of errors reported for a request."""
+
+
+class ColumnarValidationError(ValueError):
+    """The request does not match the schema."""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        """Initializes the error.
+
+        Args:
+            errors (List[Dict[str, Any]]): The errors, in the format of FastAPI
+                validation errors.
+        """
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _error(loc: List[Any], msg: str, type_: str) -> Dict[str, Any]:
+    """Creates an error in the format of FastAPI validation errors."""
+    return {"loc": ["body", *loc], "msg": msg, "type": type_}
+
+
+def _numeric(series: pd.Series) -> pd.Series:
+    """Converts a column to numbers, with NaN where it is not possible."""
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype("int64")
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    return pd.to_numeric(series, errors="coerce")
+
+
+def _dates(series: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Converts a column to dates, from strings or date and datetime values.
+
+    Numbers and booleans are invalid, instead of being converted from epochs.
+
+    Returns:
+        Tuple[pd.Series, pd.Series]:
+            0. values (pd.Series): The datetime64 column.
+            1. invalid (pd.Series): Whether each value is invalid.
+
+    Example:
+        >>> values, invalid = _dates(pd.Series(["2016-07-01", date(2016, 7, 2), 5]))
+        >>> values.dt.day.tolist(), invalid.tolist()
+        ([1.0, 2.0, nan], [False, False, True])
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series, series.isna()
+    strings = series.map(lambda value: isinstance(value, str)).astype(bool)
+    # `datetime` and `pd.Timestamp` are `date` too
+    dates = series.map(lambda value: isinstance(value, date)).astype(bool)
+    values = pd.to_datetime(series.where(dates), errors="coerce").where(
+        ~strings,
+        pd.to_datetime(series.where(strings), format="%Y-%m-%d", errors="coerce"),
+    )
+    return values, values.isna()
+
+
+def _convert(
+    series: pd.Series, type_: Any, categories: Iterable[str]
+) -> Tuple[pd.Series, pd.Series, str, str]:
+    """Converts a column to its field type.
+
+    Args:
+        series (pd.Series): The column values.
+        type_ (Any): The field type.
+        categories (Iterable[str]): The allowed values, if any, of a `str` field.
+
+    Returns:
+        Tuple[pd.Series, pd.Series, str, str]:
+            0. values (pd.Series): The converted column.
+            1. invalid (pd.Series): Whether each value is invalid.
+            2. msg (str): The error message of invalid values.
+            3. type (str): The error type of invalid values.
+    """
+    if type_ is str:
+        if categories:
+            allowed = list(categories)
+            return (
+                series,
+                ~series.isin(allowed),
+                f"unexpected value; permitted: {', '.join(map(repr, allowed))}",
+                "type_error.enum",
+            )
+        return series.astype(str), series.isna(), "str type expected", "type_error.str"
+    if type_ is date:
+        return (*_dates(series), "invalid date format", "value_error.date")
+    values = _numeric(series)
+    if type_ is int:
+        invalid = values.isna() | (values != np.floor(values))
+        if not invalid.any():
+            values = values.astype("int64")
+        return values, invalid, "value is not a valid integer", "type_error.integer"
+    return values, values.isna(), "value is not a valid float", "type_error.float"
+
+
+def validate_columns(
+    body: Any,
+    model: Type[BaseModel],
+    categories: Dict[str, Iterable[str]],
+    max_errors: int = MAX_ERRORS,
+) -> pd.DataFrame:
+    """Validates column-oriented records against a pydantic model.
+
+    Each field is checked at once for the whole column, instead of creating a
+    model per record.
+
+    Args:
+        body (Any): The request body, a mapping of the field names to their
+            values for every record.
+        model (Type[BaseModel]): The model of a record.
+        categories (Dict[str, Iterable[str]]): The allowed values of `str`
+            fields.
+        max_errors (int): Maximum number of errors reported. Defaults to
+            `MAX_ERRORS`.
+
+    Returns:
+        pd.DataFrame: The records, with the fields in the model order.
+
+    Raises:
+        ColumnarValidationError: If the body does not match the model.
+
+    Example:
+        >>> from pydantic import BaseModel
+        >>> class Row(BaseModel):
+        ...     hotel: str
+        ...     adults: int
+        >>> validate_columns({"hotel": ["City"], "adults": [2]}, Row, {})
+          hotel  adults
+        0  City       2
+        >>> try:
+        ...     validate_columns({"hotel": ["City"], "adults": ["x"]}, Row, {})
+        ... except ColumnarValidationError as exc:
+        ...     exc.errors[0]["loc"], exc.errors[0]["msg"]
+        (['body', 'adults', 0], 'value is not a valid integer')
+    """
+    if not isinstance(body, dict) or not all(
+        isinstance(values, list) for values in body.values()
+    ):
+        raise ColumnarValidationError(
+            [_error([], "value is not a valid dict of lists", "type_error.dict")]
+        )
+    fields = model.__fields__
+    missing = [
+        name for name, field in fields.items() if field.required and name not in body
+    ]
+    if missing:
+        raise ColumnarValidationError(
+            [
+                _error([name], "field required", "value_error.missing")
+                for name in missing
+            ]
+        )
+    lengths = {len(body[name]) for name in fields if name in body}
+    if len(lengths) > 1:
+        raise ColumnarValidationError(
+            [_error([], "columns must have the same length", "value_error.length")]
+        )
+    columns: Dict[str, pd.Series] = {}
+    errors: List[Dict[str, Any]] = []
+    for name, field in fields.items():
+        if name not in body:
+            continue
+        series = pd.Series(body[name])
+        values, invalid, msg, type_ = _convert(
+            series, field.type_, categories.get(name, [])
+        )
+        nulls = series.isna().to_numpy()
+        remaining = max_errors - len(errors)
+        for row in np.flatnonzero(invalid.to_numpy())[:remaining]:
+            if nulls[row]:
+                errors.append(
+                    _error(
+                        [name, int(row)],
+                        "none is not an allowed value",
+                        "type_error.none.not_allowed",
+                    )
+                )
+            else:
+                errors.append(_error([name, int(row)], msg, type_))
+        columns[name] = values
+    if errors:
+        raise ColumnarValidationError(errors)
+    return pd.DataFrame(columns)
@@ -0,0 +1,104 @@
+"""Model warm-up and readiness of the scoring server."""
+import logging
+import threading
+import time
+from typing import Any, Callable, List, Optional, TypedDict
+
+logger = logging.getLogger(__name__)
+
+
+class _WarmUpParams(TypedDict, total=False):
+    batch_sizes: List[int]
+    """Sizes of the warm-up prediction batches."""
+    unready_on_reload: bool
+    """Whether the server is not ready while the model is being reloaded."""
+    max_attempts: int
+    """Number of warm-up attempts before the server reports it is not alive."""
+    retry_interval: float
+    """Seconds before the first retry, doubled after each failed attempt."""
+
+
+class WarmUp:
+    """Loads the model and runs warm-up predictions in the background.
+
+    The server is ready once every warm-up batch was predicted, so the first
+    requests do not pay for the model download and the first predictions. A
+    failed warm-up is retried with exponential backoff, and the server is no
+    longer alive once every attempt failed, so the orchestrator restarts it.
+    """
+
+    def __init__(
+        self,
+        dataset: Any,
+        predict: Callable[[int], Any],
+        params: Optional[_WarmUpParams] = None,
+    ):
+        """Initializes the warm-up.
+
+        Args:
+            dataset (Any): The model loader. Its `reloading` flag is checked when
+                `unready_on_reload` is set.
+            predict (Callable[[int], Any]): Predicts a batch of the given size,
+                loading the model if needed.
+            params (Optional[_WarmUpParams]): The warm-up params.
+        """
+        params = params or {}
+        self._dataset = dataset
+        self._predict = predict
+        self._batch_sizes = params.get("batch_sizes", [1])
+        self._unready_on_reload = params.get("unready_on_reload", False)
+        self._max_attempts = params.get("max_attempts", 5)
+        self._retry_interval = params.get("retry_interval", 1.0)
+        self._warmed = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.failed = False
+
+    def start(self) -> threading.Thread:
+        """Starts warming up in a daemon thread.
+
+        Returns:
+            threading.Thread: The warm-up thread.
+        """
+        thread = threading.Thread(target=self.run, name="warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def run(self):
+        """Predicts each warm-up batch and marks the server as ready."""
+        interval = self._retry_interval
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                for size in self._batch_sizes:
+                    self._predict(size)
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.exception(
+                    "Model warm-up failed, attempt %d of %d",
+                    attempt,
+                    self._max_attempts,
+                )
+                self.error = exc
+                if attempt < self._max_attempts:
+                    time.sleep(interval)
+                    interval *= 2
+                continue
+            self.error = None
+            logger.info(
+                "Model warmed up with batches of %s bookings", self._batch_sizes
+            )
+            self._warmed.set()
+            return
+        self.failed = True
+
+    @property
+    def alive(self) -> bool:
+        """Whether the warm-up has not failed for good."""
+        return not self.failed
+
+    @property
+    def ready(self) -> bool:
+        """Whether the model is warmed up and not being reloaded."""
+        if not self._warmed.is_set():
+            return False
+        return not (
+            self._unready_on_reload and getattr(self._dataset, "reloading", False)
+        )
@@ -0,0 +1,45 @@
+"""Runner skipping the memoized nodes.
+
+Run the pipelines with it through
+`kedro run --runner hotelbookingcancellation.runner.MemoizedRunner`.
+"""
+from typing import Any, Dict
+
+from kedro.io import DataCatalog
+from kedro.pipeline import Pipeline
+from kedro.runner import SequentialRunner
+from pluggy import PluginManager
+
+from .hooks import MemoizationHooks
+
+
+class MemoizedRunner(SequentialRunner):
+    """Sequential runner of the nodes whose inputs, parameters or code changed.
+
+    The nodes are filtered by the `MemoizationHooks` registered in the hook
+    manager of the run. Every node runs if none are registered.
+    """
+
+    def run(
+        self,
+        pipeline: Pipeline,
+        catalog: DataCatalog,
+        hook_manager: PluginManager = None,
+        session_id: str = None,
+    ) -> Dict[str, Any]:
+        """Runs the nodes that are not up to date.
+
+        Args:
+            pipeline (Pipeline): The pipeline to run.
+            catalog (DataCatalog): The catalog of the run.
+            hook_manager (PluginManager): The hook manager of the run.
+            session_id (str): The id of the session.
+
+        Returns:
+            Dict[str, Any]: The outputs that are not saved in the catalog.
+        """
+        if hook_manager is not None:
+            for plugin in hook_manager.get_plugins():
+                if isinstance(plugin, MemoizationHooks):
+                    pipeline = plugin.filter(pipeline)
+        return super().run(pipeline, catalog, hook_manager, session_id)
@@ -0,0 +1,101 @@
+"""Standalone entry point of the scoring server.
+
+Builds the scoring app straight from `params:preprocessing`, `params:scoring`
+and the `api_model` catalog entry, without creating a Kedro session, so the
+server is ready as soon as the model is loaded. Run it with
+`hotelbookingcancellation-serve`.
+"""
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import click
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+
+def load_config(
+    conf_source: str = "conf", env: Optional[str] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Loads the configuration of the scoring server.
+
+    Args:
+        conf_source (str): The configuration directory.
+        env (Optional[str]): The configuration environment. Defaults to `local`.
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+            0. preprocessing (Dict[str, Any]): The preprocessing parameters.
+            1. scoring (Dict[str, Any]): The scoring parameters.
+            2. api_model (Dict[str, Any]): The model catalog entry.
+    """
+    # pylint: disable=import-outside-toplevel
+    from kedro.config import TemplatedConfigLoader
+
+    from .settings import CONFIG_LOADER_ARGS
+
+    loader = TemplatedConfigLoader(conf_source, env=env, **CONFIG_LOADER_ARGS)
+    parameters = loader.get("parameters*", "parameters*/**")
+    catalog = loader.get("catalog*", "catalog*/**")
+    return parameters["preprocessing"], parameters["scoring"], catalog["api_model"]
+
+
+def build_app(
+    conf_source: str = "conf", env: Optional[str] = None
+) -> Tuple["FastAPI", Dict[str, Any]]:
+    """Builds the scoring app with the model already loaded.
+
+    Args:
+        conf_source (str): The configuration directory.
+        env (Optional[str]): The configuration environment. Defaults to `local`.
+
+    Returns:
+        Tuple[FastAPI, Dict[str, Any]]:
+            0. app (FastAPI): The scoring app.
+            1. scoring (Dict[str, Any]): The scoring parameters.
+    """
+    # pylint: disable=import-outside-toplevel
+    from kedro.io import AbstractDataSet
+
+    from .pipelines.scoring.nodes import create_app
+
+    preprocessing, scoring, api_model = load_config(conf_source, env)
+    api_model = {key: value for key, value in api_model.items() if key != "layer"}
+    dataset = AbstractDataSet.from_config("api_model", api_model)
+    return create_app(dataset.load(), preprocessing, scoring), scoring
+
+
+@click.command()
+@click.option("--conf-source", default="conf", show_default=True)
+@click.option("--env", default=None, help="Configuration environment.")
+def main(conf_source: str, env: Optional[str]):
+    """Starts the scoring server."""
+    started = time.perf_counter()
+    import uvicorn  # pylint: disable=import-outside-toplevel
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    app, scoring = build_app(conf_source, env)
+
+    @app.on_event("startup")
+    def ready():
+        elapsed = time.perf_counter() - started
+        target = scoring.get("startup_target")
+        logger.info("Scoring server ready in %.2fs", elapsed)
+        if target is not None and elapsed > target:
+            logger.warning(
+                "Scoring server startup took %.2fs, above the %.2fs target",
+                elapsed,
+                target,
+            )
+
+    uvicorn.Server(uvicorn.Config(app, **scoring.get("uvicorn", {}))).run()
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
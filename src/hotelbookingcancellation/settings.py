@@ -10,9 +10,16 @@ import os
 # Class that manages how configuration is loaded.
 from kedro.config import TemplatedConfigLoader
 
+from .hooks import MemoizationHooks, ProfilingHooks
+
 # Instantiated project hooks.
-# from hotelbookingcancellation.hooks import ProjectHooks
-# HOOKS = (ProjectHooks(),)
+HOOKS = (
+    MemoizationHooks(),
+    ProfilingHooks(
+        trace_allocations=os.environ.get("KEDRO_TRACEMALLOC", "").lower() == "true",
+        cprofile_dir=os.environ.get("KEDRO_CPROFILE_DIR"),
+    ),
+)
 
 # Installed plugins for which to disable hook auto-registration.
 # DISABLE_HOOKS_FOR_PLUGINS = ("kedro-viz",)
@@ -3,6 +3,12 @@
 from setuptools import find_packages, setup
 
 entry_point = "hotelbookingcancellation = hotelbookingcancellation" ".__main__:main"
+loadtest_entry_point = (
+    "hotelbookingcancellation-loadtest = hotelbookingcancellation.loadtest:main"
+)
+serve_entry_point = (
+    "hotelbookingcancellation-serve = hotelbookingcancellation.serve:main"
+)
 
 
 def _get_dependencies(file: str) -> list:
@@ -22,7 +28,9 @@ setup(
     name="hotelbookingcancellation",
     version="0.1",
     packages=find_packages(exclude=["tests"]),
-    entry_points={"console_scripts": [entry_point]},
+    entry_points={
+        "console_scripts": [entry_point, loadtest_entry_point, serve_entry_point]
+    },
     install_requires=_get_dependencies("requirements.txt"),
     extras_require={
         "docs": [
@@ -0,0 +1,66 @@
+"""Memory, speed and accuracy of the compact feature dtypes."""
+import logging
+import time
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+import pytest
+from catboost import CatBoostClassifier
+from kedro.config import TemplatedConfigLoader
+
+from src.hotelbookingcancellation.loadtest import synthetic_bookings
+from src.hotelbookingcancellation.pipelines.data_engineering.nodes import (
+    preprocess_bookings,
+)
+from src.hotelbookingcancellation.pipelines.data_science.nodes import split_train_test
+
+ROWS = 50_000
+
+logger = logging.getLogger(__name__)
+
+
+def _features(compact: bool) -> Tuple[pd.DataFrame, ...]:
+    """Preprocesses the same synthetic bookings, with or without compact dtypes."""
+    parameters = TemplatedConfigLoader("./conf").get("parameters/*")
+    preprocessing = {**parameters["preprocessing"], "compact_dtypes": compact}
+    df = pd.DataFrame(synthetic_bookings(ROWS, preprocessing["columns_to_map"], seed=0))
+    rng = np.random.default_rng(0)
+    noise = rng.normal(0, 50, ROWS)
+    df[preprocessing["target"]] = (df["lead_time"] * 20 + df["adr"] + noise) > 250
+    df = preprocess_bookings(df, preprocessing)
+    return split_train_test(df, parameters["split_train_test"])
+
+
+def _fit(compact: bool) -> dict:
+    """Trains and scores a model on the features."""
+    x_train, x_test, y_train, y_test = _features(compact)
+    model = CatBoostClassifier(iterations=50, allow_writing_files=False, verbose=0)
+    started = time.perf_counter()
+    model.fit(x_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    predictions = model.predict(x_test)
+    return {
+        "bytes": int(x_train.memory_usage(deep=True).sum()),
+        "fit_seconds": fit_seconds,
+        "predict_seconds": time.perf_counter() - started,
+        "accuracy": float(np.mean(predictions == y_test.to_numpy().ravel())),
+    }
+
+
+@pytest.mark.benchmark
+def test_compact_dtypes_benchmark():
+    """Tests if compact features use less memory with the same accuracy."""
+    wide, compact = _fit(False), _fit(True)
+    for name, result in [("64 bits", wide), ("compact", compact)]:
+        logger.info(
+            "%s: %.1f MiB, fit %.2fs, predict %.1fms, accuracy %.4f",
+            name,
+            result["bytes"] / 2**20,
+            result["fit_seconds"],
+            result["predict_seconds"] * 1000,
+            result["accuracy"],
+        )
+    assert compact["bytes"] < 0.6 * wide["bytes"]
+    assert abs(compact["accuracy"] - wide["accuracy"]) <= 0.005
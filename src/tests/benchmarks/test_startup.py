@@ -0,0 +1,57 @@
+"""Startup benchmarks of the project CLI."""
+import json
+import logging
+import subprocess
+import sys
+
+# Mirrors `hotelbookingcancellation --pipeline de` up to running the nodes:
+# the project settings, hooks, catalog and the `de` pipeline are loaded.
+_STARTUP = """
+import json
+import sys
+import time
+from pathlib import Path
+
+started = time.perf_counter()
+from kedro.framework.project import pipelines
+from kedro.framework.session import KedroSession
+from kedro.framework.startup import bootstrap_project
+
+bootstrap_project(Path.cwd())
+with KedroSession.create() as session:
+    session.load_context().catalog
+    pipelines[sys.argv[1]]
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "modules": sorted(name.split(".")[0] for name in sys.modules),
+}))
+"""
+
+# `mlflow` and `pydantic` are still imported by the `kedro-mlflow` plugin hooks
+SERVING_AND_TRAINING = ["catboost", "fastapi", "uvicorn", "prometheus_client"]
+
+logger = logging.getLogger(__name__)
+
+
+def _startup(pipeline: str) -> dict:
+    """Loads the project in a fresh interpreter and reports the imports."""
+    output = subprocess.run(
+        [sys.executable, "-c", _STARTUP, pipeline],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_de_startup_imports():
+    """Tests if loading the `de` pipeline skips the serving and training stacks."""
+    startup = _startup("de")
+    logger.info("de startup: %.2fs", startup["seconds"])
+    imported = set(startup["modules"]) & set(SERVING_AND_TRAINING)
+    assert not imported
+
+
+def test_scoring_startup_imports():
+    """Tests if the serving stack is imported by the pipeline that needs it."""
+    assert "fastapi" in _startup("scoring")["modules"]
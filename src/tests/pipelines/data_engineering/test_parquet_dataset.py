@@ -0,0 +1,144 @@
+"""Tests for the `LayoutParquetDataSet` class."""
+# pylint: disable=redefined-outer-name
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from kedro.io import DataSetError
+
+from src.hotelbookingcancellation.pipelines.data_engineering import (
+    LayoutParquetDataSet,
+    Partitions,
+)
+
+
+@pytest.fixture()
+def bookings() -> pd.DataFrame:
+    """Dummy preprocessed bookings."""
+    return pd.DataFrame(
+        {
+            "hotel": [0, 1, 1, 0, 1],
+            "year": [2016, 2016, 2017, 2017, 2017],
+            "lead_time": [30, 10, 20, 5, 0],
+            "meal": [0, 1, 0, 2, 1],
+            "is_canceled": [0, 1, 0, 1, 1],
+        }
+    )
+
+
+@pytest.fixture()
+def save_args() -> dict:
+    """Partitioned layout."""
+    return {
+        "partition_cols": ["hotel", "year"],
+        "sort_by": ["lead_time"],
+        "row_group_size": 2,
+        "use_dictionary": ["meal"],
+    }
+
+
+def _sorted(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values("lead_time").reset_index(drop=True)
+
+
+def test_save_partitions(tmp_path: Path, bookings: pd.DataFrame, save_args: dict):
+    path = tmp_path / "bookings"
+    dataset = LayoutParquetDataSet(str(path), save_args=save_args)
+    dataset.save({"2016-01-01": bookings[:2], "2017-01-01": bookings[2:]})
+    assert sorted(p.name for p in (path / "hotel=1").iterdir()) == [
+        "year=2016",
+        "year=2017",
+    ]
+    files = list(path.glob("**/*.parquet"))
+    assert {file.name.rsplit("-", 1)[0] for file in files} == {
+        "2016-01-01",
+        "2017-01-01",
+    }
+    assert pq.ParquetFile(files[0]).metadata.row_group(0).column(0).compression == (
+        "ZSTD"
+    )
+    loaded = dataset.load()
+    assert list(loaded.columns) == list(bookings.columns)
+    assert loaded["hotel"].dtype.kind == "i"
+    pd.testing.assert_frame_equal(
+        _sorted(loaded[bookings.columns]), _sorted(bookings), check_dtype=False
+    )
+
+
+def test_load_partition_dtypes(tmp_path: Path, bookings: pd.DataFrame, save_args: dict):
+    bookings = bookings.astype({"hotel": "int32", "year": "int32"})
+    dataset = LayoutParquetDataSet(str(tmp_path / "bookings"), save_args=save_args)
+    dataset.save({"2016-01-01": bookings[:2], "2017-01-01": bookings[2:]})
+    pd.testing.assert_frame_equal(_sorted(dataset.load()), _sorted(bookings))
+
+
+def test_save_partitions_unsafe_key(
+    tmp_path: Path, bookings: pd.DataFrame, save_args: dict
+):
+    path = tmp_path / "bookings"
+    dataset = LayoutParquetDataSet(str(path), save_args=save_args)
+    dataset.save({"2016-12-26/2017-01-01": bookings})
+    dataset.save({"2016-12-26/2017-01-01": bookings[:2]})
+    assert {file.name.rsplit("-", 1)[0] for file in path.glob("**/*.parquet")} == {
+        "2016-12-26_2017-01-01"
+    }
+    pd.testing.assert_frame_equal(
+        _sorted(dataset.load()), _sorted(bookings[:2]), check_dtype=False
+    )
+
+
+def test_save_partitions_replaces_key(
+    tmp_path: Path, bookings: pd.DataFrame, save_args: dict
+):
+    dataset = LayoutParquetDataSet(str(tmp_path / "bookings"), save_args=save_args)
+    dataset.save({"2016-01-01": bookings[:2], "2017-01-01": bookings[2:]})
+    dataset.save({"2017-01-01": bookings[4:], "2018-01-01": bookings[:0]})
+    loaded = dataset.load()
+    pd.testing.assert_frame_equal(
+        _sorted(loaded[bookings.columns]),
+        _sorted(pd.concat([bookings[:2], bookings[4:]])),
+        check_dtype=False,
+    )
+
+
+def test_save_complete_partitions(
+    tmp_path: Path, bookings: pd.DataFrame, save_args: dict
+):
+    dataset = LayoutParquetDataSet(str(tmp_path / "bookings"), save_args=save_args)
+    dataset.save({"2016-01-01": bookings[:2], "2017-01-01": bookings[2:]})
+    dataset.save(Partitions({"2017-01": bookings[4:]}, complete=True))
+    loaded = dataset.load()
+    pd.testing.assert_frame_equal(
+        loaded[bookings.columns], bookings[4:].reset_index(drop=True), check_dtype=False
+    )
+
+
+def test_load_pushdown(tmp_path: Path, bookings: pd.DataFrame, save_args: dict):
+    path = str(tmp_path / "bookings")
+    LayoutParquetDataSet(path, save_args=save_args).save(bookings)
+    dataset = LayoutParquetDataSet(
+        path,
+        load_args={
+            "columns": ["hotel", "lead_time"],
+            "filters": [("hotel", "=", 1), ("year", "=", 2017)],
+        },
+        save_args=save_args,
+    )
+    loaded = dataset.load()
+    assert list(loaded.columns) == ["hotel", "lead_time"]
+    assert loaded["lead_time"].tolist() == [0, 20]
+
+
+def test_save_single_file(tmp_path: Path, bookings: pd.DataFrame):
+    path = tmp_path / "x_train.parquet"
+    dataset = LayoutParquetDataSet(str(path), save_args={"row_group_size": 2})
+    dataset.save(bookings)
+    assert pq.ParquetFile(path).metadata.num_row_groups == 3
+    pd.testing.assert_frame_equal(dataset.load(), bookings)
+
+
+def test_save_dict_without_partitions(tmp_path: Path, bookings: pd.DataFrame):
+    dataset = LayoutParquetDataSet(str(tmp_path / "bookings.parquet"))
+    with pytest.raises(DataSetError):
+        dataset.save({"2016-01-01": bookings})
@@ -6,7 +6,10 @@ import pytest
 
 from src.hotelbookingcancellation.pipelines.data_engineering.nodes import (
     _PreprocessBookingsParams,
+    deduplicate_bookings,
+    partition_bookings,
     preprocess_bookings,
+    select_new_bookings,
 )
 from src.hotelbookingcancellation.pipelines.data_engineering.pipeline import (
     create_pipeline,
@@ -84,6 +87,142 @@ def test_preprocess_bookings_select_optimize(
     assert df["cat0"].dtype == "object"
 
 
+def test_preprocess_bookings_compact_dtypes(
+    raw_df: pd.DataFrame, min_params: _PreprocessBookingsParams
+):
+    """Test preprocessing into compact dtypes."""
+    params = {**min_params, "compact_dtypes": True}
+    df = preprocess_bookings(raw_df, params)
+    expected = preprocess_bookings(raw_df, min_params)
+    assert df["num0"].dtype == np.float32
+    assert df["year"].dtype == np.int32
+    assert df["t"].dtype == np.int8
+    assert df.memory_usage().sum() < expected.memory_usage().sum()
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False, rtol=1e-6)
+
+
+def test_preprocess_bookings_weight(
+    raw_df: pd.DataFrame, min_params: _PreprocessBookingsParams
+):
+    """Test if the sample weights are kept as is."""
+    params = {**min_params, "weight": "w"}
+    df = preprocess_bookings(raw_df.assign(w=[1, 2, 3, 4]), params)
+    assert df["w"].tolist() == [2, 4]
+
+
+def test_deduplicate_bookings(raw_df: pd.DataFrame):
+    """Test if duplicates are collapsed into weights, in memory or spilled."""
+    df = pd.concat([raw_df, raw_df.iloc[[1, 1, 3]]], ignore_index=True)
+    unique, stats = deduplicate_bookings(df, {"weight": "w"})
+    pd.testing.assert_frame_equal(unique.drop(columns="w"), raw_df)
+    assert unique["w"].tolist() == [1, 3, 1, 2]
+    assert stats["duplicates"] == 3
+    assert stats["max_copies"] == 3
+    assert not stats["spilled"]
+    chunks = [df.iloc[:3], df.iloc[3:5], df.iloc[5:]]
+    spilled, stats = deduplicate_bookings(
+        iter(chunks), {"weight": "w", "max_memory_rows": 2, "partitions": 2}
+    )
+    pd.testing.assert_frame_equal(spilled, unique)
+    assert stats["spilled"]
+    dropped, _ = deduplicate_bookings(df, {"weight": None})
+    pd.testing.assert_frame_equal(dropped, raw_df)
+
+
+def test_deduplicate_bookings_chunk_dtypes():
+    """Test if copies match across chunks whose dtypes were inferred apart."""
+    chunks = [
+        pd.DataFrame({"agent": [9, 7], "country": ["PRT", "GBR"]}),
+        pd.DataFrame({"agent": [9.0, None], "country": [None, None]}),
+        pd.DataFrame({"agent": [None], "country": [None]}, dtype="float64"),
+    ]
+    unique, stats = deduplicate_bookings(
+        iter(chunks), {"weight": "w", "dtypes": {"country": "object"}}
+    )
+    assert unique["w"].tolist() == [1, 1, 1, 2]
+    assert stats["duplicates"] == 1
+
+
+def test_select_new_bookings_without_watermark(
+    raw_df: pd.DataFrame, min_params: _PreprocessBookingsParams
+):
+    """Test if every booking is selected when there is no watermark."""
+    df, watermark = select_new_bookings(raw_df, {}, min_params, {"freq": "D"})
+    assert len(df) == len(raw_df)
+    assert "period" not in watermark
+    assert watermark["full"]
+
+
+def test_select_new_bookings_since_watermark(
+    raw_df: pd.DataFrame, min_params: _PreprocessBookingsParams
+):
+    """Test if only bookings from the watermark period onwards are selected."""
+    _, watermark = select_new_bookings(raw_df, {}, min_params, {"freq": "D"})
+    watermark["period"] = "2020-01-03"
+    df, updated = select_new_bookings(raw_df, watermark, min_params, {"freq": "D"})
+    assert df["date"].tolist() == ["2020-01-03", "2020-01-04"]
+    assert updated["period"] == "2020-01-03"
+    assert "full" not in updated
+    chunks, _ = select_new_bookings(
+        iter([raw_df[:3], raw_df[3:]]), watermark, min_params, {"freq": "D"}
+    )
+    assert pd.concat(chunks)["date"].tolist() == ["2020-01-03", "2020-01-04"]
+
+
+def test_select_new_bookings_params_changed(
+    raw_df: pd.DataFrame, min_params: _PreprocessBookingsParams
+):
+    """Test if every booking is selected again when the params change."""
+    _, watermark = select_new_bookings(raw_df, {}, min_params, {"freq": "D"})
+    params = min_params.copy()
+    params["fillna"] = 1
+    df, _ = select_new_bookings(raw_df, watermark, params, {"freq": "D"})
+    assert len(df) == len(raw_df)
+    dedup = {"weight": None}
+    df, updated = select_new_bookings(
+        raw_df, watermark, min_params, {"freq": "D"}, dedup
+    )
+    assert len(df) == len(raw_df)
+    assert updated["full"]
+    dedup["max_memory_rows"] = 10
+    _, same = select_new_bookings(raw_df, watermark, min_params, {"freq": "D"}, dedup)
+    assert same["fingerprint"] == updated["fingerprint"]
+
+
+def test_partition_bookings(
+    raw_df: pd.DataFrame, min_params: _PreprocessBookingsParams
+):
+    """Test if the preprocessed bookings are split by period."""
+    partitions, watermark = partition_bookings(
+        raw_df, {"period": "2020-01-01"}, min_params, {"freq": "D"}
+    )
+    assert watermark == {"period": "2020-01-04"}
+    assert not partitions.complete
+    assert sorted(partitions) == [
+        "2020-01-01",
+        "2020-01-02",
+        "2020-01-03",
+        "2020-01-04",
+    ]
+    assert partitions["2020-01-01"].empty
+    assert len(partitions["2020-01-02"]) == 1
+    assert partitions["2020-01-02"]["day"].tolist() == [2]
+    partitions, watermark = partition_bookings(raw_df, {"full": True}, min_params, {})
+    assert partitions.complete
+    assert watermark == {"period": "2020-01-04"}
+
+
+def test_partition_bookings_empty(
+    raw_df: pd.DataFrame, min_params: _PreprocessBookingsParams
+):
+    """Test if the watermark period is kept when there are no bookings."""
+    partitions, watermark = partition_bookings(
+        raw_df[:0], {"period": "2020-01-04"}, min_params, {}
+    )
+    assert not partitions
+    assert watermark == {"period": "2020-01-04"}
+
+
 def test_validate_pipeline_create():
     """Tests if a pipeline can be instantiated."""
     pipeline = create_pipeline()
@@ -0,0 +1,26 @@
+"""Tests for the `MlflowBatchMetricsDataSet` class."""
+# pylint: disable=unused-argument
+import mlflow
+from mlflow.tracking import MlflowClient
+from pytest_mock import MockFixture
+
+from src.hotelbookingcancellation.pipelines.data_science import (
+    MlflowBatchMetricsDataSet,
+)
+
+
+def test_mlflow_batch_metrics_dataset(setup_mlflow, mocker: MockFixture):
+    """Tests if the metrics history is logged in batches."""
+    spy = mocker.spy(MlflowClient, "log_batch")
+    dataset = MlflowBatchMetricsDataSet(prefix="test", batch_size=2)
+    dataset.save(
+        {
+            "a": [{"step": i, "value": float(i)} for i in range(3)],
+            "b": {"step": 0, "value": 1.0},
+        }
+    )
+    assert spy.call_count == 2
+    history = MlflowClient().get_metric_history(
+        mlflow.active_run().info.run_id, "test.a"
+    )
+    assert [metric.value for metric in history] == [0.0, 1.0, 2.0]
@@ -0,0 +1,20 @@
+"""Tests for the `OptionalDataSet` class."""
+from pathlib import Path
+
+import pandas as pd
+
+from src.hotelbookingcancellation.pipelines.data_science import OptionalDataSet
+
+
+def test_optional_dataset(tmp_path: Path):
+    """Tests if only the data that is not None is saved."""
+    path = tmp_path / "model.csv"
+    dataset = OptionalDataSet({"type": "pandas.CSVDataSet", "filepath": str(path)})
+    dataset.save(None)
+    assert not path.exists()
+    assert dataset.load() is None
+    assert not dataset.exists()
+    df = pd.DataFrame({"a": [1, 2]})
+    dataset.save(df)
+    pd.testing.assert_frame_equal(dataset.load(), df)
+    assert dataset.exists()
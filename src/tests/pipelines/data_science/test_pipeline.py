@@ -4,14 +4,23 @@ from typing import Tuple
 
 import pandas as pd
 import pytest
-from catboost import CatBoostClassifier
+from catboost import CatBoostClassifier, Pool
 
 from src.hotelbookingcancellation.pipelines.data_science.nodes import (
+    calibrate_cascade,
     evaluate,
     optimize,
+    retrain,
+    select_features,
+    select_model_features,
     split_train_test,
+    split_validation,
+    summarize_features,
+)
+from src.hotelbookingcancellation.pipelines.data_science.pipeline import (
+    create_pipeline,
+    create_retrain_pipeline,
 )
-from src.hotelbookingcancellation.pipelines.data_science.pipeline import create_pipeline
 
 
 @pytest.fixture()
@@ -63,6 +72,14 @@ def model(train_test: Tuple[pd.DataFrame, ...]) -> CatBoostClassifier:
     )
 
 
+class FakeModelLoaderDataSet:  # pylint: disable=too-few-public-methods
+    """Fake dataset for the registry model loader."""
+
+    def __init__(self, model: CatBoostClassifier):
+        """Init."""
+        self.model = model
+
+
 def test_split_train_test(df: pd.DataFrame):
     """Test splitting the data into train and test."""
     x_train, x_test, y_train, y_test = split_train_test(
@@ -80,6 +97,17 @@ def test_split_train_test(df: pd.DataFrame):
     assert df_orig.equals(df)
 
 
+def test_split_validation(df: pd.DataFrame):
+    """Test carving the validation data out of the training data."""
+    x, y = df[["a", "b"]], df[["t"]]
+    x_train, x_val, y_train, y_val = split_validation(x, y, {"validation_size": 0.4})
+    assert (len(x_train), len(x_val), len(y_train), len(y_val)) == (3, 2, 3, 2)
+    merged = pd.concat(
+        [pd.concat([x_train, x_val]), pd.concat([y_train, y_val])], axis=1
+    )
+    assert merged.sort_values("a").reset_index(drop=True).equals(df)
+
+
 def test_optimize(train_test: Tuple[pd.DataFrame, ...]):
     """Test optimizing the model."""
     x_train, x_test, y_train, y_test = train_test
@@ -88,6 +116,25 @@ def test_optimize(train_test: Tuple[pd.DataFrame, ...]):
     assert pytest.approx(model.predict(x_test), y_test)
 
 
+def test_optimize_weights(train_test: Tuple[pd.DataFrame, ...]):
+    """Test if the deduplication weights are given to the model."""
+    x_train, _, y_train, _ = train_test
+    params = {"iterations": 2, "allow_writing_files": False}
+    weighted = optimize(x_train, y_train.assign(w=[1, 5, 1]), params.copy())
+    model = optimize(x_train, y_train, params.copy())
+    assert weighted.get_params() == model.get_params()
+    assert (weighted.predict_proba(x_train) != model.predict_proba(x_train)).any()
+
+
+def test_split_train_test_weight(df: pd.DataFrame):
+    """Test if the weights are split with the target."""
+    x_train, _, y_train, _ = split_train_test(
+        df.assign(w=1), {"target": "t", "test_size": 0.4, "weight": "w"}
+    )
+    assert list(x_train) == ["a", "b"]
+    assert list(y_train) == ["t", "w"]
+
+
 def test_evaluate(train_test: Tuple[pd.DataFrame, ...], model: CatBoostClassifier):
     """Test the evaluation report of the model."""
     _, x_test, _, y_test = train_test
@@ -96,7 +143,148 @@ def test_evaluate(train_test: Tuple[pd.DataFrame, ...], model: CatBoostClassifie
     assert all("step" in el and "value" in el for el in report["Accuracy"])
 
 
+def test_retrain(train_test: Tuple[pd.DataFrame, ...], model: CatBoostClassifier):
+    """Test continuing the boosting of the current model on new data."""
+    x_train, _, y_train, _ = train_test
+    retrained = retrain(
+        FakeModelLoaderDataSet(model),
+        x_train,
+        y_train,
+        {"iterations": 2, "allow_writing_files": False},
+    )
+    assert retrained is not model
+    assert retrained.tree_count_ == model.tree_count_ + 2
+
+
+def test_retrain_not_drifted(
+    train_test: Tuple[pd.DataFrame, ...], model: CatBoostClassifier
+):
+    """Test if the current model is kept when it has not drifted."""
+    x_train, _, y_train, _ = train_test
+    retrained = retrain(
+        FakeModelLoaderDataSet(model),
+        x_train,
+        y_train,
+        {"iterations": 2, "drift": {"metric": "Accuracy", "min_score": 0.0}},
+    )
+    assert retrained is None
+    assert evaluate(retrained, x_train, y_train, {"metrics": ["Accuracy"]}) == {}
+
+
+def test_retrain_drift_full_model(
+    train_test: Tuple[pd.DataFrame, ...], model: CatBoostClassifier
+):
+    """Test if the drift is checked on the score of every tree."""
+    x_train, _, y_train, _ = train_test
+    score = model.eval_metrics(Pool(x_train, y_train), ["Logloss"])["Logloss"][-1]
+    params = {"iterations": 2, "allow_writing_files": False}
+    for min_score, drifted in [(score - 1e-6, False), (score + 1e-6, True)]:
+        params["drift"] = {"metric": "Logloss", "min_score": min_score}
+        retrained = retrain(FakeModelLoaderDataSet(model), x_train, y_train, params)
+        assert (retrained is not None) == drifted
+
+
+def test_evaluate_period(
+    train_test: Tuple[pd.DataFrame, ...], model: CatBoostClassifier
+):
+    """Test evaluating the model every `eval_period` trees."""
+    _, x_test, _, y_test = train_test
+    report = evaluate(
+        model, x_test, y_test, {"metrics": ["Accuracy", "Logloss"], "eval_period": 2}
+    )
+    assert [el["step"] for el in report["Accuracy"]] == [1, 2]
+    assert [el["step"] for el in report["Logloss"]] == [1, 2]
+
+
+def test_evaluate_final_only(
+    train_test: Tuple[pd.DataFrame, ...], model: CatBoostClassifier
+):
+    """Test evaluating only the final model."""
+    _, x_test, _, y_test = train_test
+    report = evaluate(
+        model, x_test, y_test, {"metrics": ["Accuracy", "F1"], "final_only": True}
+    )
+    expected = model.eval_metrics(Pool(x_test, y_test), ["Accuracy", "F1"])
+    for metric in ["Accuracy", "F1"]:
+        assert report[metric] == [{"step": 2, "value": expected[metric][-1]}]
+
+
+def test_evaluate_final_only_eval_metrics(
+    train_test: Tuple[pd.DataFrame, ...], model: CatBoostClassifier
+):
+    """Test if the other metrics of the final model use every tree."""
+    _, x_test, _, y_test = train_test
+    report = evaluate(
+        model, x_test, y_test, {"metrics": ["Logloss", "AUC"], "final_only": True}
+    )
+    expected = model.eval_metrics(Pool(x_test, y_test), ["Logloss", "AUC"])
+    for metric in ["Logloss", "AUC"]:
+        assert report[metric] == [
+            {"step": 2, "value": pytest.approx(expected[metric][-1])}
+        ]
+
+
+def test_select_features(train_test: Tuple[pd.DataFrame, ...]):
+    """Tests if features are removed within the accuracy tolerance."""
+    x_train, x_test, y_train, y_test = train_test
+    data = x_train, y_train, x_test, y_test
+    model_params = {"iterations": 2, "allow_writing_files": False}
+    for algorithm in ["importance", "recursive"]:
+        params = {"algorithm": algorithm, "max_accuracy_loss": 1.0}
+        selected = select_features(*data, model_params, params)
+        assert len(selected) == 1
+        assert set(selected) < {"a", "b"}
+    params = {"max_accuracy_loss": 1.0, "min_features": 2}
+    assert select_features(*data, model_params, params) == ["a", "b"]
+    assert select_features(*data, model_params, {"enabled": False}) == ["a", "b"]
+
+
+def test_select_model_features(
+    train_test: Tuple[pd.DataFrame, ...], model: CatBoostClassifier
+):
+    """Tests if the new data keeps the features of the registry model."""
+    x_train, x_test = train_test[0], train_test[1]
+    selected = select_model_features(
+        FakeModelLoaderDataSet(model), x_train.assign(c=0), x_test.assign(c=0)
+    )
+    assert [list(x.columns) for x in selected] == [["a", "b"], ["a", "b"]]
+
+
+def test_summarize_features(train_test: Tuple[pd.DataFrame, ...]):
+    """Tests summarizing the training features."""
+    summary = summarize_features(
+        train_test[0], {"columns_to_map": {"b": {}}}, {"bins": 2}
+    )
+    assert summary["columns"] == ["a", "b"]
+    assert summary["categorical"] == ["b"]
+    assert summary["edges"] == [[2.0], [0.5, 1.5, 2.5, 3.5]]
+    assert summary["counts"] == [[2, 1, 0, 0, 0, 0], [0, 1, 1, 1, 0, 0]]
+
+
+def test_calibrate_cascade(
+    train_test: Tuple[pd.DataFrame, ...], model: CatBoostClassifier
+):
+    """Tests if the cascade is as accurate as the full model on the validation data."""
+    small = CatBoostClassifier(iterations=1, allow_writing_files=False).fit(
+        train_test[0], train_test[2]
+    )
+    cascade = calibrate_cascade(
+        small, model, train_test[1], train_test[3], {"max_accuracy_loss": 0.0}
+    ).cascade
+    actual = train_test[3]["t"].to_numpy()
+    assert (cascade.predict(train_test[1]) == actual).mean() >= (
+        model.predict(train_test[1]).ravel() == actual
+    ).mean()
+    assert cascade.cascade_stats.rows == 2
+
+
 def test_validate_pipeline_create():
     """Tests if a pipeline can be instantiated."""
     pipeline = create_pipeline()
     assert pipeline
+
+
+def test_validate_retrain_pipeline_create():
+    """Tests if the retrain pipeline can be instantiated."""
+    pipeline = create_retrain_pipeline()
+    assert pipeline
@@ -1,5 +1,7 @@
 """Tests for the `MlflowModelLoaderDataSet` class."""
 # pylint: disable=redefined-outer-name,unused-argument,pointless-statement
+import json
+import threading
 import time
 
 import mlflow
@@ -179,3 +181,115 @@ def test_mlflow_model_loader_checks_update_of_no_model(setup_mlflow):
     )
     with pytest.raises(DataSetError):
         dataset.model
+
+
+def test_mlflow_model_loader_stats(model_name: str):
+    """Tests if the dataset counts the model loads."""
+    dataset = MlflowModelLoaderDataSet(model=model_name, flavor="mlflow.catboost")
+    dataset.load()
+    assert dataset.stats.reloads == 1
+    assert dataset.stats.registry_checks == 0
+
+
+def test_mlflow_model_loader_get_evicts(model_name: str, model: CatBoostClassifier):
+    """Tests if the dataset evicts the least recently used pooled model."""
+    for _ in range(2):
+        mlflow.catboost.log_model(
+            model, artifact_path="model", registered_model_name=model_name
+        )
+    dataset = MlflowModelLoaderDataSet(
+        model=model_name, flavor="mlflow.catboost", max_models=3
+    )
+    assert isinstance(dataset.get(), CatBoostClassifier)
+    dataset.get(stage="1")
+    dataset.get(stage="2")
+    dataset.get(stage="1")
+    dataset.get(stage="3")
+    assert dataset.stats.evictions == 1
+    assert dataset.stats.reloads == 4
+    dataset.get(stage="1")
+    assert dataset.stats.reloads == 4
+
+
+def test_mlflow_model_loader_get_not_found(model_name: str):
+    """Tests if the dataset does not pool models not found."""
+    dataset = MlflowModelLoaderDataSet(
+        model=model_name, flavor="mlflow.catboost", max_models=3
+    )
+    with pytest.raises(DataSetError):
+        dataset.get("not_found")
+    assert dataset.stats.evictions == 0
+
+
+def test_mlflow_model_loader_single_flight(model_name: str, mocker: MockFixture):
+    """Tests if concurrent requests of a model load it once."""
+    dataset = MlflowModelLoaderDataSet(
+        model=model_name, flavor="mlflow.catboost", max_models=2
+    )
+    load = mocker.spy(MlflowModelLoaderDataSet, "_load_with_retries")
+    threads = [
+        threading.Thread(target=dataset.get, kwargs={"stage": "1"}) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert load.call_count == 1
+
+
+def test_mlflow_model_loader_serves_during_reload(
+    model_name: str, mocker: MockFixture, model: CatBoostClassifier
+):
+    """Tests if the current model is served while an update is loading."""
+    dataset = MlflowModelLoaderDataSet(
+        model=model_name, flavor="mlflow.catboost", update_interval=0.01
+    )
+    current = dataset.model
+    mlflow.catboost.log_model(
+        model, artifact_path="model", registered_model_name=model_name
+    )
+    time.sleep(0.02)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        started.set()
+        release.wait(5)
+
+    mocker.patch.object(dataset, "_load", side_effect=slow_load)
+    reload = threading.Thread(target=getattr, args=(dataset, "model"))
+    reload.start()
+    assert started.wait(5)
+    assert dataset.model is current
+    release.set()
+    reload.join()
+
+
+def test_mlflow_model_loader_artifact(model_name: str):
+    """Tests if the dataset downloads the artifacts of the model run."""
+    mlflow.log_dict({"columns": []}, "feature_summary.json")
+    dataset = MlflowModelLoaderDataSet(model=model_name, flavor="mlflow.catboost")
+    assert dataset.artifact("feature_summary.json") is None
+    dataset.load()
+    path = dataset.artifact("feature_summary.json")
+    with open(path, encoding="utf-8") as file:
+        assert json.load(file) == {"columns": []}
+    assert dataset.artifact("missing.json") is None
+
+
+def test_mlflow_model_loader_artifact_of_loaded_version(
+    model_name: str, model: CatBoostClassifier
+):
+    """Tests if the artifacts are the ones of the loaded version, not the newest."""
+    mlflow.log_dict({"version": 1}, "summary.json")
+    dataset = MlflowModelLoaderDataSet(
+        model=model_name, flavor="mlflow.catboost", update_interval=30.0
+    )
+    dataset.load()
+    mlflow.end_run()
+    with mlflow.start_run():
+        mlflow.catboost.log_model(
+            model, artifact_path="model", registered_model_name=model_name
+        )
+        mlflow.log_dict({"version": 2}, "summary.json")
+    with open(dataset.artifact("summary.json"), encoding="utf-8") as file:
+        assert json.load(file) == {"version": 1}
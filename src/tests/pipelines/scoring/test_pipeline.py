@@ -1,14 +1,45 @@
 """Tests for the scoring pipeline."""
 # pylint: disable=redefined-outer-name
+import asyncio
+import io
+import json
+import time
+from pathlib import Path
 from typing import Any
 
 import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 from fastapi.testclient import TestClient
 from kedro.config import TemplatedConfigLoader
+from kedro.io import DataSetError
 from pytest_mock import MockFixture
 
 from src.hotelbookingcancellation.pipelines.scoring import create_pipeline, nodes
+from src.hotelbookingcancellation.pipelines.scoring.admission import (
+    AdmissionController,
+    AdmissionRejected,
+)
+from src.hotelbookingcancellation.pipelines.scoring.cascade import (
+    CascadeModel,
+    calibrate_threshold,
+)
+from src.hotelbookingcancellation.pipelines.scoring.controller import (
+    ConcurrencyController,
+)
+from src.hotelbookingcancellation.pipelines.scoring.drift import (
+    DriftMonitor,
+    FeatureSketch,
+)
+from src.hotelbookingcancellation.pipelines.scoring.jobs import (
+    JobsError,
+    JobStore,
+    _read_chunks,
+)
+from src.hotelbookingcancellation.pipelines.scoring.shadow import ShadowScorer
+from src.hotelbookingcancellation.pipelines.scoring.warmup import WarmUp
 
 
 class FakeModel:  # pylint: disable=too-few-public-methods
@@ -18,6 +49,11 @@ class FakeModel:  # pylint: disable=too-few-public-methods
         """Fake predict method."""
         return np.zeros(len(x))
 
+    def get_feature_importance(self, data: Any, **_):
+        """Fake SHAP values, counting the explained rows."""
+        self.explained = getattr(self, "explained", 0) + data.num_row()
+        return np.zeros((data.num_row(), data.num_col() + 1))
+
 
 class FakeMlflowLoaderDataSet:  # pylint: disable=too-few-public-methods
     """Fake dataset for mlflow loader."""
@@ -25,12 +61,31 @@ class FakeMlflowLoaderDataSet:  # pylint: disable=too-few-public-methods
     def __init__(self, *_, **__):
         """Init."""
         self._model = FakeModel()
+        self.reloading = False
 
     @property
     def model(self):
         """Loads the model."""
         return self._model
 
+    def get(self, model=None, stage=None):
+        """Gets a model of the registry."""
+        if model == "missing":
+            raise DataSetError(f"Model '{model}' not found")
+        return self._model if stage is None else StagedModel(stage)
+
+
+class StagedModel:  # pylint: disable=too-few-public-methods
+    """Fake model predicting the length of its stage name."""
+
+    def __init__(self, stage: str):
+        """Init."""
+        self._stage = stage
+
+    def predict(self, x: Any):
+        """Fake predict method."""
+        return np.full(len(x), len(self._stage))
+
 
 @pytest.fixture()
 def parameters():
@@ -39,9 +94,11 @@ def parameters():
 
 
 @pytest.fixture()
-def client(mocker: MockFixture, parameters: dict):
+def client(mocker: MockFixture, parameters: dict, tmp_path: Path):
     """Fixture for the API client."""
     clients = []
+    scoring = parameters["scoring"]
+    scoring["jobs"] = {**scoring["jobs"], "path": str(tmp_path / "jobs")}
 
     def create_client(app, **_):
         client = TestClient(app)
@@ -122,6 +179,523 @@ def test_scoring_server_multiple(client: TestClient, example: dict):
     assert res.json() == [0, 0]
 
 
+def test_scoring_server_timing(client: TestClient, example: dict):
+    """Tests if the response reports the latency of each stage."""
+    res = client.post("/", json=[example])
+    stages = [
+        timing.split(";")[0] for timing in res.headers["Server-Timing"].split(", ")
+    ]
+    assert stages == ["queue", "parse", "preprocess", "predict", "serialize"]
+
+
+def test_scoring_server_metrics(client: TestClient, example: dict):
+    """Tests if the latency and batch size metrics are exported."""
+    client.post("/", json=[example, example])
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert 'scoring_stage_seconds_count{stage="predict"} 1.0' in res.text
+    assert "scoring_batch_size_sum 2.0" in res.text
+    assert "scoring_model_reloads_total 0.0" in res.text
+
+
+def test_scoring_server_model_header(client: TestClient, example: dict):
+    """Tests if the scoring server scores with the models of the `X-Model` header."""
+    res = client.post("/", json=[example], headers={"X-Model": "resort/Staging"})
+    assert res.json() == [7]
+    res = client.post(
+        "/columnar",
+        json={key: [value] for key, value in example.items()},
+        headers={"X-Model": "resort/Staging, city"},
+    )
+    assert res.json() == {"resort/Staging": [7], "city": [0]}
+
+
+def test_scoring_server_model_path(client: TestClient, example: dict):
+    """Tests if the scoring server scores with the model of the path."""
+    assert client.post("/models/resort/Prod", json=[example]).json() == [4]
+    res = client.post("/models/missing/Prod", json=[example])
+    assert res.status_code == 404
+
+
+def test_scoring_server_explain(parameters: dict, tmp_path: Path, example: dict):
+    """Tests if the explanations are computed once per booking."""
+    dataset = FakeMlflowLoaderDataSet()
+    scoring = {**parameters["scoring"], "jobs": {"path": str(tmp_path / "jobs")}}
+    client = TestClient(nodes.create_app(dataset, parameters["preprocessing"], scoring))
+    res = client.post("/explain", json=[example, example])
+    assert res.status_code == 200
+    assert len(res.json()) == 2
+    assert res.json()[0]["shap_values"]["lead_time"] == 0
+    client.post("/explain", json=[example])
+    assert dataset.model.explained == 1
+    assert client.post("/explain?mode=fast", json=[example]).status_code == 200
+    assert dataset.model.explained == 2
+    assert client.post("/explain?mode=slow", json=[example]).status_code == 422
+
+
+def test_scoring_server_columnar(client: TestClient, example: dict):
+    """Tests if the columnar endpoint scores column-oriented bookings."""
+    columns = {key: [value, value] for key, value in example.items()}
+    res = client.post("/columnar", json=columns)
+    assert res.status_code == 200
+    assert res.json() == [0, 0]
+    assert "predict" in res.headers["Server-Timing"]
+
+
+def test_scoring_server_columnar_invalid(client: TestClient, example: dict):
+    """Tests if the columnar endpoint reports invalid values per row."""
+    columns = {key: [value, value] for key, value in example.items()}
+    columns["lead_time"][1] = "wrong"
+    columns["hotel"][0] = "Unknown Hotel"
+    res = client.post("/columnar", json=columns)
+    assert res.status_code == 422
+    assert [error["loc"] for error in res.json()["detail"]] == [
+        ["body", "hotel", 0],
+        ["body", "lead_time", 1],
+    ]
+
+
+def test_scoring_server_columnar_invalid_date(client: TestClient, example: dict):
+    """Tests if the columnar endpoint rejects dates that are not strings."""
+    columns = {key: [value, value] for key, value in example.items()}
+    columns["reservation_status_date"][1] = 1467331200
+    res = client.post("/columnar", json=columns)
+    assert res.status_code == 422
+    assert res.json()["detail"] == [
+        {
+            "loc": ["body", "reservation_status_date", 1],
+            "msg": "invalid date format",
+            "type": "value_error.date",
+        }
+    ]
+
+
+def test_scoring_server_columnar_missing(client: TestClient, example: dict):
+    """Tests if the columnar endpoint reports missing fields."""
+    columns = {key: [value] for key, value in example.items() if key != "hotel"}
+    res = client.post("/columnar", json=columns)
+    assert res.status_code == 422
+    assert res.json()["detail"] == [
+        {
+            "loc": ["body", "hotel"],
+            "msg": "field required",
+            "type": "value_error.missing",
+        }
+    ]
+
+
+def test_scoring_server_stream(client: TestClient, example: dict):
+    """Tests if the streaming endpoint scores each NDJSON line."""
+    invalid = {**example, "lead_time": "wrong"}
+    lines = [json.dumps(example), "", json.dumps(invalid), "{", json.dumps(example)]
+    res = client.post("/stream", data="\n".join(lines))
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    results = [json.loads(line) for line in res.text.splitlines()]
+    assert [result["row"] for result in results] == [0, 1, 2, 3]
+    assert results[0] == {"row": 0, "prediction": 0}
+    assert results[1]["detail"][0]["loc"] == ["lead_time"]
+    assert results[2]["detail"][0]["msg"] == "invalid JSON"
+    assert results[3] == {"row": 3, "prediction": 0}
+
+
+def test_scoring_server_stream_deadline(client: TestClient, example: dict):
+    """Tests if the streaming endpoint sheds batches past their deadline."""
+    data = json.dumps(example)
+    res = client.post("/stream", data=data, headers={"X-Deadline-Ms": "0"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    assert 'scoring_rejected_requests_total{status="503"} 1.0' in (
+        client.get("/metrics").text
+    )
+    res = client.post("/stream", data=data, headers={"X-Deadline-Ms": "10000"})
+    assert res.status_code == 200
+    assert res.json() == {"row": 0, "prediction": 0}
+
+
+def _wait_job(client: TestClient, job_id: str) -> dict:
+    """Polls a job until it is finished."""
+    for _ in range(600):
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.1)
+    raise TimeoutError(job_id)
+
+
+def test_scoring_server_jobs(client: TestClient, example: dict):
+    """Tests if a batch job scores a CSV file into parquet results."""
+    csv = pd.DataFrame([example] * 3).to_csv(index=False)
+    res = client.post("/jobs", data=csv, headers={"Content-Type": "text/csv"})
+    assert res.status_code == 202
+    job_id = res.json()["id"]
+    status = _wait_job(client, job_id)
+    assert status["status"] == "done"
+    assert status["rows"] == 3
+    res = client.get(f"/jobs/{job_id}/results")
+    results = pd.read_parquet(io.BytesIO(res.content))
+    assert results["row"].tolist() == [0, 1, 2]
+    assert results["prediction"].tolist() == [0, 0, 0]
+    assert client.delete(f"/jobs/{job_id}").status_code == 204
+    assert client.get(f"/jobs/{job_id}").status_code == 404
+
+
+def test_scoring_server_jobs_parquet_dates(client: TestClient, example: dict):
+    """Tests if a batch job scores a Parquet file with a typed date column."""
+    df = pd.DataFrame([example] * 2)
+    dates = pd.to_datetime(df["reservation_status_date"]).dt.date
+    table = pa.Table.from_pandas(df.assign(reservation_status_date=dates))
+    assert table.schema.field("reservation_status_date").type == pa.date32()
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    res = client.post(
+        "/jobs",
+        data=buffer.getvalue(),
+        headers={"Content-Type": "application/vnd.apache.parquet"},
+    )
+    assert res.status_code == 202
+    status = _wait_job(client, res.json()["id"])
+    assert status["status"] == "done"
+    assert status["rows"] == 2
+
+
+def test_job_store_ignores_files(tmp_path: Path):
+    """Tests if the store starts with other files than jobs in its path."""
+    (tmp_path / ".gitkeep").touch()
+    jobs = JobStore({"path": str(tmp_path)})
+    assert jobs.list_jobs() == []
+    jobs.cleanup()
+    assert (tmp_path / ".gitkeep").exists()
+
+
+def test_job_store_counts_receiving_jobs(tmp_path: Path):
+    """Tests if the jobs being received count towards the pending limit."""
+    jobs = JobStore({"path": str(tmp_path), "max_pending": 1})
+    path = jobs.create("text/csv")
+    with pytest.raises(JobsError) as exc:
+        jobs.create("text/csv")
+    assert exc.value.status_code == 429
+    jobs.discard(path)
+    assert not path.parent.exists()
+    jobs.create("text/csv")
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_read_chunks_columns(tmp_path: Path, fmt: str):
+    """Tests if only the requested columns of a job input are read."""
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"], "c": [0.5, 1.5, 2.5]})
+    path = tmp_path / f"input.{fmt}"
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_parquet(path, index=False)
+    chunks = list(_read_chunks(path, fmt, 2, ["c", "a", "missing"]))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert sorted(chunks[0].columns) == ["a", "c"]
+    assert pd.concat(chunks)["a"].tolist() == [1, 2, 3]
+
+
+def test_scoring_server_jobs_invalid(client: TestClient, example: dict):
+    """Tests if a job with invalid bookings fails with their errors."""
+    rows = [example, {**example, "lead_time": "wrong"}]
+    res = client.post("/jobs", json=rows)
+    status = _wait_job(client, res.json()["id"])
+    assert status["status"] == "failed"
+    assert status["detail"][0]["loc"] == ["body", "lead_time", 1]
+
+
+def test_scoring_server_jobs_unsupported(client: TestClient):
+    """Tests if only the supported formats are accepted."""
+    res = client.post("/jobs", data="x", headers={"Content-Type": "text/plain"})
+    assert res.status_code == 415
+
+
+def test_scoring_server_ready(client: TestClient):
+    """Tests if the server is ready only after warming up the model."""
+    assert client.get("/live").status_code == 200
+    assert client.get("/ready").status_code == 503
+    with client:
+        for _ in range(100):
+            if client.get("/ready").status_code == 200:
+                break
+            time.sleep(0.05)
+        assert client.get("/ready").json() == {"status": "ready"}
+
+
+def test_warmup_unready_on_reload():
+    """Tests if readiness drops while the model is reloaded."""
+    dataset = FakeMlflowLoaderDataSet()
+    warmup = WarmUp(dataset, lambda _: None, {"unready_on_reload": True})
+    warmup.run()
+    assert warmup.ready
+    dataset.reloading = True
+    assert not warmup.ready
+
+
+def test_warmup_retries():
+    """Tests if a failed warm-up is retried, and not alive once it gives up."""
+    calls = []
+
+    def predict(size: int):
+        calls.append(size)
+        if len(calls) < 3:
+            raise RuntimeError("model not available")
+
+    params = {"max_attempts": 3, "retry_interval": 0.0}
+    warmup = WarmUp(FakeMlflowLoaderDataSet(), predict, params)
+    warmup.run()
+    assert warmup.ready and warmup.alive
+    assert warmup.error is None
+    calls.clear()
+    warmup = WarmUp(FakeMlflowLoaderDataSet(), predict, {**params, "max_attempts": 2})
+    warmup.run()
+    assert not warmup.ready and not warmup.alive
+    assert len(calls) == 2
+
+
+def test_scoring_server_shadow(parameters: dict, tmp_path: Path, example: dict):
+    """Tests if the scoring server scores the candidate model in shadow mode."""
+    scoring = {
+        **parameters["scoring"],
+        "jobs": {"path": str(tmp_path / "jobs")},
+        "shadow": {"stage": "Staging"},
+    }
+    app = nodes.create_app(
+        FakeMlflowLoaderDataSet(), parameters["preprocessing"], scoring
+    )
+    client = TestClient(app)
+    assert client.post("/", json=[example, example]).json() == [0, 0]
+    for _ in range(100):
+        summary = client.get("/shadow").json()
+        if summary["batches"]:
+            break
+        time.sleep(0.05)
+    assert summary["rows"] == 2
+    assert summary["agreement"] == 0
+    assert "scoring_shadow_batches_total 1.0" in client.get("/metrics").text
+
+
+def test_shadow_scorer_drops_when_full():
+    """Tests if the shadow scorer drops batches instead of queueing them."""
+    scorer = ShadowScorer(FakeMlflowLoaderDataSet(), {"stage": "1", "max_pending": 0})
+    assert not scorer.submit(pd.DataFrame({"a": [1]}), np.zeros(1))
+    assert scorer.stats.dropped == 1
+    assert not ShadowScorer(FakeMlflowLoaderDataSet()).submit(pd.DataFrame(), [])
+
+
+def test_scoring_server_deadline(client: TestClient, example: dict):
+    """Tests if the scoring server rejects requests past their deadline."""
+    res = client.post("/", json=[example], headers={"X-Deadline-Ms": "0"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    assert 'scoring_rejected_requests_total{status="503"} 1.0' in (
+        client.get("/metrics").text
+    )
+    res = client.post("/", json=[example], headers={"X-Deadline-Ms": "10000"})
+    assert res.status_code == 200
+
+
+def test_admission_controller():
+    """Tests if the admission control queues, prioritizes and sheds requests."""
+    admission = AdmissionController(
+        {"max_rows": 10, "max_queued_rows": 20, "priority_rows": 2}
+    )
+    scored = []
+
+    async def request(name: str, rows: int):
+        try:
+            async with admission.admit(rows):
+                scored.append(name)
+                await asyncio.sleep(0.01)
+        except AdmissionRejected as exc:
+            scored.append(exc.status_code)
+
+    async def requests():
+        await asyncio.gather(
+            request("first", 10), request("bulk", 8), request("small", 1)
+        )
+        await asyncio.gather(request("first", 10), request("large", 30))
+
+    asyncio.run(requests())
+    assert scored == ["first", "small", "bulk", "first", 429]
+    assert admission.in_flight == admission.queued == 0
+
+
+def test_concurrency_controller():
+    """Tests if the controller alternates the AIMD limit and the batch size."""
+    admission = AdmissionController({"max_rows": 1000})
+    controller = ConcurrencyController(
+        admission,
+        {
+            "enabled": True,
+            "latency_slo": 0.1,
+            "max_rows": 5000,
+            "increase_rows": 100,
+            "decrease_factor": 0.5,
+        },
+    )
+    assert controller.adjust() is None
+    controller.observe(100, 0.05, 0.01)
+    assert controller.adjust()["max_rows"] == admission.max_rows == 1100
+    assert controller.batch_size == 10_000
+    controller.observe(100, 0.5, 0.1)
+    assert controller.adjust()["tuned"] == "batch_size"
+    assert admission.max_rows == 1100
+    assert controller.batch_size == 20_000
+    controller.observe(100, 0.5, 0.1)
+    assert controller.adjust()["max_rows"] == admission.max_rows == 550
+    assert controller.batch_size == 20_000
+    controller.observe(100, 0.05, 0.2)
+    controller.adjust()
+    assert admission.max_rows == 550
+    assert controller.batch_size == 10_000
+    assert len(controller.state()["decisions"]) == 4
+
+
+def test_concurrency_controller_disabled():
+    """Tests if the requests are not recorded while the controller is disabled."""
+    controller = ConcurrencyController(AdmissionController({"max_rows": 1000}))
+    for _ in range(10):
+        controller.observe(100, 0.05, 0.01)
+    assert controller.adjust() is None
+
+
+def test_scoring_server_controller(client: TestClient, example: dict):
+    """Tests if the controller state is served."""
+    client.post("/", json=[example])
+    state = client.get("/admin/controller").json()
+    assert state["max_rows"] == 20000
+    assert state["decisions"] == []
+
+
+def test_scoring_server_debug(parameters: dict, tmp_path: Path):
+    """Tests if the debug endpoints are served to the admin only."""
+    scoring = {
+        **parameters["scoring"],
+        "jobs": {"path": str(tmp_path / "jobs")},
+        "debug": {"enabled": True, "token": "secret", "interval": 0.001},
+    }
+    app = nodes.create_app(
+        FakeMlflowLoaderDataSet(), parameters["preprocessing"], scoring
+    )
+    client = TestClient(app)
+    assert client.get("/admin/debug/threads").status_code == 401
+    client.headers["Authorization"] = "Bearer secret"
+    assert "MainThread" in client.get("/admin/debug/threads").text
+    res = client.get("/admin/debug/profile", params={"seconds": 0.05})
+    assert res.status_code == 200
+    res = client.get(
+        "/admin/debug/profile", params={"seconds": 0.05, "output": "pstats"}
+    )
+    assert res.headers["content-type"] == "application/octet-stream"
+    first = client.post("/admin/debug/memory/snapshots").json()["id"]
+    second = client.post("/admin/debug/memory/snapshots").json()["id"]
+    res = client.get(f"/admin/debug/memory/snapshots/{first}/diff/{second}")
+    assert res.status_code == 200
+    assert client.delete("/admin/debug/memory/snapshots").status_code == 204
+
+
+def test_scoring_server_debug_disabled(client: TestClient):
+    """Tests if the debug endpoints are not served unless enabled."""
+    assert client.get("/admin/debug/threads").status_code == 404
+
+
+def test_scoring_server_drift(parameters: dict, tmp_path: Path, example: dict):
+    """Tests if the scoring server reports the drift of the served features."""
+    preprocessing = parameters["preprocessing"]
+    features = nodes._features(  # pylint: disable=protected-access
+        pd.json_normalize([example] * 10), preprocessing
+    )
+    summary = FeatureSketch.fit(features, preprocessing["columns_to_map"])
+    path = tmp_path / "feature_summary.json"
+    path.write_text(json.dumps(summary.to_dict()))
+    dataset = FakeMlflowLoaderDataSet()
+    dataset.artifact = lambda _: str(path)
+    scoring = {**parameters["scoring"], "jobs": {"path": str(tmp_path / "jobs")}}
+    client = TestClient(nodes.create_app(dataset, preprocessing, scoring))
+    assert client.get("/drift").json()["loaded"] is False
+    assert client.post("/drift/reset").json()["rows"] == 0
+    client.post("/", json=[example, {**example, "hotel": "City Hotel"}])
+    report = client.get("/drift").json()
+    assert report["rows"] == 2
+    assert report["features"]["hotel"]["psi"] > 0
+    assert report["drifted"] == ["hotel"]
+    assert report["features"]["lead_time"]["psi"] == pytest.approx(0, abs=1e-3)
+
+
+def test_drift_monitor_reloads_summary(tmp_path: Path):
+    """Tests if the summary of a hot reloaded model replaces the previous one."""
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.0, 4.0]})
+    paths = []
+    for version in range(2):
+        paths.append(tmp_path / f"summary-{version}.json")
+        summary = FeatureSketch.fit(df + 10 * version, bins=2)
+        paths[-1].write_text(json.dumps(summary.to_dict()))
+    version = {"current": 0}
+    monitor = DriftMonitor(
+        lambda _: str(paths[version["current"]]), {}, lambda: version["current"]
+    )
+    monitor.load()
+    monitor.update(df)
+    assert monitor.report()["rows"] == 4
+    version["current"] = 1
+    monitor.update(df)
+    for _ in range(100):
+        if monitor.training.edges == [[12.5]]:
+            break
+        time.sleep(0.01)
+    assert monitor.training.edges == [[12.5]]
+    assert monitor.report()["rows"] == 0
+
+
+class ConfidentModel:  # pylint: disable=too-few-public-methods
+    """Fake small model, confident about the even rows only."""
+
+    classes_ = np.array([0, 1])
+
+    def predict_proba(self, x: Any, **_):
+        """Fake predict_proba method."""
+        confidence = np.where(np.arange(len(x)) % 2, 0.6, 0.95)
+        return np.stack([1 - confidence, confidence], axis=1)
+
+
+def test_cascade_model(parameters: dict, tmp_path: Path):
+    """Tests if the cascade escalates the rows the small model is unsure of."""
+    cascade = CascadeModel(ConfidentModel(), FakeModel(), 0.9)
+    predictions = cascade.predict(pd.DataFrame({"a": range(4)}))
+    assert predictions.tolist() == [1, 0, 1, 0]
+    assert (cascade.cascade_stats.rows, cascade.cascade_stats.escalated) == (4, 2)
+
+    dataset = FakeMlflowLoaderDataSet()
+    dataset.loaded = cascade
+    scoring = {**parameters["scoring"], "jobs": {"path": str(tmp_path / "jobs")}}
+    client = TestClient(nodes.create_app(dataset, parameters["preprocessing"], scoring))
+    metrics = client.get("/metrics").text
+    assert "scoring_cascade_rows_total 4.0" in metrics
+    assert "scoring_cascade_escalated_total 2.0" in metrics
+
+
+def test_calibrate_threshold_escalates_all():
+    """Tests if no row is answered by a small model always wrong."""
+    threshold, coverage, accuracy = calibrate_threshold(
+        np.array([0.9, 0.8]), np.zeros(2, dtype=bool), np.ones(2, dtype=bool), 0.0
+    )
+    assert threshold > 1
+    assert (coverage, accuracy) == (0, 1)
+
+
+def test_features_of_model(parameters: dict, example: dict):
+    """Tests if only the features of the model are preprocessed, in its order."""
+    df = pd.json_normalize([example] * 2)
+    preprocessing = parameters["preprocessing"]
+    features = nodes._features(  # pylint: disable=protected-access
+        df, preprocessing, ["month", "hotel", "lead_time"]
+    )
+    expected = nodes._features(df, preprocessing)  # pylint: disable=protected-access
+    assert list(features) == ["month", "hotel", "lead_time"]
+    pd.testing.assert_frame_equal(features, expected[list(features)])
+
+
 def test_validate_pipeline_create():
     """Tests if a pipeline can be instantiated."""
     pipeline = create_pipeline()
@@ -0,0 +1,143 @@
+"""Tests for the project hooks."""
+# pylint: disable=redefined-outer-name
+import json
+from pathlib import Path
+from typing import Any, List, Optional
+
+import pandas as pd
+import pytest
+from kedro.extras.datasets.pandas import CSVDataSet
+from kedro.framework.hooks import hook_impl
+from kedro.framework.hooks.manager import _create_hook_manager
+from kedro.io import DataCatalog
+from kedro.pipeline import Pipeline, node
+from kedro.pipeline.node import Node
+
+from src.hotelbookingcancellation.hooks import MemoizationHooks, ProfilingHooks
+from src.hotelbookingcancellation.runner import MemoizedRunner
+
+
+def double(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """Multiplies the dataframe by a factor."""
+    return df * factor
+
+
+@pytest.fixture()
+def catalog(tmp_path: Path) -> DataCatalog:
+    """Catalog with a persisted input and output."""
+    catalog = DataCatalog(
+        {
+            "a": CSVDataSet((tmp_path / "a.csv").as_posix()),
+            "b": CSVDataSet((tmp_path / "b.csv").as_posix()),
+        },
+        feed_dict={"params:factor": 2},
+    )
+    catalog.save("a", pd.DataFrame({"x": [1, 2]}))
+    return catalog
+
+
+def serve(df: pd.DataFrame):
+    """Node run for its side effects only."""
+
+
+class RunNodes:
+    """Records the names of the nodes run."""
+
+    def __init__(self):
+        self.names: List[str] = []
+
+    @hook_impl
+    def after_node_run(self, node: Node):
+        """Records the node."""
+        self.names.append(node.name)
+
+
+def run(
+    hooks: Any, catalog: DataCatalog, pipeline: Optional[Pipeline] = None, **extra
+) -> List[str]:
+    """Runs the pipeline with the hooks and returns the nodes that were run."""
+    pipeline = pipeline or Pipeline(
+        [node(double, ["a", "params:factor"], "b", name="double")]
+    )
+    ran = RunNodes()
+    hook_manager = _create_hook_manager()
+    hook_manager.register(hooks)
+    hook_manager.register(ran)
+    run_params = {"extra_params": extra}
+    hook_manager.hook.before_pipeline_run(
+        run_params=run_params, pipeline=pipeline, catalog=catalog
+    )
+    MemoizedRunner().run(pipeline, catalog, hook_manager)
+    hook_manager.hook.after_pipeline_run(
+        run_params=run_params, run_result={}, pipeline=pipeline, catalog=catalog
+    )
+    return ran.names
+
+
+def test_memoization_skips_fresh_nodes(tmp_path: Path, catalog: DataCatalog):
+    """Tests if a node is skipped when nothing changed."""
+    hooks = MemoizationHooks((tmp_path / "memo.json").as_posix())
+    assert run(hooks, catalog) == ["double"]
+    assert catalog.load("b")["x"].tolist() == [2, 4]
+    assert not run(hooks, catalog)
+
+
+def test_memoization_runs_nodes_without_outputs(tmp_path: Path, catalog: DataCatalog):
+    """Tests if the nodes run for their side effects are never skipped."""
+    hooks = MemoizationHooks((tmp_path / "memo.json").as_posix())
+    pipeline = Pipeline([node(serve, "a", None, name="serve")])
+    assert run(hooks, catalog, pipeline) == ["serve"]
+    assert run(hooks, catalog, pipeline) == ["serve"]
+
+
+def test_memoization_reruns_changed_inputs(tmp_path: Path, catalog: DataCatalog):
+    """Tests if a node runs again when its inputs change."""
+    hooks = MemoizationHooks((tmp_path / "memo.json").as_posix())
+    run(hooks, catalog)
+    catalog.save("a", pd.DataFrame({"x": [3]}))
+    assert run(hooks, catalog) == ["double"]
+    assert catalog.load("b")["x"].tolist() == [6]
+
+
+def test_memoization_reruns_missing_outputs(tmp_path: Path, catalog: DataCatalog):
+    """Tests if a node runs again when its outputs were removed."""
+    hooks = MemoizationHooks((tmp_path / "memo.json").as_posix())
+    run(hooks, catalog)
+    (tmp_path / "b.csv").unlink()
+    assert run(hooks, catalog) == ["double"]
+
+
+def test_memoization_force(tmp_path: Path, catalog: DataCatalog):
+    """Tests if every node runs when forced."""
+    hooks = MemoizationHooks((tmp_path / "memo.json").as_posix())
+    run(hooks, catalog)
+    assert run(hooks, catalog, force="true") == ["double"]
+
+
+def test_profiling_report(tmp_path: Path, catalog: DataCatalog):
+    """Tests if the node measures are written to the report."""
+    hooks = ProfilingHooks(
+        report_path=(tmp_path / "profile.json").as_posix(),
+        trace_allocations=True,
+        cprofile_dir=(tmp_path / "cprofile").as_posix(),
+    )
+    run(hooks, catalog)
+    report = json.loads((tmp_path / "profile.json").read_text(encoding="utf-8"))
+    measures = report["double"]
+    assert measures["input_rows"] == 2
+    assert measures["output_rows"] == 2
+    assert measures["wall_time"] > 0
+    for key in ["load_time", "save_time", "alloc_peak_mb"]:
+        assert key in measures
+    assert measures["peak_rss_mb"] > 0
+    assert report[ProfilingHooks.PIPELINE]["peak_rss_mb"] > 0
+    assert (tmp_path / "cprofile" / "double.prof").exists()
+
+
+def test_profiling_allocations_opt_in(tmp_path: Path, catalog: DataCatalog):
+    """Tests if allocations are not traced by default."""
+    hooks = ProfilingHooks(report_path=(tmp_path / "profile.json").as_posix())
+    run(hooks, catalog)
+    report = json.loads((tmp_path / "profile.json").read_text(encoding="utf-8"))
+    assert "alloc_peak_mb" not in report["double"]
+    assert not (tmp_path / "cprofile").exists()
@@ -0,0 +1,37 @@
+"""Tests for the load generator."""
+import pandas as pd
+import pytest
+from kedro.config import TemplatedConfigLoader
+
+from src.hotelbookingcancellation.loadtest import LoadResult, synthetic_bookings
+from src.hotelbookingcancellation.pipelines.data_engineering.nodes import (
+    preprocess_bookings,
+)
+from src.hotelbookingcancellation.pipelines.scoring.nodes import Booking
+
+
+@pytest.fixture()
+def preprocessing():
+    """Fixture for the preprocessing parameters."""
+    return TemplatedConfigLoader("./conf").get("parameters/*")["preprocessing"]
+
+
+def test_synthetic_bookings(preprocessing: dict):
+    """Tests if the synthetic bookings are valid and kept by the preprocessing."""
+    bookings = synthetic_bookings(50, preprocessing["columns_to_map"], seed=1)
+    df = pd.json_normalize([Booking.parse_obj(booking).dict() for booking in bookings])
+    df[preprocessing["target"]] = 0
+    assert len(preprocess_bookings(df, preprocessing)) == 50
+
+
+def test_load_result_summary():
+    """Tests the percentiles and rates of a load test."""
+    result = LoadResult(batch_size=2, latencies=[0.001 * i for i in range(1, 1001)])
+    result.duration = 10.0
+    summary = result.summary()
+    assert summary["requests_per_sec"] == 100.0
+    assert summary["bookings_per_sec"] == 200.0
+    assert summary["error_rate"] == 0.0
+    assert (
+        summary["p50_ms"] < summary["p95_ms"] < summary["p99_ms"] < summary["p999_ms"]
+    )
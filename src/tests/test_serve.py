@@ -0,0 +1,28 @@
+"""Tests for the standalone scoring server."""
+from click.testing import CliRunner
+from pytest_mock import MockFixture
+
+from src.hotelbookingcancellation import serve
+from src.hotelbookingcancellation.pipelines.scoring import MlflowModelLoaderDataSet
+
+
+def test_load_config():
+    """Tests if only the scoring configuration is loaded."""
+    preprocessing, scoring, api_model = serve.load_config()
+    assert "target" in preprocessing
+    assert "uvicorn" in scoring
+    assert api_model["type"].endswith("MlflowModelLoaderDataSet")
+
+
+def test_main(mocker: MockFixture):
+    """Tests if the server is started with the model loaded."""
+    load = mocker.patch.object(
+        MlflowModelLoaderDataSet, "_load", autospec=True, side_effect=lambda self: self
+    )
+    server = mocker.patch("uvicorn.Server")
+    result = CliRunner().invoke(serve.main, [])
+    assert result.exit_code == 0, result.output
+    load.assert_called_once()
+    server.return_value.run.assert_called_once()
+    app = server.call_args.args[0].app
+    assert {"/", "/metrics"} <= {route.path for route in app.routes}